@@ -13,5 +13,14 @@ setup(
     install_requires=[
         'pandas>=1.4.0',
         'sqlalchemy>=1.4.0'
-    ]
+    ],
+    extras_require={
+        'arrow': ['pyarrow']
+    },
+    entry_points={
+        'console_scripts': [
+            'snax-serve=snax.feature_server:main',
+            'snax-benchmark=snax.benchmarks:main'
+        ]
+    }
 )
@@ -0,0 +1,235 @@
+"""Alignment of feature values to the rows of an entity dataframe without repeated merges"""
+from datetime import timedelta
+from typing import List, Tuple, Optional, Union, Dict, TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+if TYPE_CHECKING:
+    import pyarrow
+
+
+def _key_index(key_values: pd.DataFrame) -> pd.Index:
+    if len(key_values.columns) == 1:
+        return pd.Index(key_values.iloc[:, 0])
+    return pd.MultiIndex.from_frame(key_values)
+
+
+class EntityKeyIndex:
+    """
+    Join key values of an entity dataframe factorized into integer codes, feature values of any number of feature
+    views can then be aligned to the entity rows through a positional indexer
+
+    Args:
+        key_values: Data frame with the entity's join key columns
+    """
+
+    def __init__(self, key_values: pd.DataFrame):
+        self._join_keys = list(key_values.columns)
+        self._codes, self._unique_keys = _key_index(key_values).factorize()
+
+    @property
+    def join_keys(self) -> List[str]:
+        return self._join_keys
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._codes
+
+    @property
+    def unique_keys(self) -> pd.Index:
+        return self._unique_keys
+
+    @property
+    def unique_key_values(self) -> pd.DataFrame:
+        """Distinct non-missing key values as a data frame with the join key columns"""
+        if isinstance(self._unique_keys, pd.MultiIndex):
+            return self._unique_keys.to_frame(index=False)
+        return self._unique_keys.to_frame(index=False, name=self._join_keys[0])
+
+    def get_row_indexer(self, feature_values: pd.DataFrame) -> np.ndarray:
+        """
+        Position of the row in feature_values matching each entity row, -1 where there is no match
+        If feature_values contain some key more than once, its first row is used
+        """
+        feature_index = _key_index(feature_values[self._join_keys])
+        first_occurrences = None
+        if not feature_index.is_unique:
+            first_occurrences = np.flatnonzero(~feature_index.duplicated())
+            feature_index = feature_index[first_occurrences]
+
+        unique_key_positions = feature_index.get_indexer(self._unique_keys)
+        if first_occurrences is not None:
+            unique_key_positions = np.where(unique_key_positions == -1, -1, first_occurrences[unique_key_positions])
+
+        # Missing entity keys have code -1, which picks the appended -1 (no match)
+        unique_key_positions = np.append(unique_key_positions, -1)
+        return unique_key_positions[self._codes]
+
+
+class AsOfIndex:
+    """
+    Entity key values with event timestamps, aligns to each entity row the latest feature row of the same entity
+    whose timestamp is not after the event timestamp (and not older than the ttl)
+
+    Args:
+        key_values: Data frame with the entity's join key columns
+        timestamps: Event timestamps of the entity rows
+        feature_timestamp_field: Name of the column with the feature rows' timestamps
+        ttl: Optional maximal age of a feature row at the event timestamp
+    """
+
+    _ROW_POSITION = '__snax_row_position'
+
+    def __init__(self, key_values: pd.DataFrame, timestamps: pd.Series, feature_timestamp_field: str,
+                 ttl: Optional[timedelta] = None):
+        self._entity_join_keys = list(key_values.columns)
+        self._feature_timestamp_field = feature_timestamp_field
+        self._ttl = pd.Timedelta(ttl) if ttl is not None else None
+
+        events = key_values.reset_index(drop=True)
+        events[self._ROW_POSITION] = np.arange(len(events))
+        events[feature_timestamp_field] = pd.to_datetime(timestamps).to_numpy()
+        # merge_asof needs the 'on' column sorted and without missing values
+        self._events = events.dropna(subset=[feature_timestamp_field]).sort_values(
+            feature_timestamp_field, kind='stable')
+        self._n_rows = len(events)
+
+    @property
+    def join_keys(self) -> List[str]:
+        return self._entity_join_keys + [self._feature_timestamp_field]
+
+    def get_row_indexer(self, feature_values: pd.DataFrame) -> np.ndarray:
+        """Position of the row in feature_values valid at each entity row's timestamp, -1 where there is none"""
+        feature_rows = feature_values[self.join_keys].copy()
+        feature_rows[self._ROW_POSITION] = np.arange(len(feature_rows))
+        feature_rows = feature_rows.dropna(subset=[self._feature_timestamp_field]).sort_values(
+            self._feature_timestamp_field, kind='stable')
+
+        matched = pd.merge_asof(
+            self._events,
+            feature_rows,
+            on=self._feature_timestamp_field,
+            by=self._entity_join_keys,
+            direction='backward',
+            tolerance=self._ttl,
+            suffixes=('', '_feature')
+        )
+
+        indexer = np.full(self._n_rows, -1, dtype=np.intp)
+        feature_positions = matched[self._ROW_POSITION + '_feature']
+        has_match = feature_positions.notna().to_numpy()
+        indexer[matched[self._ROW_POSITION].to_numpy()[has_match]] = feature_positions.to_numpy()[has_match]
+        return indexer
+
+
+def _take_column(series: pd.Series, indexer: np.ndarray):
+    values = series.array if pd.api.types.is_extension_array_dtype(series) else series.to_numpy()
+    return take(values, indexer, allow_fill=True)
+
+
+OUTPUT_FORMATS = ['pandas', 'numpy', 'matrix', 'arrow']
+
+JoinedFeatureValues = Union[pd.DataFrame, Dict[str, np.ndarray], np.ndarray, 'pyarrow.Table']
+
+
+def _aligned_feature_columns(
+        dataframe: pd.DataFrame,
+        key_indices_and_feature_values: List[Tuple[Union[EntityKeyIndex, AsOfIndex], pd.DataFrame]]
+) -> Dict[str, Tuple[pd.Series, np.ndarray]]:
+    """Feature columns to add to the dataframe with the indexers aligning them to the dataframe's rows"""
+    feature_columns = dict()
+    for key_index, feature_values in key_indices_and_feature_values:
+        indexer = key_index.get_row_indexer(feature_values)
+        for colname in feature_values.columns:
+            if colname in key_index.join_keys:
+                continue
+            if colname in dataframe.columns or colname in feature_columns:
+                raise ValueError(f'Feature column {colname} would be added to the dataframe more than once')
+            feature_columns[colname] = (feature_values[colname], indexer)
+    return feature_columns
+
+
+def _to_pandas(dataframe: pd.DataFrame, feature_columns: Dict[str, Tuple[pd.Series, np.ndarray]]) -> pd.DataFrame:
+    dataframe = dataframe.reset_index(drop=True)
+    if len(feature_columns) == 0:
+        return dataframe
+
+    taken_columns = {colname: _take_column(series, indexer) for colname, (series, indexer) in feature_columns.items()}
+    return pd.concat([dataframe, pd.DataFrame(taken_columns, index=dataframe.index)], axis=1)
+
+
+def _to_numpy(dataframe: pd.DataFrame,
+              feature_columns: Dict[str, Tuple[pd.Series, np.ndarray]]) -> Dict[str, np.ndarray]:
+    columns = {colname: dataframe[colname].to_numpy() for colname in dataframe.columns}
+    for colname, (series, indexer) in feature_columns.items():
+        columns[colname] = np.asarray(_take_column(series, indexer))
+    return columns
+
+
+def _to_matrix(dataframe: pd.DataFrame, feature_columns: Dict[str, Tuple[pd.Series, np.ndarray]],
+               feature_order: Optional[List[str]] = None) -> np.ndarray:
+    feature_order = feature_order if feature_order is not None else list(feature_columns)
+    matrix = np.empty((len(dataframe), len(feature_order)), dtype=np.float32)
+    for position, colname in enumerate(feature_order):
+        if colname not in feature_columns:
+            # E.g. a join key requested as a feature, its values are in the dataframe
+            matrix[:, position] = dataframe[colname].to_numpy(dtype=np.float32, na_value=np.nan)
+            continue
+
+        series, indexer = feature_columns[colname]
+        try:
+            values = series.to_numpy(dtype=np.float32, na_value=np.nan)
+        except (TypeError, ValueError):
+            raise ValueError(f'Feature {colname} of type {series.dtype} can\'t be converted to float32')
+        # Indexer value -1 (no match) picks the appended NaN
+        matrix[:, position] = np.append(values, np.float32(np.nan))[indexer]
+    return matrix
+
+
+def _to_arrow(dataframe: pd.DataFrame, feature_columns: Dict[str, Tuple[pd.Series, np.ndarray]]) -> 'pyarrow.Table':
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('Arrow output requires pyarrow, install it with `pip install snax[arrow]`')
+
+    columns = {colname: pyarrow.array(dataframe[colname], from_pandas=True) for colname in dataframe.columns}
+    for colname, (series, indexer) in feature_columns.items():
+        columns[colname] = pyarrow.array(np.asarray(_take_column(series, indexer)), from_pandas=True)
+    return pyarrow.table(columns)
+
+
+def join_feature_values(
+        dataframe: pd.DataFrame,
+        key_indices_and_feature_values: List[Tuple[Union[EntityKeyIndex, AsOfIndex], pd.DataFrame]],
+        output: str = 'pandas', feature_order: Optional[List[str]] = None) -> JoinedFeatureValues:
+    """
+    Left join feature values of several feature views to the dataframe in a single pass
+
+    Args:
+        dataframe: Entity dataframe the key indices were built from
+        key_indices_and_feature_values: Pairs of entity key index and feature values containing its join keys
+        output: Format of the result, one of
+            'pandas': the dataframe with all feature columns appended, with a fresh range index
+            'numpy': dict from column name to numpy array of the dataframe's and feature columns
+            'matrix': float32 numpy matrix with feature columns only, missing values are NaN
+            'arrow': pyarrow Table of the dataframe's and feature columns
+        feature_order: Order of feature columns in the 'matrix' output, all feature columns in the order of
+            key_indices_and_feature_values by default
+
+    Returns:
+        The joined data in the requested format, rows in the order of the dataframe
+    """
+    if output not in OUTPUT_FORMATS:
+        raise ValueError(f'output must be one of {OUTPUT_FORMATS}')
+
+    feature_columns = _aligned_feature_columns(dataframe, key_indices_and_feature_values)
+    if output == 'numpy':
+        return _to_numpy(dataframe, feature_columns)
+    elif output == 'matrix':
+        return _to_matrix(dataframe, feature_columns, feature_order)
+    elif output == 'arrow':
+        return _to_arrow(dataframe, feature_columns)
+    else:
+        return _to_pandas(dataframe, feature_columns)
@@ -0,0 +1,38 @@
+"""Executor running blocking work (data source backends, casting, joining) for the asyncio API"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Optional, Callable, Any
+
+DEFAULT_MAX_ASYNC_WORKERS = 16
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def get_async_executor() -> Executor:
+    """Executor used for blocking calls of the asyncio API, created on the first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DEFAULT_MAX_ASYNC_WORKERS, thread_name_prefix='snax-async')
+        return _executor
+
+
+def set_async_executor(executor: Executor):
+    """Replace the executor used for blocking calls of the asyncio API, e.g. to change the number of workers"""
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+async def run_blocking(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Run the blocking function on the async executor without blocking the event loop,
+    in a copy of the caller's context, so that e.g. tracing spans opened by the function nest in the caller's
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_async_executor(), functools.partial(context.run, fn, *args, **kwargs))
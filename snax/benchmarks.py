@@ -0,0 +1,401 @@
+"""
+Benchmarks of data source selects and inserts, type casting and feature retrieval on synthetic data
+
+Each backend (in-memory, CSV and SQLite standing in for Oracle) gets a generated feature repo with one feature view
+of synthetic data, see `snax.synthetic_data`. Run the suite with `snax-benchmark --output results.json` and compare
+later runs with `snax-benchmark --baseline results.json`, which exits with status 1 when some benchmark regressed
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Callable, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from snax.data_sources.data_source_base import DataSourceBase
+from snax.feature import Feature
+from snax.feature_store import FeatureStore
+from snax.feature_view import FeatureView
+from snax.synthetic_data import generate_features, generate_data, DEFAULT_VALUE_TYPES
+from snax.type_casting import cast_to_feature_types
+from snax.value_type import ValueType
+
+RESULTS_FORMAT_VERSION = 1
+BACKENDS = ['in-memory', 'csv', 'sqlite']
+# Inserts of the Oracle data source use Oracle-only DDL, so they are not benchmarked on SQLite
+_INSERT_BACKENDS = ['in-memory', 'csv']
+_COMPARED_METRICS = ['latency_p50', 'peak_memory']
+
+_VIEW_NAME = 'synthetic'
+_ENTITY_NAME = 'synthetic_entity'
+_JOIN_KEY = 'synthetic_id'
+
+_REPO_FILE_TEMPLATE = '''
+from snax.entity import Entity
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.value_type import ValueType
+{source_imports}
+
+entity = Entity(name={entity_name!r}, join_keys=[{join_key!r}])
+source = {source}
+view = FeatureView(
+    name={view_name!r},
+    entities=[entity],
+    features=[{features}],
+    source=source
+)
+'''
+
+_SOURCES = {
+    'in-memory': ('import pandas as pd\nfrom snax.data_sources.in_memory_data_source import InMemoryDataSource',
+                  'InMemoryDataSource(name="synthetic_in_memory", data=pd.read_pickle({path!r}))'),
+    'csv': ('from snax.data_sources.csv_data_source import CsvDataSource',
+            'CsvDataSource(name="synthetic_csv", csv_file_path={path!r})'),
+    'sqlite': ('from sqlalchemy import create_engine\nfrom snax.data_sources.oracle_data_source import OracleDataSource',
+               'OracleDataSource(name="synthetic_sqlite", schema="main", table="synthetic", '
+               'engine=create_engine("sqlite:///{path}"))'),
+}
+_DATA_FILE_NAMES = {'in-memory': 'synthetic.pkl', 'csv': 'synthetic.csv', 'sqlite': 'synthetic.db'}
+
+
+class BenchmarkResult:
+    """
+    Timings of the runs of a benchmark on a backend
+
+    Args:
+        name: Name of the benchmark
+        backend: Name of the backend
+        rows: Number of rows processed by a run
+        latencies: Wall times of the runs in seconds
+        peak_memory: Peak memory allocated by python during a run in bytes
+    """
+
+    def __init__(self, name: str, backend: str, rows: int, latencies: List[float], peak_memory: int):
+        self._name = name
+        self._backend = backend
+        self._rows = rows
+        self._latencies = latencies
+        self._peak_memory = peak_memory
+
+    def __repr__(self):
+        return f'BenchmarkResult(name={self._name}, backend={self._backend}, ' \
+               f'latency_p50={self.latency_percentile(50):.4f})'
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    @property
+    def latencies(self) -> List[float]:
+        return self._latencies
+
+    @property
+    def peak_memory(self) -> int:
+        return self._peak_memory
+
+    @property
+    def throughput(self) -> float:
+        """Rows processed per second by the median run"""
+        return self._rows / max(self.latency_percentile(50), 1e-9)
+
+    def latency_percentile(self, percentile: float) -> float:
+        return float(np.percentile(self._latencies, percentile))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self._name, 'backend': self._backend, 'rows': self._rows, 'runs': len(self._latencies),
+            'throughput': self.throughput, 'latency_mean': float(np.mean(self._latencies)),
+            'latency_p50': self.latency_percentile(50), 'latency_p90': self.latency_percentile(90),
+            'latency_p99': self.latency_percentile(99), 'peak_memory': self._peak_memory
+        }
+
+
+class BenchmarkComparison:
+    """
+    Metric of a benchmark in the current results against the baseline, higher values are worse
+
+    Args:
+        name: Name of the benchmark
+        backend: Name of the backend
+        metric: Name of the compared metric
+        baseline: Value in the baseline
+        current: Value in the current results
+        tolerance: Relative increase above which the benchmark regressed
+    """
+
+    def __init__(self, name: str, backend: str, metric: str, baseline: float, current: float, tolerance: float):
+        self._name = name
+        self._backend = backend
+        self._metric = metric
+        self._baseline = baseline
+        self._current = current
+        self._tolerance = tolerance
+
+    def __repr__(self):
+        return f'BenchmarkComparison(name={self._name}, backend={self._backend}, metric={self._metric}, ' \
+               f'change={self.change:+.1%})'
+
+    def __str__(self):
+        status = 'REGRESSION' if self.is_regression else 'ok'
+        return f'{self._name:<26} {self._backend:<10} {self._metric:<12} {self._baseline:>14.6g} ' \
+               f'{self._current:>14.6g} {self.change:>+8.1%}  {status}'
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+    @property
+    def metric(self) -> str:
+        return self._metric
+
+    @property
+    def change(self) -> float:
+        """Relative change of the metric from the baseline"""
+        return self._current / self._baseline - 1 if self._baseline > 0 else 0.
+
+    @property
+    def is_regression(self) -> bool:
+        return self.change > self._tolerance
+
+
+def _measure(run: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Latencies of repeat runs after a warm-up run and the peak memory of a separate traced run"""
+    run()
+    latencies = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start_time)
+
+    # Tracing slows the allocations down, so the memory is measured apart from the timed runs
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    run()
+    peak_memory = tracemalloc.get_traced_memory()[1] - memory_before
+    if started_tracing:
+        tracemalloc.stop()
+    return {'latencies': latencies, 'peak_memory': peak_memory}
+
+
+def _write_backend_data(backend: str, data: pd.DataFrame, path: Path):
+    if backend == 'in-memory':
+        data.to_pickle(path)
+    elif backend == 'csv':
+        data.to_csv(path, index=False)
+    elif backend == 'sqlite':
+        data.to_sql('synthetic', create_engine(f'sqlite:///{path}'), index=False)
+    else:
+        raise ValueError(f'Unknown backend {backend}, must be one of {BACKENDS}')
+
+
+def create_benchmark_repo(backend: str, data: pd.DataFrame, features: List[Feature], repo_path: Path) -> Path:
+    """
+    Write a feature repo with the synthetic data in the backend, one entity keyed by `synthetic_id`
+    and one feature view `synthetic` with the features
+
+    Args:
+        backend: One of BACKENDS
+        data: Synthetic data with the `synthetic_id` key column and the features' columns
+        features: Features of the view
+        repo_path: Directory to write the repo and the data to, created if it doesn't exist
+
+    Returns:
+        Path of the repo
+    """
+    repo_path.mkdir(parents=True, exist_ok=True)
+    data_path = repo_path / _DATA_FILE_NAMES[backend]
+    _write_backend_data(backend, data, data_path)
+    source_imports, source = _SOURCES[backend]
+    (repo_path / 'synthetic_repo.py').write_text(_REPO_FILE_TEMPLATE.format(
+        source_imports=source_imports, entity_name=_ENTITY_NAME, join_key=_JOIN_KEY,
+        source=source.format(path=str(data_path)), view_name=_VIEW_NAME,
+        features=', '.join(f'Feature({feature.name!r}, ValueType.{feature.dtype.name})' for feature in features)
+    ))
+    return repo_path
+
+
+def _run_backend_benchmarks(backend: str, feature_store: FeatureStore, data: pd.DataFrame, n_key_values: int,
+                            n_entity_rows: int, insert_rows: int, repeat: int, seed: int) -> List[BenchmarkResult]:
+    view: FeatureView = feature_store.get_feature_view(_VIEW_NAME)
+    source: DataSourceBase = view.source
+    feature_names = [feature.name for feature in view.features]
+    rng = np.random.default_rng(seed)
+
+    key_values = data[[_JOIN_KEY]].iloc[rng.choice(len(data), min(n_key_values, len(data)), replace=False)]
+    entity_rows = data[[_JOIN_KEY]].iloc[rng.integers(0, len(data), n_entity_rows)].reset_index(drop=True)
+    raw_data = source.select(columns=[_JOIN_KEY] + feature_names)
+
+    benchmarks = {
+        'select': (len(data), lambda: source.select(columns=[_JOIN_KEY] + feature_names)),
+        'select_by_key': (len(key_values), lambda: source.select(columns=feature_names, key=[_JOIN_KEY],
+                                                                 key_values=key_values)),
+        'cast_to_feature_types': (len(raw_data), lambda: cast_to_feature_types(raw_data, view.features)),
+        'add_features_to_dataframe': (n_entity_rows, lambda: feature_store.add_features_to_dataframe(
+            entity_rows, [f'{_VIEW_NAME}:{feature_name}' for feature_name in feature_names], _ENTITY_NAME)),
+    }
+    if backend in _INSERT_BACKENDS:
+        # Keys past the generated ones, the first run inserts the rows and the others replace them
+        inserted_data = generate_data([_JOIN_KEY], view.features, insert_rows, seed=seed + 1)
+        inserted_data[_JOIN_KEY] += int(data[_JOIN_KEY].max()) + 1
+        benchmarks['insert'] = (insert_rows, lambda: source.insert(key=[_JOIN_KEY], columns=feature_names,
+                                                                   data=inserted_data, if_exists='replace'))
+
+    results = []
+    for name, (rows, run) in benchmarks.items():
+        results.append(BenchmarkResult(name, backend, rows, **_measure(run, repeat)))
+    return results
+
+
+def run_benchmarks(backends: Sequence[str] = tuple(BACKENDS), n_rows: int = 100_000, n_features: int = 10,
+                   value_types: Sequence[ValueType] = DEFAULT_VALUE_TYPES, key_cardinality: Optional[int] = None,
+                   null_rate: float = 0.1, n_key_values: int = 100, n_entity_rows: int = 10_000,
+                   insert_rows: int = 100, repeat: int = 5, seed: int = 0) -> List[BenchmarkResult]:
+    """
+    Run the benchmarks on synthetic data in each of the backends
+
+    Args:
+        backends: Backends to benchmark, some of BACKENDS
+        n_rows: Number of rows of the synthetic data
+        n_features: Number of features of the synthetic feature view
+        value_types: Value types of the features, repeated in turns
+        key_cardinality: Number of distinct keys, if None, each row has a distinct key
+        null_rate: Fraction of missing feature values
+        n_key_values: Number of key values selected by the select_by_key benchmark
+        n_entity_rows: Number of entity rows of the add_features_to_dataframe benchmark
+        insert_rows: Number of rows inserted by the insert benchmark
+        repeat: Number of timed runs of each benchmark
+        seed: Seed of the synthetic data and of the sampled keys
+
+    Returns:
+        Results of the benchmarks
+    """
+    features = generate_features(n_features, value_types)
+    data = generate_data([_JOIN_KEY], features, n_rows, key_cardinality, null_rate, seed=seed)
+    results = []
+    with tempfile.TemporaryDirectory(prefix='snax_benchmark_') as temp_dir:
+        for backend in backends:
+            repo_path = create_benchmark_repo(backend, data, features, Path(temp_dir) / backend.replace('-', '_'))
+            feature_store = FeatureStore(str(repo_path))
+            results.extend(_run_backend_benchmarks(backend, feature_store, data, n_key_values, n_entity_rows,
+                                                   insert_rows, repeat, seed))
+    return results
+
+
+def results_to_dict(results: List[BenchmarkResult], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Machine-readable results with the configuration of the run and the versions of the environment"""
+    return {
+        'version': RESULTS_FORMAT_VERSION,
+        'config': config or dict(),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'pandas': pd.__version__, 'numpy': np.__version__},
+        'results': [result.to_dict() for result in results]
+    }
+
+
+def compare_to_baseline(results: List[BenchmarkResult], baseline: Dict[str, Any],
+                        tolerance: float = 0.2) -> List[BenchmarkComparison]:
+    """
+    Compare the median latency and the peak memory of the benchmarks with the baseline
+
+    Args:
+        results: Current results
+        baseline: Results of a previous run, as returned by `results_to_dict`
+        tolerance: Relative increase of a metric above which the benchmark regressed
+
+    Returns:
+        Comparisons of the benchmarks present in both the results and the baseline
+    """
+    baseline_results = {(result['name'], result['backend']): result for result in baseline['results']}
+    comparisons = []
+    for result in results:
+        baseline_result = baseline_results.get((result.name, result.backend))
+        if baseline_result is None:
+            continue
+        current_result = result.to_dict()
+        for metric in _COMPARED_METRICS:
+            comparisons.append(BenchmarkComparison(result.name, result.backend, metric, baseline_result[metric],
+                                                   current_result[metric], tolerance))
+    return comparisons
+
+
+def _format_results(results: List[BenchmarkResult]) -> str:
+    lines = [f'{"benchmark":<26} {"backend":<10} {"rows/s":>12} {"p50 [ms]":>10} {"p90 [ms]":>10} '
+             f'{"p99 [ms]":>10} {"peak [MiB]":>10}']
+    for result in results:
+        lines.append(f'{result.name:<26} {result.backend:<10} {result.throughput:>12.0f} '
+                     f'{result.latency_percentile(50) * 1000:>10.2f} {result.latency_percentile(90) * 1000:>10.2f} '
+                     f'{result.latency_percentile(99) * 1000:>10.2f} {result.peak_memory / 2 ** 20:>10.2f}')
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark snax on synthetic data')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=BACKENDS)
+    parser.add_argument('--rows', type=int, default=100_000, help='Number of rows of the synthetic data')
+    parser.add_argument('--features', type=int, default=10, help='Number of features of the synthetic view')
+    parser.add_argument('--value-types', nargs='+', default=[value_type.name for value_type in DEFAULT_VALUE_TYPES],
+                        choices=[value_type.name for value_type in ValueType], help='Value types of the features')
+    parser.add_argument('--key-cardinality', type=int, default=None,
+                        help='Number of distinct keys, each row has a distinct key by default')
+    parser.add_argument('--null-rate', type=float, default=0.1, help='Fraction of missing feature values')
+    parser.add_argument('--key-values', type=int, default=100, help='Number of key values selected by key')
+    parser.add_argument('--entity-rows', type=int, default=10_000, help='Number of entity rows to add features to')
+    parser.add_argument('--insert-rows', type=int, default=100, help='Number of inserted rows')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs of each benchmark')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Path to write the results as JSON to')
+    parser.add_argument('--baseline', help='Path of results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Relative increase of the median latency or peak memory considered a regression')
+    arguments = parser.parse_args(argv)
+
+    config = {'backends': arguments.backends, 'rows': arguments.rows, 'features': arguments.features,
+              'value_types': arguments.value_types, 'key_cardinality': arguments.key_cardinality,
+              'null_rate': arguments.null_rate, 'key_values': arguments.key_values,
+              'entity_rows': arguments.entity_rows, 'insert_rows': arguments.insert_rows,
+              'repeat': arguments.repeat, 'seed': arguments.seed}
+    results = run_benchmarks(arguments.backends, arguments.rows, arguments.features,
+                             [ValueType[value_type] for value_type in arguments.value_types],
+                             arguments.key_cardinality, arguments.null_rate, arguments.key_values,
+                             arguments.entity_rows, arguments.insert_rows, arguments.repeat, arguments.seed)
+    print(_format_results(results))
+
+    if arguments.output is not None:
+        Path(arguments.output).write_text(json.dumps(results_to_dict(results, config), indent=2))
+
+    if arguments.baseline is None:
+        return 0
+    baseline = json.loads(Path(arguments.baseline).read_text())
+    if baseline.get('config') != config:
+        print(f'Warning: the baseline was run with another configuration {baseline.get("config")}', file=sys.stderr)
+    comparisons = compare_to_baseline(results, baseline, arguments.tolerance)
+    print()
+    print('\n'.join(str(comparison) for comparison in comparisons))
+    return 1 if any(comparison.is_regression for comparison in comparisons) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
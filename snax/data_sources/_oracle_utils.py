@@ -1,4 +1,5 @@
 import logging
+import time
 from typing import List, Dict, Optional
 
 import numpy as np
@@ -9,9 +10,22 @@ from sqlalchemy.engine import Engine
 from sqlalchemy.exc import DatabaseError
 from sqlalchemy.sql.type_api import TypeEngine
 
+from snax.data_sources.sql_statements import record_fetch, recorded_fetch
+
 logger = logging.getLogger(__name__)
 
 
+def read_sql(sql: str, engine: Engine) -> pd.DataFrame:
+    """Like pd.read_sql, reports the rows fetched and the time of fetching them to the engine's statement recorders"""
+    with engine.connect() as connection:
+        with recorded_fetch():
+            result = connection.exec_driver_sql(sql)
+        start = time.perf_counter()
+        rows = result.fetchall()
+        record_fetch(connection, len(rows), time.perf_counter() - start)
+        return pd.DataFrame.from_records(rows, columns=list(result.keys()), coerce_float=True)
+
+
 def ensure_table_exists(table: str, schema: str, engine: Engine):
     """Checks if schema.table exists in the Oracle DB and creates it if it doesn't"""
     query = f'SELECT * FROM {schema}.{table}'
@@ -118,10 +132,10 @@ def get_data_subset_in_db(data: pd.DataFrame, colnames: List[str], table: str, s
     """Returns subset of data[colnames] that already exist in the Oracle DB"""
     colnames_separated_by_comma = ', '.join(colnames)
     value_tuples_separated_by_comma = pd_dataframe_to_comma_separated_tuples(data[colnames])
-    data_in_db = pd.read_sql(
+    data_in_db = read_sql(
         sql=f'SELECT {colnames_separated_by_comma} FROM {schema}.{table} ' \
             f'WHERE ({colnames_separated_by_comma}) IN ({value_tuples_separated_by_comma})',
-        con=engine
+        engine=engine
     )
     return data_in_db
 
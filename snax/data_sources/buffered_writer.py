@@ -0,0 +1,179 @@
+import threading
+import time
+from typing import List, Optional, Dict, Tuple, Set
+
+import pandas as pd
+
+from snax.column_like import ColumnLike, get_features_names
+from snax.data_sources.data_source_base import DataSourceBase, _VALID_IF_EXISTS_OPTIONS
+
+DEFAULT_MAX_BUFFERED_ROWS = 10_000
+DEFAULT_MAX_DELAY = 1.
+
+_InsertSignature = Tuple[Tuple[str, ...], Tuple[str, ...], str]
+
+
+class BufferedWriter:
+    """
+    Write-behind buffer for frequent small inserts into a data source, the inserts are accumulated in memory,
+    merged by key and written as a single bulk insert per run of consecutive inserts with the same key, columns
+    and if_exists, in the order they were buffered
+
+    The buffer is flushed when it holds max_buffered_rows rows, max_delay seconds after the first buffered insert,
+    on `flush` and on `close`. Rows of the same key inserted before a flush are merged as if they were inserted
+    one by one: with if_exists='replace' the last write wins, with 'ignore' the first write wins and with 'error'
+    the insert of a duplicated key raises ValueError immediately. The buffered inserts are taken out of the buffer
+    and written outside its lock, so inserting doesn't wait for the data source. If the data source's insert fails,
+    the failed insert is dropped, the following inserts are still written and the error is raised afterwards
+
+    Args:
+        data_source: Data source to write to
+        max_buffered_rows: Number of buffered rows that triggers a flush
+        max_delay: Maximal time in seconds the inserts stay buffered, None to flush only on size or explicitly
+    """
+
+    def __init__(self, data_source: DataSourceBase, max_buffered_rows: int = DEFAULT_MAX_BUFFERED_ROWS,
+                 max_delay: Optional[float] = DEFAULT_MAX_DELAY):
+        self._data_source = data_source
+        self._max_buffered_rows = max_buffered_rows
+        self._max_delay = max_delay
+        # Runs of consecutive inserts with the same signature, in the order they were buffered
+        self._buffers: List[Tuple[_InsertSignature, List[pd.DataFrame]]] = []
+        # Keys buffered by inserts with if_exists='error', to detect duplicated keys before the flush
+        self._buffered_keys: Dict[_InsertSignature, Set[Tuple]] = dict()
+        self._buffered_rows = 0
+        self._first_insert_time: Optional[float] = None
+        self._flush_error: Optional[Exception] = None
+        self._lock = threading.RLock()
+        # Serializes the writes of flushes, so that the inserts are written in the order they were buffered
+        self._write_lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._closed = False
+        self._flush_thread: Optional[threading.Thread] = None
+        if max_delay is not None:
+            self._flush_thread = threading.Thread(target=self._flush_periodically, name='snax-buffered-writer',
+                                                  daemon=True)
+            self._flush_thread.start()
+
+    def __repr__(self):
+        return f'BufferedWriter(data_source={self._data_source.name}, buffered_rows={self._buffered_rows})'
+
+    def __enter__(self) -> 'BufferedWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def data_source(self) -> DataSourceBase:
+        return self._data_source
+
+    @property
+    def buffered_rows(self) -> int:
+        return self._buffered_rows
+
+    def insert(self, key: List[ColumnLike], columns: List[ColumnLike], data: pd.DataFrame, if_exists: str = 'error'):
+        """
+        Buffer the insert, see `DataSourceBase.insert` for the arguments
+        Errors of the data source's inserts in background flushes are raised by the next call of insert or flush
+        """
+        if if_exists not in _VALID_IF_EXISTS_OPTIONS:
+            raise ValueError(f'if_exists must be one of {_VALID_IF_EXISTS_OPTIONS}')
+
+        string_key = get_features_names(key)
+        string_columns = get_features_names(columns)
+        signature = (tuple(string_key), tuple(string_columns), if_exists)
+        data = data[string_key + string_columns]
+
+        with self._lock:
+            if self._closed:
+                raise ValueError('Cannot insert into a closed BufferedWriter')
+            self._raise_flush_error()
+
+            if if_exists == 'error':
+                buffered_keys = self._buffered_keys.setdefault(signature, set())
+                keys = list(data[string_key].itertuples(index=False, name=None))
+                if len(set(keys)) < len(keys) or not buffered_keys.isdisjoint(keys):
+                    raise ValueError('Some of the inserted data already exists in the buffer')
+                buffered_keys.update(keys)
+            if len(self._buffers) > 0 and self._buffers[-1][0] == signature:
+                self._buffers[-1][1].append(data)
+            else:
+                self._buffers.append((signature, [data]))
+
+            self._buffered_rows += len(data)
+            if self._first_insert_time is None:
+                self._first_insert_time = time.monotonic()
+                self._condition.notify()
+            is_full = self._buffered_rows >= self._max_buffered_rows
+        if is_full:
+            self._flush()
+
+    def flush(self):
+        """Write all the buffered inserts to the data source"""
+        with self._lock:
+            self._raise_flush_error()
+        self._flush()
+
+    def close(self):
+        """Flush the buffer and stop the background flushing"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+        self.flush()
+
+    def _take_buffers(self) -> List[Tuple[_InsertSignature, List[pd.DataFrame]]]:
+        with self._lock:
+            buffers, self._buffers = self._buffers, []
+            self._buffered_keys = dict()
+            self._buffered_rows = 0
+            self._first_insert_time = None
+        return buffers
+
+    def _flush(self):
+        flush_error = None
+        with self._write_lock:
+            for signature, buffer in self._take_buffers():
+                key, columns, if_exists = signature
+                data = pd.concat(buffer, ignore_index=True)
+                # Only the rows that would be in the data source after inserting them one by one
+                data = data.drop_duplicates(subset=list(key), keep='first' if if_exists == 'ignore' else 'last')
+                try:
+                    self._data_source.insert(key=list(key), columns=list(columns), data=data, if_exists=if_exists)
+                except Exception as exception:
+                    # The failed insert is dropped, retrying it would block the following inserts for good
+                    if flush_error is None:
+                        flush_error = exception
+        if flush_error is not None:
+            raise flush_error
+
+    def _raise_flush_error(self):
+        if self._flush_error is not None:
+            flush_error, self._flush_error = self._flush_error, None
+            raise flush_error
+
+    def _wait_for_flush(self) -> bool:
+        """Wait until the first buffered insert is max_delay seconds old, False once the writer is closed"""
+        with self._lock:
+            while not self._closed:
+                if self._first_insert_time is None:
+                    self._condition.wait()
+                    continue
+
+                remaining_delay = self._first_insert_time + self._max_delay - time.monotonic()
+                if remaining_delay <= 0:
+                    return True
+                self._condition.wait(remaining_delay)
+            return False
+
+    def _flush_periodically(self):
+        while self._wait_for_flush():
+            try:
+                self._flush()
+            except Exception as exception:
+                with self._lock:
+                    self._flush_error = exception
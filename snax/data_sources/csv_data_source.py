@@ -1,5 +1,5 @@
 import os
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Hashable
 
 import pandas as pd
 
@@ -21,6 +21,10 @@ class CsvDataSource(InMemoryDataSource):
     def separator(self) -> str:
         return self._separator
 
+    @property
+    def storage_key(self) -> Hashable:
+        return 'csv', os.path.abspath(self._csv_file_path), self._separator
+
     def _load_data(self) -> pd.DataFrame:
         if os.path.exists(self._csv_file_path):
             data = pd.read_csv(self.csv_file_path, sep=self.separator)
@@ -37,6 +41,12 @@ class CsvDataSource(InMemoryDataSource):
 
         return super()._select(columns=columns, where_sql_query=where_sql_query)
 
+    def _has_key_index(self, key: List[str]) -> bool:
+        if self._data is None:
+            self._load_data()
+
+        return super()._has_key_index(key)
+
     def _insert(self, key: List[str], columns: List[str], data: pd.DataFrame, if_exists: str = 'error'):
         if self._data is None:
             self._load_data()
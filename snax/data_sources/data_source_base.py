@@ -1,12 +1,36 @@
+import time
 from abc import ABC
-from typing import Optional, Dict, List
+from datetime import datetime
+from typing import Optional, Dict, List, Hashable, Tuple
 
 import pandas as pd
 
+from snax import tracing
+from snax.metrics import REGISTRY
+from snax.async_executor import run_blocking
 from snax.column_like import ColumnLike, get_features_names
 
 _VALID_IF_EXISTS_OPTIONS = ['error', 'ignore', 'replace']
 
+_SELECT_SECONDS = REGISTRY.histogram('snax_data_source_select_seconds', 'Latency of data source selects',
+                                     ['source'])
+_ROWS_READ = REGISTRY.counter('snax_data_source_rows_read_total', 'Rows selected from data sources', ['source'])
+_BYTES_READ = REGISTRY.counter('snax_data_source_read_bytes_total', 'Bytes of the data selected from data sources',
+                               ['source'])
+_INSERT_SECONDS = REGISTRY.histogram('snax_data_source_insert_seconds', 'Latency of data source inserts',
+                                     ['source'])
+_ROWS_WRITTEN = REGISTRY.counter('snax_data_source_rows_written_total', 'Rows inserted into data sources',
+                                 ['source'])
+_BYTES_WRITTEN = REGISTRY.counter('snax_data_source_written_bytes_total',
+                                  'Bytes of the data inserted into data sources', ['source'])
+
+
+def record_select_metrics(source_name: str, duration: float, rows: int, selected_bytes: int):
+    """Update the select metrics of the data source, for selects bypassing `DataSourceBase.select`"""
+    _SELECT_SECONDS.labels(source=source_name).observe(duration)
+    _ROWS_READ.labels(source=source_name).inc(rows)
+    _BYTES_READ.labels(source=source_name).inc(selected_bytes)
+
 
 class DataSourceBase(ABC):
     """
@@ -53,21 +77,87 @@ class DataSourceBase(ABC):
     def tags(self) -> Dict:
         return self._tags
 
+    @property
+    def storage_key(self) -> Hashable:
+        """Identifies the underlying storage, data sources with equal storage keys read the same data"""
+        return id(self)
+
     def select(self, columns: Optional[List[ColumnLike]] = None, key: Optional[List[ColumnLike]] = None,
-               key_values: Optional[pd.DataFrame] = None, where_sql_query: Optional[str] = None) -> pd.DataFrame:
+               key_values: Optional[pd.DataFrame] = None, where_sql_query: Optional[str] = None,
+               timestamp_field: Optional[ColumnLike] = None, start: Optional[datetime] = None,
+               end: Optional[datetime] = None) -> pd.DataFrame:
         """
         Select a subset of the underlying data
         This can be done either by specifying the key and key_values or by specifying the where_sql_query
+        Either of them can be further restricted to a time range of the timestamp_field
 
         Args:
             columns: Entities, Features or feature names to select, if None, all columns are selected
             key: List of column names giving unique constraint on a row in the data source
             key_values: Data frame with the key values
             where_sql_query: Optional filter query to apply to the selection, for now language depends on the data source
+            timestamp_field: Feature or feature name with the time of the row, used together with start and end
+            start: Optional inclusive lower bound of the timestamp_field
+            end: Optional inclusive upper bound of the timestamp_field
+                Data sources that can't filter by time natively may return rows outside of the time range
 
         Returns:
             A DataFrame containing the selected data
         """
+        start_counter = time.perf_counter()
+        with tracing.span('data_source.select', source=self.name) as span:
+            key_index_arguments = self._key_index_select_arguments(columns, key, key_values, where_sql_query,
+                                                                   start, end)
+            if key_index_arguments is not None:
+                with tracing.span('data_source.backend_select', source=self.name, key_index=True):
+                    selected_data = self._select_by_key_index(*key_index_arguments)
+            else:
+                with tracing.span('data_source.build_query', source=self.name):
+                    string_columns, where_sql_query = self._prepare_select(
+                        columns, key, key_values, where_sql_query, timestamp_field, start, end)
+                with tracing.span('data_source.backend_select', source=self.name, key_index=False):
+                    selected_data = self._select(string_columns, where_sql_query)
+            selected_data = selected_data.rename(columns=self._field_mapping)
+            self._record_select(span, time.perf_counter() - start_counter, key_values, selected_data)
+        return selected_data
+
+    async def select_async(self, columns: Optional[List[ColumnLike]] = None, key: Optional[List[ColumnLike]] = None,
+                           key_values: Optional[pd.DataFrame] = None, where_sql_query: Optional[str] = None,
+                           timestamp_field: Optional[ColumnLike] = None, start: Optional[datetime] = None,
+                           end: Optional[datetime] = None) -> pd.DataFrame:
+        """Asyncio counterpart of `select`, see its documentation for the arguments"""
+        start_counter = time.perf_counter()
+        with tracing.span('data_source.select', source=self.name) as span:
+            key_index_arguments = self._key_index_select_arguments(columns, key, key_values, where_sql_query,
+                                                                   start, end)
+            if key_index_arguments is not None:
+                with tracing.span('data_source.backend_select', source=self.name, key_index=True):
+                    selected_data = await run_blocking(self._select_by_key_index, *key_index_arguments)
+            else:
+                with tracing.span('data_source.build_query', source=self.name):
+                    string_columns, where_sql_query = self._prepare_select(
+                        columns, key, key_values, where_sql_query, timestamp_field, start, end)
+                with tracing.span('data_source.backend_select', source=self.name, key_index=False):
+                    selected_data = await self._select_async(string_columns, where_sql_query)
+            selected_data = selected_data.rename(columns=self._field_mapping)
+            self._record_select(span, time.perf_counter() - start_counter, key_values, selected_data)
+        return selected_data
+
+    def _record_select(self, span: tracing.AnySpan, duration: float, key_values: Optional[pd.DataFrame],
+                       selected_data: pd.DataFrame):
+        """Update the select metrics and the attributes of the select's span"""
+        selected_bytes = tracing.dataframe_bytes(selected_data)
+        record_select_metrics(self.name, duration, len(selected_data), selected_bytes)
+        if span.is_recording:
+            span.set_attributes(source_type=type(self).__name__,
+                                key_values=len(key_values) if key_values is not None else None,
+                                rows=len(selected_data), columns=len(selected_data.columns), bytes=selected_bytes)
+
+    def _prepare_select(self, columns: Optional[List[ColumnLike]], key: Optional[List[ColumnLike]],
+                        key_values: Optional[pd.DataFrame], where_sql_query: Optional[str],
+                        timestamp_field: Optional[ColumnLike], start: Optional[datetime],
+                        end: Optional[datetime]) -> Tuple[Optional[List[str]], Optional[str]]:
+        """Validate arguments of select and translate them to the underlying column names and a filter query"""
         if (key is not None or key_values is not None) and where_sql_query is not None:
             raise ValueError('Cannot specify both key, key_values and where_sql_query')
         if (key is None and key_values is not None) or (key is not None and key_values is None):
@@ -77,10 +167,29 @@ class DataSourceBase(ABC):
             string_key = self._column_likes_to_colnames(key)
             where_sql_query = self._where_sql_query_from_key_values(string_key, key_values)
 
+        if timestamp_field is not None and (start is not None or end is not None):
+            string_timestamp_field = self._column_likes_to_colnames([timestamp_field])[0]
+            time_range_query = self._where_sql_query_from_time_range(string_timestamp_field, start, end)
+            if time_range_query is not None:
+                where_sql_query = time_range_query if where_sql_query is None \
+                    else f'({where_sql_query}) and ({time_range_query})'
+
         string_columns = self._column_likes_to_colnames(columns)
-        selected_data = self._select(string_columns, where_sql_query)
-        selected_data.rename(columns=self._field_mapping, inplace=True)
-        return selected_data
+        return string_columns, where_sql_query
+
+    def _key_index_select_arguments(self, columns: Optional[List[ColumnLike]], key: Optional[List[ColumnLike]],
+                                    key_values: Optional[pd.DataFrame], where_sql_query: Optional[str],
+                                    start: Optional[datetime], end: Optional[datetime]) \
+            -> Optional[Tuple[Optional[List[str]], List[str], pd.DataFrame]]:
+        """Arguments of `_select_by_key_index` if the select can use the data source's key index, otherwise None"""
+        if key is None or key_values is None or where_sql_query is not None or start is not None or end is not None:
+            return None
+
+        string_key = self._column_likes_to_colnames(key)
+        if not self._has_key_index(string_key):
+            return None
+        return self._column_likes_to_colnames(columns), string_key, key_values.rename(
+            columns=self._inverse_field_mapping)
 
     def insert(self, key: List[ColumnLike], columns: List[ColumnLike], data: pd.DataFrame, if_exists: str = 'error'):
         """
@@ -97,32 +206,87 @@ class DataSourceBase(ABC):
         Returns:
             None
         """
+        start_counter = time.perf_counter()
+        with tracing.span('data_source.insert', source=self.name, rows=len(data)) as span:
+            inserted_bytes = tracing.dataframe_bytes(data)
+            if span.is_recording:
+                span.set_attributes(source_type=type(self).__name__, bytes=inserted_bytes)
+            insert_arguments = self._prepare_insert(key, columns, data, if_exists)
+            with tracing.span('data_source.backend_insert', source=self.name):
+                self._insert(*insert_arguments)
+        self._record_insert(time.perf_counter() - start_counter, len(data), inserted_bytes)
+
+    async def insert_async(self, key: List[ColumnLike], columns: List[ColumnLike], data: pd.DataFrame,
+                           if_exists: str = 'error'):
+        """Asyncio counterpart of `insert`, see its documentation for the arguments"""
+        start_counter = time.perf_counter()
+        with tracing.span('data_source.insert', source=self.name, rows=len(data)) as span:
+            inserted_bytes = tracing.dataframe_bytes(data)
+            if span.is_recording:
+                span.set_attributes(source_type=type(self).__name__, bytes=inserted_bytes)
+            insert_arguments = self._prepare_insert(key, columns, data, if_exists)
+            with tracing.span('data_source.backend_insert', source=self.name):
+                await self._insert_async(*insert_arguments)
+        self._record_insert(time.perf_counter() - start_counter, len(data), inserted_bytes)
+
+    def _record_insert(self, duration: float, rows: int, inserted_bytes: int):
+        _INSERT_SECONDS.labels(source=self.name).observe(duration)
+        _ROWS_WRITTEN.labels(source=self.name).inc(rows)
+        _BYTES_WRITTEN.labels(source=self.name).inc(inserted_bytes)
+
+    def _prepare_insert(self, key: List[ColumnLike], columns: List[ColumnLike], data: pd.DataFrame,
+                        if_exists: str) -> Tuple[List[str], List[str], pd.DataFrame, str]:
         if if_exists not in _VALID_IF_EXISTS_OPTIONS:
             raise ValueError(f'if_exists must be one of {_VALID_IF_EXISTS_OPTIONS}')
 
         string_key = self._column_likes_to_colnames(key)
         string_columns = self._column_likes_to_colnames(columns)
-        self._insert(string_key, string_columns, data.rename(columns=self._inverse_field_mapping), if_exists)
+        return string_key, string_columns, data.rename(columns=self._inverse_field_mapping), if_exists
 
     def _where_sql_query_from_key_values(self, key: List[str], key_values: pd.DataFrame) -> str:
         raise NotImplementedError('Has to be overridden by subclass')
 
+    def _where_sql_query_from_time_range(self, timestamp_field: str, start: Optional[datetime],
+                                         end: Optional[datetime]) -> Optional[str]:
+        """Filter query for rows with timestamp_field in [start, end], None if the data source can't filter by time"""
+        return None
+
+    def _has_key_index(self, key: List[str]) -> bool:
+        """Whether the data source can select rows by values of the key directly, without a filter query"""
+        return False
+
+    def _select_by_key_index(self, columns: Optional[List[str]], key: List[str],
+                             key_values: pd.DataFrame) -> pd.DataFrame:
+        raise NotImplementedError('Has to be overridden by subclasses with a key index')
+
     def _select(self, columns: Optional[List[str]] = None, where_sql_query: Optional[str] = None) -> pd.DataFrame:
         raise NotImplementedError('Has to be overridden by subclass')
 
     def _insert(self, key: List[str], columns: List[str], data: pd.DataFrame, if_exists: str = 'error'):
         raise NotImplementedError('Has to be overridden by subclass')
 
+    async def _select_async(self, columns: Optional[List[str]] = None,
+                            where_sql_query: Optional[str] = None) -> pd.DataFrame:
+        """Runs the blocking `_select` on the async executor, backends with async drivers can override it"""
+        return await run_blocking(self._select, columns, where_sql_query)
+
+    async def _insert_async(self, key: List[str], columns: List[str], data: pd.DataFrame, if_exists: str = 'error'):
+        """Runs the blocking `_insert` on the async executor, backends with async drivers can override it"""
+        await run_blocking(self._insert, key, columns, data, if_exists)
+
     @property
     def _inverse_field_mapping(self) -> Dict:
         if not hasattr(self, '_inverse_field_mapping_') or self._inverse_field_mapping_ is None:
             self._inverse_field_mapping_ = {value: key for key, value in self.field_mapping.items()}
         return self._inverse_field_mapping_
 
+    def get_column_names(self, column_likes: List[ColumnLike]) -> List[str]:
+        """Names of the source's columns of the features, after the field mapping"""
+        feature_names = get_features_names(column_likes)
+        return [self._inverse_field_mapping.get(name, name) for name in feature_names]
+
     def _column_likes_to_colnames(self, column_likes: List[ColumnLike]):
         if column_likes is None:
             return None
 
-        feature_names = get_features_names(column_likes)
-        column_names = list(map(lambda name: self._inverse_field_mapping.get(name, name), feature_names))
-        return column_names
+        return self.get_column_names(column_likes)
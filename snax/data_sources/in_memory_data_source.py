@@ -1,8 +1,12 @@
-from typing import Optional, Dict, List, Any
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Union
 
+import numpy as np
 import pandas as pd
 
 from snax.data_sources.data_source_base import DataSourceBase
+from snax.shared_memory import SharedTableReader
+from snax.snapshot import Snapshot, EncodedData
 
 
 def escape(value: Any) -> str:
@@ -12,22 +16,102 @@ def escape(value: Any) -> str:
 
 
 class InMemoryDataSource(DataSourceBase):
+    """
+    Data source with the data in a data frame, or read-only in a snapshot (see `snax.snapshot`) memory mapped
+    or in shared memory published by SharedMemoryPublisher (see `snax.shared_memory`), so that processes reading
+    the same snapshot or shared memory share its data
+
+    Args:
+        name: Name of the data source
+        data: Data of the data source
+        field_mapping: A mapping from field names in this data source to feature names
+        tags: Tags for the data source
+        snapshot_path: Directory of a snapshot with the data, instead of the data frame
+        shared_memory_name: Name the data is published under in shared memory, instead of the data frame,
+            the selects always read the latest published data
+    """
+
     def __init__(self, name: str, data: Optional[pd.DataFrame] = None, field_mapping: Optional[Dict[str, str]] = None,
-                 tags: Optional[Dict] = None):
+                 tags: Optional[Dict] = None, snapshot_path: Optional[Union[str, Path]] = None,
+                 shared_memory_name: Optional[str] = None):
         super().__init__(name=name, field_mapping=field_mapping, tags=tags)
+        if sum(argument is not None for argument in [data, snapshot_path, shared_memory_name]) > 1:
+            raise ValueError('Only one of data, snapshot_path and shared_memory_name can be specified')
         self._data = data
+        self._snapshot = Snapshot(snapshot_path) if snapshot_path is not None else None
+        self._shared_table_reader = SharedTableReader(shared_memory_name) if shared_memory_name is not None else None
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        return self._snapshot
+
+    def _encoded_data(self) -> Optional[EncodedData]:
+        """Read-only snapshot or shared memory data, None if the data are in a data frame"""
+        if self._shared_table_reader is not None:
+            return self._shared_table_reader.get_table()
+        return self._snapshot
 
     def _select(self, columns: Optional[List[str]] = None, where_sql_query: Optional[str] = None) -> pd.DataFrame:
-        data_subset = self._data.copy()
+        encoded_data = self._encoded_data()
+        if encoded_data is not None:
+            if where_sql_query is None:
+                return encoded_data.take(columns=columns)
+            data_subset = encoded_data.take().query(where_sql_query)
+            return data_subset.loc[:, columns] if columns is not None else data_subset
+
+        # Filter before copying, so that only the selected subset is copied
+        data_subset = self._data
         if where_sql_query is not None:
             data_subset = data_subset.query(where_sql_query)
 
         if columns is not None:
             return data_subset.loc[:, columns]
+        elif data_subset is self._data:
+            return data_subset.copy()
         else:
             return data_subset
 
+    def _has_key_index(self, key: List[str]) -> bool:
+        encoded_data = self._encoded_data()
+        if encoded_data is not None:
+            return encoded_data.key == key
+        return self._data is not None and all(key_ in self._data for key_ in key)
+
+    def _select_by_key_index(self, columns: Optional[List[str]], key: List[str],
+                             key_values: pd.DataFrame) -> pd.DataFrame:
+        encoded_data = self._encoded_data()
+        if encoded_data is None:
+            matching_rows = self._rows_matching_key_values(key, key_values)
+            if matching_rows is None:
+                return self._select(columns, self._where_sql_query_from_key_values(key, key_values))
+            # take rather than a boolean mask, so that the subset is not flagged as a copy of the data
+            data_subset = self._data.take(np.flatnonzero(matching_rows))
+            return data_subset.loc[:, columns] if columns is not None else data_subset
+
+        if encoded_data.key != key:
+            # Republished with another key since `_has_key_index` was checked
+            return self._select(columns, self._where_sql_query_from_key_values(key, key_values))
+        return encoded_data.take(encoded_data.lookup(key_values), columns)
+
+    def _rows_matching_key_values(self, key: List[str], key_values: pd.DataFrame) -> Optional[np.ndarray]:
+        """
+        Mask of the data's rows whose key matches some row of key_values, the same rows as the where query
+        from the key values selects, but without parsing a query that grows with the number of key values,
+        None if some key column's values are compared differently by the query (e.g. timestamps with strings)
+        """
+        for key_ in key:
+            kinds = {self._data[key_].dtype.kind, key_values[key_].dtype.kind}
+            if not (kinds <= set('biuf') or kinds == {'O'}):
+                return None
+
+        key_values = key_values[key].dropna()
+        if len(key) == 1:
+            return self._data[key[0]].isin(key_values[key[0]]).to_numpy()
+        return pd.MultiIndex.from_frame(self._data[key]).isin(pd.MultiIndex.from_frame(key_values))
+
     def _insert(self, key: List[str], columns: List[str], data: pd.DataFrame, if_exists: str = 'error'):
+        if self._data is None and (self._snapshot is not None or self._shared_table_reader is not None):
+            raise ValueError(f'Data source {self.name} is read-only')
         self._ensure_key_in_data(key)
         data_to_insert = data[key + columns].copy()
 
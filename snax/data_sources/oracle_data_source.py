@@ -1,14 +1,18 @@
 import logging
-from typing import Optional, Dict, List
+import time
+from datetime import datetime
+from typing import Optional, Dict, List, Hashable, Tuple
 
 import pandas as pd
 from pandas import MultiIndex
 from sqlalchemy.engine import Engine
 
+from snax import tracing
 from snax.data_sources._oracle_utils import drop_table, add_columns, upsert, get_data_subset_in_db, \
     add_unique_constraint, ensure_table_exists, get_colnames, ensure_columns_exist, \
-    pd_dataframe_to_comma_separated_tuples
-from snax.data_sources.data_source_base import DataSourceBase
+    pd_dataframe_to_comma_separated_tuples, read_sql
+from snax.data_sources.data_source_base import DataSourceBase, record_select_metrics
+from snax.data_sources.sql_statements import StatementRecorder, statement_source
 
 logger = logging.getLogger(__name__)
 
@@ -24,16 +28,43 @@ class OracleDataSource(DataSourceBase):
             table: Name of the table where the data is located
             field_mapping: A mapping from field names in this data source to feature names
             tags: Tags for the data source
+            statement_recorder: Optional recorder of the SQL statements, attached to the engine, the statements
+                of the data source are attributed to its name
     """
 
     def __init__(self, name: str, schema: str, table: str, engine: Engine,
-                 field_mapping: Optional[Dict[str, str]] = None, tags: Optional[Dict] = None):
+                 field_mapping: Optional[Dict[str, str]] = None, tags: Optional[Dict] = None,
+                 statement_recorder: Optional[StatementRecorder] = None):
         super().__init__(name=name, field_mapping=field_mapping, tags=tags)
         self._engine = engine
         self._schema = schema
         self._table = table
+        self._statement_recorder = statement_recorder
+        if statement_recorder is not None:
+            statement_recorder.attach(engine)
 
-        ensure_table_exists(self._table, self._schema, self._engine)
+        with statement_source(self.name):
+            ensure_table_exists(self._table, self._schema, self._engine)
+
+    @property
+    def engine(self) -> Engine:
+        return self._engine
+
+    @property
+    def schema(self) -> str:
+        return self._schema
+
+    @property
+    def table(self) -> str:
+        return self._table
+
+    @property
+    def statement_recorder(self) -> Optional[StatementRecorder]:
+        return self._statement_recorder
+
+    @property
+    def storage_key(self) -> Hashable:
+        return 'oracle', str(self._engine.url), self._schema.upper(), self._table.upper()
 
     def _select(self, columns: Optional[List[str]] = None, where_sql_query: Optional[str] = None) -> pd.DataFrame:
         joined_columns = ','.join(columns) if columns else '*'
@@ -41,41 +72,101 @@ class OracleDataSource(DataSourceBase):
         if where_sql_query:
             query += f' WHERE {where_sql_query}'
 
-        data = pd.read_sql(query, self._engine)
+        with statement_source(self.name):
+            data = read_sql(query, self._engine)
         return data
 
     def _insert(self, key: List[str], columns: List[str], data: pd.DataFrame, if_exists: str = 'error'):
-        ensure_columns_exist(key, data.dtypes.to_dict(), self._table, self._schema, self._engine)
-        add_unique_constraint(key, self._table, self._schema, self._engine)
-        data = data.copy()
+        with statement_source(self.name):
+            ensure_columns_exist(key, data.dtypes.to_dict(), self._table, self._schema, self._engine)
+            add_unique_constraint(key, self._table, self._schema, self._engine)
+            data = data.copy()
 
-        existing_key_values = MultiIndex.from_frame(
-            get_data_subset_in_db(data, key, self._table, self._schema, self._engine))
-        inserted_key_values = MultiIndex.from_frame(data[key])
+            existing_key_values = MultiIndex.from_frame(
+                get_data_subset_in_db(data, key, self._table, self._schema, self._engine))
+            inserted_key_values = MultiIndex.from_frame(data[key])
 
-        inserted_in_existing = [item in existing_key_values for item in inserted_key_values]
-        inserted_not_in_existing = [not item for item in inserted_in_existing]
-        existing_columns = get_colnames(self._table, self._schema, self._engine)
-        new_columns = [colname for colname in list(data.columns) if colname not in existing_columns]
+            inserted_in_existing = [item in existing_key_values for item in inserted_key_values]
+            inserted_not_in_existing = [not item for item in inserted_in_existing]
+            existing_columns = get_colnames(self._table, self._schema, self._engine)
+            new_columns = [colname for colname in list(data.columns) if colname not in existing_columns]
 
-        if if_exists == 'error':
-            common_existing_and_inserted_columns = (set(data.columns) - set(key)).intersection(existing_columns)
-            if any(inserted_in_existing) and len(common_existing_and_inserted_columns) > 0:
-                raise ValueError(f'Data already exists in {self._schema}.{self._table}')
+            if if_exists == 'error':
+                common_existing_and_inserted_columns = (set(data.columns) - set(key)).intersection(existing_columns)
+                if any(inserted_in_existing) and len(common_existing_and_inserted_columns) > 0:
+                    raise ValueError(f'Data already exists in {self._schema}.{self._table}')
 
-        if len(new_columns) > 0:
-            add_columns(new_columns, data, self._table, self._schema, self._engine)
-            upsert(key, new_columns, data, self._table, self._schema, self._engine)
+            if len(new_columns) > 0:
+                add_columns(new_columns, data, self._table, self._schema, self._engine)
+                upsert(key, new_columns, data, self._table, self._schema, self._engine)
 
-        if any(inserted_not_in_existing):
-            upsert(key, columns, data[inserted_not_in_existing], self._table, self._schema, self._engine)
+            if any(inserted_not_in_existing):
+                upsert(key, columns, data[inserted_not_in_existing], self._table, self._schema, self._engine)
 
-        if if_exists == 'replace' and any(inserted_in_existing):
-            upsert(key, columns, data[inserted_in_existing], self._table, self._schema, self._engine)
+            if if_exists == 'replace' and any(inserted_in_existing):
+                upsert(key, columns, data[inserted_in_existing], self._table, self._schema, self._engine)
 
     def _where_sql_query_from_key_values(self, key: List[str], key_values: pd.DataFrame) -> str:
         query = f"({', '.join(key)}) IN ({pd_dataframe_to_comma_separated_tuples(key_values)})"
         return query
 
+    def _where_sql_query_from_time_range(self, timestamp_field: str, start: Optional[datetime],
+                                         end: Optional[datetime]) -> Optional[str]:
+        conditions = []
+        if start is not None:
+            conditions.append(f"{timestamp_field} >= TIMESTAMP '{start:%Y-%m-%d %H:%M:%S.%f}'")
+        if end is not None:
+            conditions.append(f"{timestamp_field} <= TIMESTAMP '{end:%Y-%m-%d %H:%M:%S.%f}'")
+        return ' and '.join(conditions) or None
+
     def delete(self):
-        drop_table(self._table, self._schema, self._engine)
+        with statement_source(self.name):
+            drop_table(self._table, self._schema, self._engine)
+
+
+def select_joined(sources_columns: List[Tuple[OracleDataSource, List[str]]], key: List[str],
+                  key_values: pd.DataFrame) -> pd.DataFrame:
+    """
+    Select columns of several Oracle data sources on the same engine with a single statement, left joining their
+    tables on the key server-side
+
+    Args:
+        sources_columns: Data sources with feature names of the columns to select from them
+        key: Feature names of the key present in all the data sources
+        key_values: Data frame with the key values
+
+    Returns:
+        Data frame with the key and all selected columns, one row per key value found in any of the data sources
+    """
+    start_counter = time.perf_counter()
+    engine = sources_columns[0][0].engine
+
+    # The key values found in any of the tables are selected once, each table is joined to them. Each branch of
+    # the union filters its table by the key values, so that only the requested keys are read
+    key_tuples = pd_dataframe_to_comma_separated_tuples(key_values[key])
+    key_queries = []
+    select_columns = [f'snax_keys.{key_} AS {key_}' for key_ in key]
+    joins = []
+    for source_number, (source, columns) in enumerate(sources_columns):
+        alias = f'snax_t{source_number}'
+        table = f'{source.schema}.{source.table}'
+        source_key = source.get_column_names(key)
+        source_columns = source.get_column_names(columns)
+
+        key_queries.append(
+            f'SELECT {", ".join(f"{source_key_} AS {key_}" for source_key_, key_ in zip(source_key, key))} '
+            f'FROM {table} WHERE ({", ".join(source_key)}) IN ({key_tuples})')
+        condition = ' AND '.join(f'{alias}.{source_key_} = snax_keys.{key_}' for source_key_, key_ in zip(source_key, key))
+        joins.append(f'LEFT JOIN {table} {alias} ON {condition}')
+        select_columns += [f'{alias}.{source_column} AS {column}'
+                           for source_column, column in zip(source_columns, columns)]
+
+    query = f'WITH snax_keys AS ({" UNION ".join(key_queries)}) ' \
+            f'SELECT {", ".join(select_columns)} FROM snax_keys {" ".join(joins)}'
+    # The metrics and statements of joined selects are attributed to the names of all the joined data sources
+    joined_source_name = '+'.join(source.name for source, _ in sources_columns)
+    with statement_source(joined_source_name):
+        selected_data = read_sql(query, engine)
+    record_select_metrics(joined_source_name, time.perf_counter() - start_counter, len(selected_data),
+                          tracing.dataframe_bytes(selected_data))
+    return selected_data
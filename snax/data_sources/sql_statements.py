@@ -0,0 +1,339 @@
+"""
+Recording of the SQL statements run by SQL data sources, to find the statements and data sources that load
+the database
+
+A `StatementRecorder` attached to an engine (e.g. by `OracleDataSource(..., statement_recorder=recorder)`) times
+every statement run on it. Statements are aggregated by their normalized text, with literal values replaced by ?
+and lists of key values collapsed, and by the data source that ran them. Statements slower than the recorder's
+threshold are logged as warnings
+"""
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Dict, Tuple, Any, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, Connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_THRESHOLD = 1.
+DEFAULT_MAX_STATEMENTS = 1000
+OTHER_STATEMENTS = '<other statements>'
+
+_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|(?<![\w.:])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?(?!\w)")
+_NULL_PATTERN = re.compile(r'(?:(?<=\()|(?<=,)|(?<=, ))null\b', re.IGNORECASE)
+_REPEATED_TUPLES_PATTERN = re.compile(r'\((\?(?:, \?)*)\)(?:, \(\1\))+')
+_REPEATED_VALUES_PATTERN = re.compile(r'\bIN \(\?(?:, \?)+\)', re.IGNORECASE)
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+_TABLE_COLUMNS = [('source', 20), ('statement', 60), ('executions', 10), ('total [ms]', 10), ('execute [ms]', 12),
+                  ('fetch [ms]', 10), ('max [ms]', 9), ('rows', 9), ('slow', 5), ('errors', 6)]
+_SORT_KEYS = ['total_time', 'execute_time', 'fetch_time', 'max_time', 'executions', 'rows', 'binds']
+
+_statement_source: ContextVar[Optional[str]] = ContextVar('snax_statement_source', default=None)
+# If the rows of the statements run in the context are fetched and reported by `record_fetch`
+_fetch_recorded: ContextVar[bool] = ContextVar('snax_fetch_recorded', default=False)
+# Keys of the DBAPI connection's info dict with the state of the recorders between the engine's events
+_STARTS_KEY = 'snax_statement_starts'
+_PENDING_FETCHES_KEY = 'snax_pending_fetches'
+
+
+def normalize_sql(sql: str) -> Tuple[str, int]:
+    """
+    Replace literal values of the statement by ?, collapse repeated key tuples and value lists and whitespace
+
+    Args:
+        sql: SQL statement
+
+    Returns:
+        The normalized statement and the number of literal values it contained
+    """
+    normalized_sql, n_literals = _LITERAL_PATTERN.subn('?', sql)
+    normalized_sql, n_nulls = _NULL_PATTERN.subn('?', normalized_sql)
+    normalized_sql = _WHITESPACE_PATTERN.sub(' ', normalized_sql).strip()
+    normalized_sql = _REPEATED_TUPLES_PATTERN.sub(r'(\1), ...', normalized_sql)
+    normalized_sql = _REPEATED_VALUES_PATTERN.sub('IN (?, ...)', normalized_sql)
+    return normalized_sql, n_literals + n_nulls
+
+
+def _count_parameters(parameters: Any, executemany: bool) -> int:
+    if not parameters:
+        return 0
+    if executemany:
+        return sum(len(row_parameters) for row_parameters in parameters)
+    return len(parameters)
+
+
+@contextmanager
+def statement_source(source_name: str) -> Iterator[None]:
+    """Attribute the statements run in the context to the data source"""
+    token = _statement_source.set(source_name)
+    try:
+        yield
+    finally:
+        _statement_source.reset(token)
+
+
+@contextmanager
+def recorded_fetch() -> Iterator[None]:
+    """Leave the statements run in the context open until their rows are reported by `record_fetch`"""
+    token = _fetch_recorded.set(True)
+    try:
+        yield
+    finally:
+        _fetch_recorded.reset(token)
+
+
+class StatementStatistics:
+    """
+    Aggregated executions of a normalized statement by a data source, binds are the literal values of
+    the statements together with their bind parameters
+
+    Args:
+        source: Name of the data source that ran the statement, None if run outside of a data source
+        statement: Normalized statement, see `normalize_sql`
+    """
+
+    def __init__(self, source: Optional[str], statement: str):
+        self._source = source
+        self._statement = statement
+        self._executions = 0
+        self._errors = 0
+        self._slow_executions = 0
+        self._binds = 0
+        self._rows = 0
+        self._execute_time = 0.
+        self._fetch_time = 0.
+        self._max_time = 0.
+
+    def __repr__(self):
+        return f'StatementStatistics(source={self._source}, statement={self._statement[:50]}, ' \
+               f'executions={self._executions}, total_time={self.total_time:.4f})'
+
+    @property
+    def source(self) -> Optional[str]:
+        return self._source
+
+    @property
+    def statement(self) -> str:
+        return self._statement
+
+    @property
+    def executions(self) -> int:
+        return self._executions
+
+    @property
+    def errors(self) -> int:
+        return self._errors
+
+    @property
+    def slow_executions(self) -> int:
+        return self._slow_executions
+
+    @property
+    def binds(self) -> int:
+        return self._binds
+
+    @property
+    def rows(self) -> int:
+        """Rows fetched by the selects and affected by the other statements, as far as known"""
+        return self._rows
+
+    @property
+    def execute_time(self) -> float:
+        return self._execute_time
+
+    @property
+    def fetch_time(self) -> float:
+        return self._fetch_time
+
+    @property
+    def total_time(self) -> float:
+        """Time of executing the statements and fetching their rows in seconds"""
+        return self._execute_time + self._fetch_time
+
+    @property
+    def max_time(self) -> float:
+        """Longest time of a single execution together with the fetching of its rows"""
+        return self._max_time
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self._executions if self._executions > 0 else 0.
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'source': self._source, 'statement': self._statement, 'executions': self._executions,
+                'errors': self._errors, 'slow_executions': self._slow_executions, 'binds': self._binds,
+                'rows': self._rows, 'execute_time': self._execute_time, 'fetch_time': self._fetch_time,
+                'total_time': self.total_time, 'max_time': self._max_time}
+
+    def _add_execution(self, binds: int, rows: int, execute_time: float):
+        self._executions += 1
+        self._binds += binds
+        self._rows += rows
+        self._execute_time += execute_time
+        self._max_time = max(self._max_time, execute_time)
+
+    def _add_fetch(self, rows: int, fetch_time: float, total_time: float):
+        self._rows += rows
+        self._fetch_time += fetch_time
+        self._max_time = max(self._max_time, total_time)
+
+
+class StatementRecorder:
+    """
+    Records the statements run on the engines it is attached to
+
+    The execution of a statement is timed by the engine's events. The fetching of the rows of a select is timed
+    only if the rows are read by `_oracle_utils.read_sql` (as by the selects of `OracleDataSource`), other
+    selects are recorded and checked for slowness by their execution only, their rows are not counted
+
+    Args:
+        slow_query_threshold: Time in seconds of executing a statement and fetching its rows above which
+            the statement is logged as slow, if None, no statement is logged
+        max_statements: Maximal number of distinct statements and data sources aggregated, further statements
+            are aggregated together as OTHER_STATEMENTS
+    """
+
+    def __init__(self, slow_query_threshold: Optional[float] = DEFAULT_SLOW_QUERY_THRESHOLD,
+                 max_statements: int = DEFAULT_MAX_STATEMENTS):
+        self._slow_query_threshold = slow_query_threshold
+        self._max_statements = max_statements
+        self._statistics: Dict[Tuple[Optional[str], str], StatementStatistics] = dict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'StatementRecorder(slow_query_threshold={self._slow_query_threshold}, ' \
+               f'statements={len(self._statistics)})'
+
+    def __str__(self):
+        return self.format_table()
+
+    @property
+    def slow_query_threshold(self) -> Optional[float]:
+        return self._slow_query_threshold
+
+    def attach(self, engine: Engine):
+        """Record the statements run on the engine from now on, attaching the recorder again has no effect"""
+        if not event.contains(engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(engine, 'handle_error', self._handle_error)
+
+    def detach(self, engine: Engine):
+        if event.contains(engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.remove(engine, 'handle_error', self._handle_error)
+
+    def statistics(self, sort_by: str = 'total_time', source: Optional[str] = None) -> List[StatementStatistics]:
+        """
+        Statistics of the recorded statements
+
+        Args:
+            sort_by: Statistic to sort by from the highest, one of 'total_time', 'execute_time', 'fetch_time',
+                'max_time', 'executions', 'rows' and 'binds'
+            source: Optional name of the data source whose statements are returned
+
+        Returns:
+            List of the statistics of the statements
+        """
+        if sort_by not in _SORT_KEYS:
+            raise ValueError(f'sort_by must be one of {_SORT_KEYS}')
+        with self._lock:
+            statistics = [statement_statistics for statement_statistics in self._statistics.values()
+                          if source is None or statement_statistics.source == source]
+        return sorted(statistics, key=lambda statement_statistics: getattr(statement_statistics, sort_by),
+                      reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._statistics = dict()
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        return [statement_statistics.to_dict() for statement_statistics in self.statistics()]
+
+    def format_table(self, sort_by: str = 'total_time', limit: Optional[int] = None) -> str:
+        """
+        Table of the statements' statistics, see `statistics` for sort_by, limit is the maximal number of rows
+        """
+        lines = ['  '.join(column.ljust(width) for column, width in _TABLE_COLUMNS)]
+        for statement_statistics in self.statistics(sort_by)[:limit]:
+            statement = statement_statistics.statement
+            values = [str(statement_statistics.source), statement if len(statement) <= 60 else statement[:57] + '...',
+                      str(statement_statistics.executions), f'{statement_statistics.total_time * 1000:.1f}',
+                      f'{statement_statistics.execute_time * 1000:.1f}',
+                      f'{statement_statistics.fetch_time * 1000:.1f}', f'{statement_statistics.max_time * 1000:.1f}',
+                      str(statement_statistics.rows), str(statement_statistics.slow_executions),
+                      str(statement_statistics.errors)]
+            lines.append('  '.join(value.ljust(width) if i < 2 else value.rjust(width)
+                                   for i, (value, (_, width)) in enumerate(zip(values, _TABLE_COLUMNS))))
+        return '\n'.join(lines)
+
+    def _get_statistics(self, source: Optional[str], statement: str) -> StatementStatistics:
+        statement_statistics = self._statistics.get((source, statement))
+        if statement_statistics is None:
+            if len(self._statistics) >= self._max_statements:
+                statement = OTHER_STATEMENTS
+                statement_statistics = self._statistics.get((source, statement))
+            if statement_statistics is None:
+                statement_statistics = StatementStatistics(source, statement)
+                self._statistics[(source, statement)] = statement_statistics
+        return statement_statistics
+
+    def _log_if_slow(self, statement_statistics: StatementStatistics, execute_time: float, fetch_time: float,
+                     rows: Optional[int]):
+        if self._slow_query_threshold is None or execute_time + fetch_time <= self._slow_query_threshold:
+            return
+        with self._lock:
+            statement_statistics._slow_executions += 1
+        logger.warning(f'Slow SQL statement of data source {statement_statistics.source} took '
+                       f'{execute_time + fetch_time:.3f}s (execute {execute_time:.3f}s, fetch {fetch_time:.3f}s, '
+                       f'{rows if rows is not None else "unknown"} rows): {statement_statistics.statement}')
+
+    def _before_cursor_execute(self, conn: Connection, cursor, statement: str, parameters, context, executemany):
+        conn.info.setdefault(_PENDING_FETCHES_KEY, dict()).pop(self, None)
+        conn.info.setdefault(_STARTS_KEY, dict()).setdefault(self, []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn: Connection, cursor, statement: str, parameters, context, executemany):
+        execute_time = time.perf_counter() - conn.info[_STARTS_KEY][self].pop()
+        normalized_statement, n_literals = normalize_sql(statement)
+        returns_rows = cursor.description is not None
+        rows = 0 if returns_rows or cursor.rowcount < 0 else cursor.rowcount
+        with self._lock:
+            statement_statistics = self._get_statistics(_statement_source.get(), normalized_statement)
+            statement_statistics._add_execution(n_literals + _count_parameters(parameters, executemany), rows,
+                                                execute_time)
+        if returns_rows and _fetch_recorded.get():
+            # Completed by `record_fetch` once `read_sql` fetched the rows
+            conn.info[_PENDING_FETCHES_KEY][self] = (statement_statistics, execute_time)
+        else:
+            self._log_if_slow(statement_statistics, execute_time, 0., None if returns_rows else rows)
+
+    def _handle_error(self, exception_context):
+        connection = exception_context.connection
+        if connection is None or exception_context.statement is None:
+            return
+        starts = connection.info.get(_STARTS_KEY, dict()).get(self)
+        if starts:
+            starts.pop()
+        normalized_statement, _ = normalize_sql(exception_context.statement)
+        with self._lock:
+            self._get_statistics(_statement_source.get(), normalized_statement)._errors += 1
+
+    def _record_fetch(self, statement_statistics: StatementStatistics, execute_time: float, rows: int,
+                      fetch_time: float):
+        with self._lock:
+            statement_statistics._add_fetch(rows, fetch_time, execute_time + fetch_time)
+        self._log_if_slow(statement_statistics, execute_time, fetch_time, rows)
+
+
+def record_fetch(connection: Connection, rows: int, fetch_time: float):
+    """Report the rows fetched for the last statement run on the connection to the recorders that recorded it"""
+    pending_fetches = connection.info.pop(_PENDING_FETCHES_KEY, None)
+    for recorder, (statement_statistics, execute_time) in (pending_fetches or dict()).items():
+        recorder._record_fetch(statement_statistics, execute_time, rows, fetch_time)
@@ -0,0 +1,332 @@
+"""
+HTTP feature server, coalescing concurrent requests into batched retrievals
+
+Run it with `snax-serve /path/to/feature_repo`, then request features with
+`POST /features` and body `{"entity_name": "game", "features": ["view:feature"], "entities": [{"game_id": 1}]}`
+The response is `{"features": {"view:feature": [value, ...]}}` with one value per entity
+`GET /metrics` serves the metrics of `snax.metrics.REGISTRY` in the Prometheus text exposition format
+"""
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, Optional, Tuple
+
+import pandas as pd
+
+from snax.feature_store import FeatureStore, DEFAULT_MAX_WORKERS
+from snax.metrics import REGISTRY
+
+DEFAULT_BATCH_WINDOW = 0.002
+DEFAULT_MAX_BATCH_SIZE = 1024
+DEFAULT_REQUEST_TIMEOUT = 30.
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureRequest:
+    """
+    Request for features of a list of entities, with a future for its response
+
+    Args:
+        entity_rows: Dicts with join key values of the entities
+        feature_names: List of full feature names in the format view_name:feature_name
+        entity_name: Name of the entity whose join keys are in the entity rows
+    """
+
+    def __init__(self, entity_rows: List[Dict[str, Any]], feature_names: List[str], entity_name: str):
+        self._entity_rows = entity_rows
+        self._feature_names = feature_names
+        self._entity_name = entity_name
+        self._future: Future = Future()
+
+    def __repr__(self):
+        return f'FeatureRequest(entity_name={self._entity_name}, features={self._feature_names}, ' \
+               f'entities={len(self._entity_rows)})'
+
+    @property
+    def entity_rows(self) -> List[Dict[str, Any]]:
+        return self._entity_rows
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self._feature_names
+
+    @property
+    def entity_name(self) -> str:
+        return self._entity_name
+
+    @property
+    def future(self) -> Future:
+        return self._future
+
+
+def _column_values(column: pd.Series) -> List[Any]:
+    return column.astype(object).where(column.notna(), None).tolist()
+
+
+class MicroBatcher:
+    """
+    Coalesces requests submitted within a time window into one `add_features_to_dataframe` call per entity
+    and fans the results back out to the requests
+
+    Args:
+        feature_store: Feature store to retrieve the features from
+        batch_window: Time in seconds to wait for other requests after the first request of a batch arrives
+        max_batch_size: Maximal number of requests in a batch
+    """
+
+    def __init__(self, feature_store: FeatureStore, batch_window: float = DEFAULT_BATCH_WINDOW,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE):
+        self._feature_store = feature_store
+        self._batch_window = batch_window
+        self._max_batch_size = max_batch_size
+        self._requests: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def batch_window(self) -> float:
+        return self._batch_window
+
+    @property
+    def max_batch_size(self) -> int:
+        return self._max_batch_size
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='snax-micro-batcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._requests.put(None)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get_features(self, entity_rows: List[Dict[str, Any]], feature_names: List[str], entity_name: str,
+                     timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT) -> Dict[str, List[Any]]:
+        """
+        Submit the request to the next batch and wait for its features
+
+        Returns:
+            Dict from full feature name to the feature's values for the entity rows
+        """
+        request = FeatureRequest(entity_rows, feature_names, entity_name)
+        self._requests.put(request)
+        return request.future.result(timeout)
+
+    def _next_batch(self) -> List[FeatureRequest]:
+        request = self._requests.get()
+        if request is None:
+            return []
+
+        batch = [request]
+        deadline = time.monotonic() + self._batch_window
+        while len(batch) < self._max_batch_size:
+            try:
+                request = self._requests.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if request is None:
+                self._stopped.set()
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            requests_by_entity: Dict[str, List[FeatureRequest]] = dict()
+            for request in batch:
+                requests_by_entity.setdefault(request.entity_name, []).append(request)
+            for entity_name, requests in requests_by_entity.items():
+                self._process(requests, entity_name)
+
+        # Requests submitted after stopping are never processed
+        while not self._requests.empty():
+            request = self._requests.get()
+            if request is not None:
+                request.future.set_exception(RuntimeError('Feature server stopped'))
+
+    def _process(self, requests: List[FeatureRequest], entity_name: str):
+        try:
+            responses = self._retrieve(requests, entity_name)
+        except Exception as exception:
+            if len(requests) == 1:
+                requests[0].future.set_exception(exception)
+                return
+            # A single bad request must not fail the others in its batch
+            for request in requests:
+                self._process([request], entity_name)
+            return
+
+        for request, response in zip(requests, responses):
+            request.future.set_result(response)
+
+    def _retrieve(self, requests: List[FeatureRequest], entity_name: str) -> List[Dict[str, List[Any]]]:
+        feature_names = list(dict.fromkeys(feature_name for request in requests
+                                           for feature_name in request.feature_names))
+        entity_rows = [entity_row for request in requests for entity_row in request.entity_rows]
+        join_keys = self._feature_store.get_entity(entity_name).join_keys
+        dataframe = pd.DataFrame(entity_rows, columns=join_keys)
+
+        # Features of the same name from different views become the same column, they are added in separate calls
+        feature_columns: Dict[str, pd.Series] = dict()
+        for features_by_column in _split_colliding_features(feature_names):
+            feature_dataframe = self._feature_store.add_features_to_dataframe(
+                dataframe, list(features_by_column.values()), entity_name)
+            for column_name, feature_name in features_by_column.items():
+                feature_columns[feature_name] = feature_dataframe[column_name]
+
+        responses = []
+        start = 0
+        for request in requests:
+            end = start + len(request.entity_rows)
+            responses.append({feature_name: _column_values(feature_columns[feature_name].iloc[start:end])
+                              for feature_name in request.feature_names})
+            start = end
+        return responses
+
+
+def _split_colliding_features(feature_names: List[str]) -> List[Dict[str, str]]:
+    """Split full feature names into dicts from feature name to full feature name without two features of one name"""
+    features_by_column_list: List[Dict[str, str]] = []
+    for feature_name in feature_names:
+        column_name = feature_name.split(':')[1]
+        for features_by_column in features_by_column_list:
+            if column_name not in features_by_column:
+                features_by_column[column_name] = feature_name
+                break
+        else:
+            features_by_column_list.append({column_name: feature_name})
+    return features_by_column_list
+
+
+def _parse_request_body(body: Any) -> Tuple[List[Dict[str, Any]], List[str], str]:
+    if not isinstance(body, dict):
+        raise ValueError('Request body must be a JSON object')
+
+    entity_name = body.get('entity_name')
+    feature_names = body.get('features')
+    entity_rows = body.get('entities')
+    if not isinstance(entity_name, str):
+        raise ValueError('entity_name must be a string')
+    if not isinstance(feature_names, list) or not all(':' in feature_name for feature_name in feature_names):
+        raise ValueError('features must be a list of feature names in the format view_name:feature_name')
+    if isinstance(entity_rows, dict):
+        # Columnar entities, a dict from join key to its values
+        entity_rows = pd.DataFrame(entity_rows).to_dict('records')
+    if not isinstance(entity_rows, list) or not all(isinstance(entity_row, dict) for entity_row in entity_rows):
+        raise ValueError('entities must be a list of dicts with join key values or a dict of join key value lists')
+    return entity_rows, feature_names, entity_name
+
+
+class _FeatureRequestHandler(BaseHTTPRequestHandler):
+    server: 'FeatureServer'
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(HTTPStatus.OK, {'status': 'ok'})
+        elif self.path == '/metrics':
+            self._send_text(HTTPStatus.OK, REGISTRY.to_prometheus(), 'text/plain; version=0.0.4')
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {'error': f'Unknown path {self.path}'})
+
+    def do_POST(self):
+        if self.path != '/features':
+            self._send_json(HTTPStatus.NOT_FOUND, {'error': f'Unknown path {self.path}'})
+            return
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            entity_rows, feature_names, entity_name = _parse_request_body(body)
+            feature_values = self.server.micro_batcher.get_features(entity_rows, feature_names, entity_name)
+        except (ValueError, KeyError, NotImplementedError) as exception:
+            self._send_json(HTTPStatus.BAD_REQUEST, {'error': str(exception)})
+            return
+        except Exception as exception:
+            logger.exception('Failed to retrieve features')
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(exception)})
+            return
+
+        self._send_json(HTTPStatus.OK, {'features': feature_values})
+
+    def _send_json(self, status: HTTPStatus, body: Dict[str, Any]):
+        self._send_text(status, json.dumps(body, default=str), 'application/json')
+
+    def _send_text(self, status: HTTPStatus, body: str, content_type: str):
+        encoded_body = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(encoded_body)))
+        self.end_headers()
+        self.wfile.write(encoded_body)
+
+    def log_message(self, format: str, *args):
+        logger.debug(format, *args)
+
+
+class FeatureServer(ThreadingHTTPServer):
+    """
+    HTTP server for feature retrieval, see the module's documentation for the API
+
+    Args:
+        feature_store: Feature store to retrieve the features from
+        host: Host to listen on
+        port: Port to listen on, 0 for any free port
+        batch_window: Time in seconds to wait for other requests after the first request of a batch arrives
+        max_batch_size: Maximal number of requests in a batch
+    """
+    daemon_threads = True
+
+    def __init__(self, feature_store: FeatureStore, host: str = '127.0.0.1', port: int = 8000,
+                 batch_window: float = DEFAULT_BATCH_WINDOW, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE):
+        super().__init__((host, port), _FeatureRequestHandler)
+        self._micro_batcher = MicroBatcher(feature_store, batch_window, max_batch_size)
+        self._micro_batcher.start()
+
+    @property
+    def micro_batcher(self) -> MicroBatcher:
+        return self._micro_batcher
+
+    def server_close(self):
+        super().server_close()
+        self._micro_batcher.stop()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Serve features of a feature repo over HTTP')
+    parser.add_argument('repo_path', help='Path to the directory with the feature repo definitions')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--batch-window-ms', type=float, default=DEFAULT_BATCH_WINDOW * 1000,
+                        help='Time to wait for other requests after the first request of a batch arrives')
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help='Maximal number of requests in a batch')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help='Maximal number of feature views retrieved concurrently')
+    arguments = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    feature_store = FeatureStore(arguments.repo_path, max_workers=arguments.max_workers)
+    server = FeatureServer(feature_store, arguments.host, arguments.port,
+                           batch_window=arguments.batch_window_ms / 1000, max_batch_size=arguments.max_batch_size)
+    logger.info('Serving features of %s on http://%s:%d', arguments.repo_path, *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        feature_store.close()
+
+
+if __name__ == '__main__':
+    main()
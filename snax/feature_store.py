@@ -1,16 +1,40 @@
-from typing import List, Optional, Dict
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Iterator, Tuple, Any, Union
 
+import numpy as np
 import pandas as pd
 
+from snax import tracing
+from snax._join import EntityKeyIndex, AsOfIndex, join_feature_values, JoinedFeatureValues
+from snax.async_executor import run_blocking
 from snax.data_sources.data_source_base import DataSourceBase
 from snax.entity import Entity
 from snax.feature_view import FeatureView
-from snax.repo_contents import parse_repo, RepoContents
+from snax.metrics import REGISTRY
+from snax.online_index import OnlineIndex, entity_row_key
+from snax.online_store import SqliteOnlineStore, SqliteOnlineTable
+from snax.repo_contents import parse_repo, RepoContents, changed_repo_file_paths, reload_repo
+from snax.repo_profiler import RepoLoadProfiler, RepoLoadProfile
+from snax.retrieval_plan import RetrievalPlan, AnyRetrievalStep, plan_retrieval
+from snax.type_casting import CastStats
+
+
+def _feature_order(features: List[str]) -> List[str]:
+    feature_order = dict()
+    for feature_names in group_features(features).values():
+        feature_order.update(dict.fromkeys(feature_names))
+    return list(feature_order)
 
 
 def group_features(features: List[str]) -> Dict[str, List[str]]:
     feature_dict = {}
-    for feature in features:
+    for feature in dict.fromkeys(features):
         view_name, feature_name = feature.split(':')  # TODO: Define the splitter somewhere
         if view_name not in feature_dict:
             feature_dict[view_name] = []
@@ -19,21 +43,125 @@ def group_features(features: List[str]) -> Dict[str, List[str]]:
     return feature_dict
 
 
+def _check_feature_columns(dataframe: pd.DataFrame, features: List[str], join_keys: List[str]):
+    """Raise ValueError if some of the features would be added to the dataframe as the same column"""
+    column_views = dict()
+    for view_name, feature_names in group_features(features).items():
+        for feature_name in feature_names:
+            if feature_name in join_keys:
+                continue
+            if feature_name in column_views:
+                raise ValueError(f'Features {column_views[feature_name]}:{feature_name} and {view_name}:{feature_name} '
+                                 f'would be added to the dataframe as the same column')
+            if feature_name in dataframe.columns:
+                raise ValueError(f'Feature {view_name}:{feature_name} would be added to the dataframe, which already '
+                                 f'has column {feature_name}')
+            column_views[feature_name] = view_name
+
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_BATCH_SIZE = 100_000
+
+logger = logging.getLogger(__name__)
+
+_RETRIEVAL_SECONDS = REGISTRY.histogram('snax_retrieval_seconds', 'Latency of feature retrievals', ['method'])
+_RETRIEVAL_ROWS = REGISTRY.counter('snax_retrieval_rows_total', 'Entity rows features were retrieved for',
+                                   ['method'])
+_ONLINE_INDEX_REQUESTS = REGISTRY.counter('snax_online_index_requests_total',
+                                          'Lookups of the in-memory online indices, result is hit if the index '
+                                          'was already built and miss if it had to be built', ['view', 'result'])
+_ONLINE_LOOKUPS = REGISTRY.counter('snax_online_lookups_total',
+                                   'Entity rows looked up online, result is found or missing', ['view', 'result'])
+
+
+def _record_retrieval(method: str, duration: float, rows: int):
+    _RETRIEVAL_SECONDS.labels(method=method).observe(duration)
+    _RETRIEVAL_ROWS.labels(method=method).inc(rows)
+
+
 class FeatureStore:
     """
     Collection of various feature views
+
+    Args:
+        repo_path: Path to the directory with the feature repo definitions
+        max_workers: Maximal number of feature views whose values are retrieved concurrently
+        online_store: Optional online store with materialized feature views, `get_online_features` reads
+            the views materialized there from it
+        lazy: Import the repo's files only when their definitions are first asked for, instead of on initialization
+        manifest_path: Optional path of a manifest persisting what the repo's files define between runs,
+            so that only new and changed files are scanned by the lazy parsing
+        watch_interval: Optional interval in seconds of checking the repo's files for changes and reloading them,
+            see `watch`
+        profile: Measure the cost of importing each of the repo's files and of constructing each data source,
+            see `load_profile`
     """
 
-    def __init__(self, repo_path: str):
+    def __init__(self, repo_path: str, max_workers: int = DEFAULT_MAX_WORKERS,
+                 online_store: Optional[SqliteOnlineStore] = None, lazy: bool = False,
+                 manifest_path: Optional[str] = None, watch_interval: Optional[float] = None,
+                 profile: bool = False):
         self._repo_path = repo_path
-        self._repo_contents: RepoContents = parse_repo(repo_path)
+        self._online_store = online_store
+        self._profiler = RepoLoadProfiler() if profile else None
+        self._repo_contents: RepoContents = parse_repo(repo_path, lazy=lazy, manifest_path=manifest_path,
+                                                       profiler=self._profiler)
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._online_indices: Dict[Tuple[str, str], OnlineIndex] = dict()
+        self._online_indices_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watch_thread: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        if watch_interval is not None:
+            self.watch(watch_interval)
 
     @property
     def repo_path(self) -> str:
         return self._repo_path
 
+    @property
+    def online_store(self) -> Optional[SqliteOnlineStore]:
+        return self._online_store
+
+    @property
+    def load_profile(self) -> Optional[RepoLoadProfile]:
+        """Costs of loading the repo, None if the feature store wasn't created with profile=True"""
+        return self._profiler.profile if self._profiler is not None else None
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def __enter__(self) -> 'FeatureStore':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Stop watching the repo, shut down the threads retrieving feature views concurrently, close the online store"""
+        self.stop_watching()
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if self._online_store is not None:
+            self._online_store.close()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        executor = self._executor
+        if executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='snax')
+                executor = self._executor
+        return executor
+
     def add_features_to_dataframe(self, dataframe: pd.DataFrame, feature_names: List[str],
-                                  entity_name: Optional[str] = None) -> pd.DataFrame:
+                                  entity_name: Optional[str] = None, cast_stats: Optional[CastStats] = None,
+                                  output: str = 'pandas') -> JoinedFeatureValues:
         """
         Retrieve features by their full name (feature_view_name:feature_name) and add them to the dataframe
 
@@ -42,13 +170,342 @@ class FeatureStore:
             feature_names: List of full feature names to add to the dataframe in the format view_name:feature_name
             entity_name: Optional entity name to specify what columns to use for identifying the entity in the dataframe
                 if it contains more columns than are required to identify the entity
+            cast_stats: Optional stats object collecting the number of values per feature that could not be cast
+                to the feature's type and were replaced by missing values
+            output: Format of the result assembled directly from the retrieved values, one of
+                'pandas': the dataframe with the feature columns appended
+                'numpy': dict from column name to numpy array, with the dataframe's and the feature columns
+                'matrix': float32 numpy matrix of the features in the order of feature_names, missing values are NaN
+                'arrow': pyarrow Table with the dataframe's and the feature columns (requires pyarrow)
+        """
+        start_counter = time.perf_counter()
+        with tracing.span('feature_store.add_features_to_dataframe', entity=entity_name,
+                          features=len(feature_names), rows=len(dataframe), output=output):
+            plan = self.plan_retrieval(feature_names, entity_name)
+            _check_feature_columns(dataframe, feature_names, self.get_entity(entity_name).join_keys)
+            joined_feature_values = self._execute_plan(dataframe, plan, cast_stats, output,
+                                                       _feature_order(feature_names))
+        _record_retrieval('add_features_to_dataframe', time.perf_counter() - start_counter, len(dataframe))
+        return joined_feature_values
+
+    async def add_features_to_dataframe_async(self, dataframe: pd.DataFrame, feature_names: List[str],
+                                              entity_name: Optional[str] = None,
+                                              cast_stats: Optional[CastStats] = None,
+                                              output: str = 'pandas') -> JoinedFeatureValues:
         """
+        Asyncio counterpart of `add_features_to_dataframe`, see its documentation for the arguments
+        Data sources are queried concurrently, blocking work runs on the executor from `snax.async_executor`
+        """
+        start_counter = time.perf_counter()
+        with tracing.span('feature_store.add_features_to_dataframe', entity=entity_name,
+                          features=len(feature_names), rows=len(dataframe), output=output):
+            plan = self.plan_retrieval(feature_names, entity_name)
+            _check_feature_columns(dataframe, feature_names, self.get_entity(entity_name).join_keys)
+            key_indices = await run_blocking(self._build_key_indices, dataframe, plan)
+            steps_key_indices = [key_indices[tuple(step.join_keys)] for step in plan.steps]
+
+            steps_feature_values = await asyncio.gather(*[
+                step.get_feature_values_async(key_index.unique_key_values, cast_stats)
+                for step, key_index in zip(plan.steps, steps_key_indices)
+            ])
+
+            joined_feature_values = await run_blocking(
+                self._join, dataframe, list(zip(steps_key_indices, steps_feature_values)), output,
+                _feature_order(feature_names))
+        _record_retrieval('add_features_to_dataframe_async', time.perf_counter() - start_counter, len(dataframe))
+        return joined_feature_values
+
+    def get_online_features(self, entity_rows: List[Dict[str, Any]], feature_names: List[str], entity_name: str,
+                            output: str = 'dict') -> Dict[str, Union[List[Any], np.ndarray]]:
+        """
+        Low-latency lookup of features of individual entities, without building data frames
+        The values of views materialized in the online store are looked up there, the other views are looked up
+        in in-memory indices, built on the first lookup of the view (or by `build_online_indices`) and kept until
+        `refresh_online_indices` is called
+
+        Args:
+            entity_rows: Dicts with join key values of the entities
+            feature_names: List of full feature names in the format view_name:feature_name
+            entity_name: Name of the entity whose join keys are in the entity rows
+            output: 'dict' for lists of values, 'numpy' for numpy arrays of values
+
+        Returns:
+            Dict from full feature name to the feature's values for the entity rows, None for entities not found
+        """
+        if output not in ['dict', 'numpy']:
+            raise ValueError("output must be one of ['dict', 'numpy']")
+
+        start_counter = time.perf_counter()
+        feature_values = dict()
+        for view_name, view_feature_names in group_features(feature_names).items():
+            online_index = self._get_online_index(view_name, entity_name)
+            rows = online_index.get_rows([entity_row_key(entity_row, online_index.join_keys)
+                                          for entity_row in entity_rows])
+            n_found = sum(row is not None for row in rows)
+            _ONLINE_LOOKUPS.labels(view=view_name, result='found').inc(n_found)
+            _ONLINE_LOOKUPS.labels(view=view_name, result='missing').inc(len(rows) - n_found)
+            for feature_name in view_feature_names:
+                position = online_index.feature_position(feature_name)
+                values = [row[position] if row is not None else None for row in rows]
+                feature_values[f'{view_name}:{feature_name}'] = np.array(values) if output == 'numpy' else values
+
+        _record_retrieval('get_online_features', time.perf_counter() - start_counter, len(entity_rows))
+        return feature_values
+
+    def build_online_indices(self, view_names: List[str], entity_name: str):
+        """Build in-memory indices of the feature views for `get_online_features` ahead of the first lookup"""
+        for view_name in view_names:
+            self._get_online_index(view_name, entity_name)
+
+    def refresh_online_indices(self):
+        """Drop the in-memory indices for `get_online_features`, they are rebuilt from the data sources on next use"""
+        with self._online_indices_lock:
+            self._online_indices = dict()
+
+    def _get_online_index(self, view_name: str, entity_name: str) -> Union[OnlineIndex, SqliteOnlineTable]:
+        if self._online_store is not None:
+            online_table = self._online_store.get_table(view_name, entity_name)
+            if online_table is not None:
+                return online_table
+
+        online_index = self._online_indices.get((view_name, entity_name))
+        result = 'hit'
+        if online_index is None:
+            with self._online_indices_lock:
+                online_index = self._online_indices.get((view_name, entity_name))
+                if online_index is None:
+                    online_index = OnlineIndex(self.get_feature_view(view_name), entity_name)
+                    self._online_indices[(view_name, entity_name)] = online_index
+                    result = 'miss'
+        _ONLINE_INDEX_REQUESTS.labels(view=view_name, result=result).inc()
+        return online_index
+
+    def reload(self) -> List[Path]:
+        """
+        Import again the repo's files that changed since they were imported and switch to their new definitions,
+        objects defined in the unchanged files are kept together with their loaded data and online indices
+
+        Retrievals running during the reload finish with the previous definitions. If some changed file fails
+        to import, the error is raised and the previous definitions stay in use
+
+        Returns:
+            New, modified and deleted files of the repo
+        """
+        with self._reload_lock:
+            repo_contents = self._repo_contents
+            changed_file_paths = changed_repo_file_paths(repo_contents, self._repo_path)
+            if len(changed_file_paths) == 0:
+                return changed_file_paths
+
+            self._repo_contents = reload_repo(repo_contents, self._repo_path, changed_file_paths)
+
+            changed_view_names = {obj.name for repo_file_path in changed_file_paths
+                                  for obj in repo_contents.get_file_objects(repo_file_path)
+                                  if isinstance(obj, FeatureView)}
+            with self._online_indices_lock:
+                self._online_indices = {(view_name, entity_name): online_index
+                                        for (view_name, entity_name), online_index in self._online_indices.items()
+                                        if view_name not in changed_view_names}
+        return changed_file_paths
+
+    def watch(self, interval: float = 1.):
+        """
+        Check the repo's files for changes every interval seconds in a background thread and reload them,
+        see `reload`, failed reloads are logged and tried again on the next change
+        """
+        if self._watch_thread is not None:
+            raise ValueError('Feature store is already watching its repo')
+        self._stop_watching.clear()
+        self._watch_thread = threading.Thread(target=self._watch, args=(interval,), name='snax-repo-watcher',
+                                              daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        if self._watch_thread is not None:
+            self._stop_watching.set()
+            self._watch_thread.join()
+            self._watch_thread = None
+
+    def _watch(self, interval: float):
+        # Modification times of the files whose reload failed, they are reloaded again once they change
+        failed_file_mtimes = None
+        while not self._stop_watching.wait(interval):
+            changed_file_paths = changed_repo_file_paths(self._repo_contents, self._repo_path)
+            file_mtimes = {path: path.stat().st_mtime_ns if path.exists() else None for path in changed_file_paths}
+            if len(changed_file_paths) == 0 or file_mtimes == failed_file_mtimes:
+                continue
+            try:
+                self.reload()
+            except Exception:
+                logger.exception('Failed to reload the repo %s', self._repo_path)
+                failed_file_mtimes = file_mtimes
+                continue
+            logger.info('Reloaded %s', ', '.join(str(path) for path in changed_file_paths))
+            failed_file_mtimes = None
+
+    def materialize(self, feature_views: Optional[List[str]] = None, entity_name: Optional[str] = None,
+                    incremental: bool = True) -> Dict[str, int]:
+        """
+        Copy feature values of the feature views from their data sources into the online store
+
+        Args:
+            feature_views: Names of the feature views to materialize, if None, all feature views are materialized
+            entity_name: Name of the entity whose join keys index the stored rows, if None, each view is materialized
+                for all of its entities
+            incremental: Copy only rows newer than the ones copied by the previous run for views with
+                a timestamp field, otherwise all the rows are copied again
+
+        Returns:
+            Number of rows written per materialized table
+        """
+        if self._online_store is None:
+            raise ValueError('Feature store has no online store to materialize to')
+
+        views = self.list_feature_views() if feature_views is None \
+            else [self.get_feature_view(view_name) for view_name in feature_views]
+        written_rows = dict()
+        for view in views:
+            entity_names = [entity_name] if entity_name is not None else [entity.name for entity in view.entities]
+            for view_entity_name in entity_names:
+                table = self._online_store.table_name(view.name, view_entity_name)
+                written_rows[table] = self._online_store.materialize(view, view_entity_name, incremental)
+
+        return written_rows
+
+    def iter_features_to_dataframe(self, dataframe: pd.DataFrame, feature_names: List[str],
+                                   entity_name: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                                   cast_stats: Optional[CastStats] = None,
+                                   output: str = 'pandas') -> Iterator[JoinedFeatureValues]:
+        """
+        Same as `add_features_to_dataframe`, but processes the dataframe in batches of rows and yields the batches
+        with added features one by one, so that memory needed for the retrieval is proportional to the batch size
+
+        Args:
+            dataframe: Entity's key values dataframe to add features to
+            feature_names: List of full feature names to add to the dataframe in the format view_name:feature_name
+            entity_name: Optional entity name to specify what columns to use for identifying the entity in the dataframe
+                if it contains more columns than are required to identify the entity
+            batch_size: Number of rows of the dataframe processed at once
+            cast_stats: Optional stats object collecting the number of values per feature that could not be cast
+                to the feature's type and were replaced by missing values
+            output: Format of the batches, see `add_features_to_dataframe`
+
+        Returns:
+            Iterator over the enriched batches, pandas batches are indexed by their row positions in the dataframe
+        """
+        if batch_size < 1:
+            raise ValueError('batch_size must be positive')
+
+        plan = self.plan_retrieval(feature_names, entity_name)
+        _check_feature_columns(dataframe, feature_names, self.get_entity(entity_name).join_keys)
+        feature_order = _feature_order(feature_names)
+        for start in range(0, len(dataframe), batch_size):
+            batch = self._execute_plan(dataframe.iloc[start:start + batch_size], plan, cast_stats, output,
+                                       feature_order)
+            if output == 'pandas':
+                batch.index = pd.RangeIndex(start, start + len(batch))
+            yield batch
+
+    def _execute_plan(self, dataframe: pd.DataFrame, plan: RetrievalPlan, cast_stats: Optional[CastStats] = None,
+                      output: str = 'pandas', feature_order: Optional[List[str]] = None) -> JoinedFeatureValues:
+        key_indices = self._build_key_indices(dataframe, plan)
+        steps_key_indices = [key_indices[tuple(step.join_keys)] for step in plan.steps]
+
+        def get_step_feature_values(context: contextvars.Context, step: AnyRetrievalStep,
+                                    key_index: EntityKeyIndex) -> pd.DataFrame:
+            # Run in the caller's context, so that the steps' spans nest in the caller's span
+            return context.run(step.get_feature_values, key_index.unique_key_values, cast_stats)
+
+        contexts = [contextvars.copy_context() for _ in plan.steps]
+        if len(plan.steps) > 1 and self._max_workers > 1:
+            steps_feature_values = list(self._get_executor().map(get_step_feature_values, contexts, plan.steps,
+                                                                 steps_key_indices))
+        else:
+            steps_feature_values = [get_step_feature_values(context, step, key_index)
+                                    for context, step, key_index in zip(contexts, plan.steps, steps_key_indices)]
+
+        return self._join(dataframe, list(zip(steps_key_indices, steps_feature_values)), output, feature_order)
+
+    @staticmethod
+    def _join(dataframe: pd.DataFrame, keyed_feature_values: List[Tuple[EntityKeyIndex, pd.DataFrame]],
+              output: str, feature_order: Optional[List[str]]) -> JoinedFeatureValues:
+        with tracing.span('feature_store.join', rows=len(dataframe), steps=len(keyed_feature_values)):
+            return join_feature_values(dataframe, keyed_feature_values, output, feature_order)
+
+    @staticmethod
+    def _build_key_indices(dataframe: pd.DataFrame, plan: RetrievalPlan) -> Dict[Tuple[str, ...], EntityKeyIndex]:
+        # Entity keys are factorized once per distinct set of join keys and the data sources are queried only with
+        # the distinct key values
+        with tracing.span('feature_store.build_key_indices', rows=len(dataframe)):
+            key_indices = dict()
+            for step in plan.steps:
+                join_keys = tuple(step.join_keys)
+                if join_keys not in key_indices:
+                    key_indices[join_keys] = EntityKeyIndex(dataframe[step.join_keys])
+            return key_indices
+
+    def plan_retrieval(self, feature_names: List[str], entity_name: Optional[str] = None) -> RetrievalPlan:
+        """
+        Plan retrieval of the features, features of feature views reading the same data source by the same entity
+        keys are retrieved by a single select
+
+        Args:
+            feature_names: List of full feature names in the format view_name:feature_name
+            entity_name: Entity name to specify what columns to use for identifying the entity
+        """
+        if entity_name is None:
+            raise NotImplementedError('Joins without entity not supported yet. ')
+
+        with tracing.span('feature_store.plan_retrieval', entity=entity_name, features=len(feature_names)) as span:
+            feature_groups = group_features(feature_names)
+            views_feature_names = [(self.get_feature_view(view_name), view_feature_names)
+                                   for view_name, view_feature_names in feature_groups.items()]
+            plan = plan_retrieval(views_feature_names, entity_name)
+            span.set_attribute('steps', len(plan.steps))
+            return plan
+
+    def explain(self, feature_names: List[str], entity_name: Optional[str] = None) -> str:
+        """Description of how the features would be retrieved by `add_features_to_dataframe`"""
+        return self.plan_retrieval(feature_names, entity_name).explain()
+
+    def get_historical_features(self, dataframe: pd.DataFrame, feature_names: List[str], entity_name: str,
+                                timestamp_column: str, cast_stats: Optional[CastStats] = None,
+                                output: str = 'pandas') -> JoinedFeatureValues:
+        """
+        Point-in-time retrieval: add to each row of the dataframe the feature values that were valid at the row's
+        timestamp, i.e. the latest values of the entity with timestamp not after it and not older than the view's ttl
+
+        Args:
+            dataframe: Entity's key values dataframe with event timestamps
+            feature_names: List of full feature names in the format view_name:feature_name, all views need to have
+                a timestamp field, which is used for joining and is not added to the dataframe
+            entity_name: Entity name to specify what columns to use for identifying the entity in the dataframe
+            timestamp_column: Name of the dataframe's column with the event timestamps
+            cast_stats: Optional stats object collecting the number of values per feature that could not be cast
+                to the feature's type and were replaced by missing values
+            output: Format of the result, see `add_features_to_dataframe`
+        """
+        _check_feature_columns(dataframe, feature_names, self.get_entity(entity_name).join_keys)
         feature_groups = group_features(feature_names)
-        for view_name, feature_names in feature_groups.items():
-            view = self.get_feature_view(view_name)
-            dataframe = view.add_features_to_dataframe(dataframe, feature_names, entity_name)
+        views = [self.get_feature_view(view_name) for view_name in feature_groups]
+
+        def get_view_feature_values(view: FeatureView) -> pd.DataFrame:
+            return view.get_historical_feature_values(
+                dataframe, feature_groups[view.name], entity_name, timestamp_column, cast_stats)
+
+        if len(views) > 1 and self._max_workers > 1:
+            views_feature_values = list(self._get_executor().map(get_view_feature_values, views))
+        else:
+            views_feature_values = [get_view_feature_values(view) for view in views]
 
-        return dataframe
+        asof_indices = []
+        for view in views:
+            join_keys = view.get_entity(entity_name).join_keys
+            asof_indices.append(AsOfIndex(dataframe[join_keys], dataframe[timestamp_column], view.timestamp_field,
+                                          view.ttl))
+
+        return join_feature_values(dataframe, list(zip(asof_indices, views_feature_values)), output,
+                                   _feature_order(feature_names))
 
     def list_feature_views(self) -> List[FeatureView]:
         return self._repo_contents.feature_views
@@ -67,3 +524,7 @@ class FeatureStore:
 
     def get_data_source(self, name: str) -> DataSourceBase:
         return self._repo_contents.get_data_source(name)
+
+    def get_feature_views_by_feature(self, feature_name: str) -> List[FeatureView]:
+        """Feature views with a feature of the given name, e.g. to find the view of a feature name without view"""
+        return self._repo_contents.get_feature_views_by_feature(feature_name)
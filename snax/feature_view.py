@@ -1,11 +1,15 @@
+from datetime import timedelta
 from typing import List, Optional, Dict
 
 import pandas as pd
 
+from snax import tracing
+from snax._join import EntityKeyIndex, join_feature_values
 from snax.data_sources.data_source_base import DataSourceBase
 from snax.entity import Entity
 from snax.feature import Feature
-from snax.type_casting import cast_to_feature_types
+from snax.type_casting import cast_to_feature_types, CastStats
+from snax.value_type import Timestamp
 
 
 class FeatureView:
@@ -18,15 +22,28 @@ class FeatureView:
         features: List of features that are part of this feature view
         source: Data source that this feature view is based on
         tags: Tags for this feature view
+        timestamp_field: Optional name of the feature with the time since when the row's values are valid,
+            feature views with a timestamp field support point-in-time retrieval
+        ttl: Optional time for how long the row's values stay valid after their timestamp
     """
 
     def __init__(self, name: str, entities: Optional[List[Entity]], features: Optional[List[Feature]],
-                 source: DataSourceBase, tags: Optional[Dict[str, str]] = None):
+                 source: DataSourceBase, tags: Optional[Dict[str, str]] = None, timestamp_field: Optional[str] = None,
+                 ttl: Optional[timedelta] = None):
         self._name = name
         self._entities = entities
         self._features = features
         self._source = source
         self._tags = tags or dict()
+        self._timestamp_field = timestamp_field
+        self._ttl = ttl
+        # First of the duplicated names wins, same as in a scan of the lists
+        self._entities_by_name: Dict[str, Entity] = dict()
+        for entity in entities or []:
+            self._entities_by_name.setdefault(entity.name, entity)
+        self._features_by_name: Dict[str, Feature] = dict()
+        for feature in features or []:
+            self._features_by_name.setdefault(feature.name, feature)
 
     def __repr__(self):
         return f'FeatureView(name={self.name})'
@@ -84,35 +101,118 @@ class FeatureView:
     def tags(self) -> Dict[str, str]:
         return self._tags
 
+    @property
+    def timestamp_field(self) -> Optional[str]:
+        return self._timestamp_field
+
+    @property
+    def ttl(self) -> Optional[timedelta]:
+        return self._ttl
+
     def get_entity(self, entity_name: str) -> Entity:
-        for entity in self.entities:
-            if entity.name == entity_name:
-                return entity
-        raise ValueError(f'Entity {entity_name} not found in feature view {self.name}')
+        try:
+            return self._entities_by_name[entity_name]
+        except KeyError:
+            raise ValueError(f'Entity {entity_name} not found in feature view {self.name}')
 
     def get_feature(self, feature_name: str) -> Feature:
-        for feature in self.features:
-            if feature.name == feature_name:
-                return feature
-        raise ValueError(f'Feature {feature_name} not found in feature view {self.name}')
-
-    def add_features_to_dataframe(self, dataframe: pd.DataFrame, feature_names: List[str],
-                                  entity_name: Optional[str] = None) -> pd.DataFrame:
+        try:
+            return self._features_by_name[feature_name]
+        except KeyError:
+            raise ValueError(f'Feature {feature_name} not found in feature view {self.name}')
+
+    def get_feature_values(self, dataframe: pd.DataFrame, feature_names: List[str], entity_name: Optional[str] = None,
+                           cast_stats: Optional[CastStats] = None) -> pd.DataFrame:
+        """
+        Retrieve values of the features for the entities in the dataframe, cast to the features' types
+
+        Each distinct key is selected and cast only once, no matter how many times it repeats in the dataframe
+
+        Args:
+            dataframe: Entity's key values dataframe
+            feature_names: Names of the features of this view to retrieve
+            entity_name: Name of the entity whose join keys identify the rows
+            cast_stats: Optional stats object collecting the number of values lost in casting
+
+        Returns:
+            Data frame with the entity's join keys and the feature values
+        """
         if entity_name is None:
             raise NotImplementedError('Joins without entity not supported yet. ')
 
         entity = self.get_entity(entity_name)
+        # Rows with missing keys can't match any row of the source
+        key_values = dataframe[entity.join_keys].dropna().drop_duplicates()
 
         feature_values = self.source.select(
             columns=[entity] + feature_names,
             key=[entity],
-            key_values=dataframe[entity.join_keys]
+            key_values=key_values
+        )
+
+        return self.cast_feature_values(feature_values, feature_names, cast_stats)
+
+    def cast_feature_values(self, feature_values: pd.DataFrame, feature_names: List[str],
+                            cast_stats: Optional[CastStats] = None) -> pd.DataFrame:
+        """Cast the columns of feature_values with the given feature names to the types of this view's features"""
+        with tracing.span('feature_view.cast', view=self._name, features=len(feature_names),
+                          rows=len(feature_values)):
+            return cast_to_feature_types(
+                dataframe=feature_values,
+                features=[self.get_feature(feature_name) for feature_name in feature_names],
+                cast_stats=cast_stats
+            )
+
+    def get_historical_feature_values(self, dataframe: pd.DataFrame, feature_names: List[str], entity_name: str,
+                                      timestamp_column: str, cast_stats: Optional[CastStats] = None) -> pd.DataFrame:
+        """
+        Retrieve all rows of the features for the entities in the dataframe that can be valid at some of the
+        dataframe's timestamps, cast to the features' types
+
+        Args:
+            dataframe: Entity's key values dataframe with event timestamps
+            feature_names: Names of the features of this view to retrieve
+            entity_name: Name of the entity whose join keys identify the rows
+            timestamp_column: Name of the dataframe's column with the event timestamps
+            cast_stats: Optional stats object collecting the number of values lost in casting
+
+        Returns:
+            Data frame with the entity's join keys, the view's timestamp field and the feature values
+        """
+        if self.timestamp_field is None:
+            raise ValueError(f'Feature view {self.name} has no timestamp field')
+
+        entity = self.get_entity(entity_name)
+        key_values = dataframe[entity.join_keys].dropna().drop_duplicates()
+        timestamps = pd.to_datetime(dataframe[timestamp_column])
+        start = timestamps.min() - self.ttl if self.ttl is not None else None
+        end = timestamps.max()
+
+        feature_names = [feature_name for feature_name in feature_names if feature_name != self.timestamp_field]
+        feature_values = self.source.select(
+            columns=[entity, self.timestamp_field] + feature_names,
+            key=[entity],
+            key_values=key_values,
+            timestamp_field=self.timestamp_field,
+            start=start if not pd.isna(start) else None,
+            end=end if not pd.isna(end) else None
         )
 
         feature_values = cast_to_feature_types(
             dataframe=feature_values,
-            features=[self.get_feature(feature_name) for feature_name in feature_names]
+            features=[Feature(self.timestamp_field, Timestamp)] +
+                     [self.get_feature(feature_name) for feature_name in feature_names],
+            cast_stats=cast_stats
         )
+        return feature_values
 
-        dataframe = dataframe.merge(feature_values, on=entity.join_keys, how='left')
-        return dataframe
+    def add_features_to_dataframe(self, dataframe: pd.DataFrame, feature_names: List[str],
+                                  entity_name: Optional[str] = None,
+                                  cast_stats: Optional[CastStats] = None) -> pd.DataFrame:
+        with tracing.span('feature_view.add_features_to_dataframe', view=self._name, features=len(feature_names),
+                          rows=len(dataframe)):
+            feature_values = self.get_feature_values(dataframe, feature_names, entity_name, cast_stats)
+            with tracing.span('feature_view.join', view=self._name, rows=len(dataframe)):
+                entity = self.get_entity(entity_name)
+                key_index = EntityKeyIndex(dataframe[entity.join_keys])
+                return join_feature_values(dataframe, [(key_index, feature_values)])
@@ -0,0 +1,306 @@
+"""
+In-process counters and histograms of the data sources, casting and the feature store, e.g. rows read per source
+or select latency, rendered in the Prometheus text exposition format or as a dict
+
+The metrics of snax are registered in REGISTRY, `REGISTRY.to_prometheus()` renders them for scraping
+(the feature server serves them on `GET /metrics`)
+"""
+import math
+import re
+import threading
+from typing import List, Optional, Dict, Tuple, Sequence, Any, Union
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10., 30., 60.)
+
+_NAME_PATTERN = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*$')
+_LABEL_NAME_PATTERN = re.compile(r'^[a-zA-Z_][a-zA-Z0-9_]*$')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in labels.items()) + '}'
+
+
+class _Metric:
+    """Metric with a value per combination of label values"""
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        if not _NAME_PATTERN.match(name):
+            raise ValueError(f'Invalid metric name {name}')
+        for label_name in label_names:
+            if not _LABEL_NAME_PATTERN.match(label_name) or label_name == 'le':
+                raise ValueError(f'Invalid label name {label_name}')
+        self._name = name
+        self._documentation = documentation
+        self._label_names = tuple(label_names)
+        self._children: Dict[Tuple[str, ...], Any] = dict()
+        self._lock = threading.Lock()
+        if not self._label_names:
+            self._children[()] = self._new_child()
+
+    def __repr__(self):
+        return f'{type(self).__name__}(name={self._name}, labels={list(self._label_names)})'
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def documentation(self) -> str:
+        return self._documentation
+
+    @property
+    def label_names(self) -> Tuple[str, ...]:
+        return self._label_names
+
+    def labels(self, **labels: Any):
+        """Child metric of the label values, all the metric's labels need to be given"""
+        if set(labels) != set(self._label_names):
+            raise ValueError(f'Metric {self._name} has labels {list(self._label_names)}, got {list(labels)}')
+        label_values = tuple(str(labels[label_name]) for label_name in self._label_names)
+        child = self._children.get(label_values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(label_values, self._new_child())
+        return child
+
+    def reset(self):
+        with self._lock:
+            self._children = {(): self._new_child()} if not self._label_names else dict()
+
+    def _new_child(self):
+        raise NotImplementedError('Has to be overridden by subclass')
+
+    def _unlabeled_child(self):
+        if self._label_names:
+            raise ValueError(f'Metric {self._name} has labels {list(self._label_names)}, use labels(...)')
+        return self._children[()]
+
+    def _labeled_children(self) -> List[Tuple[Dict[str, str], Any]]:
+        with self._lock:
+            children = list(self._children.items())
+        return [(dict(zip(self._label_names, label_values)), child) for label_values, child in children]
+
+    def _samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError('Has to be overridden by subclass')
+
+    def to_prometheus(self) -> str:
+        lines = [f'# HELP {self._name} {self._documentation}', f'# TYPE {self._name} {self.type_name}']
+        lines.extend(f'{name}{_format_labels(labels)} {_format_value(value)}'
+                     for name, labels, value in self._samples())
+        return '\n'.join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        raise NotImplementedError('Has to be overridden by subclass')
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def inc(self, amount: float = 1.):
+        if amount < 0:
+            raise ValueError('Counters can only be increased')
+        with self._lock:
+            self._value += amount
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value, e.g. number of rows read
+
+    Args:
+        name: Name of the metric, by convention ending with _total
+        documentation: Description of the metric
+        label_names: Names of the labels whose values distinguish the counted things, e.g. the data source
+    """
+    type_name = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    @property
+    def value(self) -> float:
+        """Value of the metric without labels"""
+        return self._unlabeled_child().value
+
+    def inc(self, amount: float = 1.):
+        """Increase the metric without labels"""
+        self._unlabeled_child().inc(amount)
+
+    def _samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        return [(self._name, labels, child.value) for labels, child in self._labeled_children()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'type': self.type_name, 'documentation': self._documentation,
+                'samples': [{'labels': labels, 'value': child.value} for labels, child in self._labeled_children()]}
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._bucket_counts = [0] * len(buckets)
+        self._sum = 0.
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def observe(self, value: float):
+        with self._lock:
+            self._sum += value
+            self._count += 1
+            for i, upper_bound in enumerate(self._buckets):
+                if value <= upper_bound:
+                    self._bucket_counts[i] += 1
+                    break
+
+    def cumulative_bucket_counts(self) -> List[Tuple[float, int]]:
+        """Upper bounds of the buckets, ending with +Inf, with the numbers of the observed values not above them"""
+        with self._lock:
+            bucket_counts, count = list(self._bucket_counts), self._count
+        cumulative_counts = []
+        cumulative_count = 0
+        for upper_bound, bucket_count in zip(self._buckets, bucket_counts):
+            cumulative_count += bucket_count
+            cumulative_counts.append((upper_bound, cumulative_count))
+        cumulative_counts.append((math.inf, count))
+        return cumulative_counts
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values counted in buckets, e.g. select latencies
+
+    Args:
+        name: Name of the metric, by convention ending with the unit, e.g. _seconds
+        documentation: Description of the metric
+        label_names: Names of the labels whose values distinguish the observed things, e.g. the data source
+        buckets: Increasing upper bounds of the buckets, the +Inf bucket is added
+    """
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        buckets = tuple(float(bucket) for bucket in buckets if not math.isinf(bucket))
+        if list(buckets) != sorted(set(buckets)):
+            raise ValueError('Buckets must be increasing')
+        self._buckets = buckets
+        super().__init__(name, documentation, label_names)
+
+    @property
+    def buckets(self) -> Tuple[float, ...]:
+        return self._buckets
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self._buckets)
+
+    @property
+    def sum(self) -> float:
+        return self._unlabeled_child().sum
+
+    @property
+    def count(self) -> int:
+        return self._unlabeled_child().count
+
+    def observe(self, value: float):
+        """Observe the value for the metric without labels"""
+        self._unlabeled_child().observe(value)
+
+    def _samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        samples = []
+        for labels, child in self._labeled_children():
+            for upper_bound, cumulative_count in child.cumulative_bucket_counts():
+                samples.append((f'{self._name}_bucket', {**labels, 'le': _format_value(upper_bound)},
+                                cumulative_count))
+            samples.append((f'{self._name}_sum', labels, child.sum))
+            samples.append((f'{self._name}_count', labels, child.count))
+        return samples
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'type': self.type_name, 'documentation': self._documentation, 'samples': [
+            {'labels': labels, 'sum': child.sum, 'count': child.count,
+             'buckets': {_format_value(upper_bound): cumulative_count
+                         for upper_bound, cumulative_count in child.cumulative_bucket_counts()}}
+            for labels, child in self._labeled_children()
+        ]}
+
+
+AnyMetric = Union[Counter, Histogram]
+
+
+class MetricsRegistry:
+    """Collection of metrics by their names, rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, AnyMetric] = dict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'MetricsRegistry(metrics={list(self._metrics)})'
+
+    @property
+    def metrics(self) -> List[AnyMetric]:
+        return list(self._metrics.values())
+
+    def get(self, name: str) -> Optional[AnyMetric]:
+        return self._metrics.get(name)
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        """Counter of the name, registered on the first call"""
+        return self._register(Counter, name, documentation, label_names)
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Histogram of the name, registered on the first call"""
+        return self._register(Histogram, name, documentation, label_names, buckets=buckets)
+
+    def _register(self, metric_class, name: str, documentation: str, label_names: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, documentation, label_names, **kwargs)
+                self._metrics[name] = metric
+            elif type(metric) is not metric_class or metric.label_names != tuple(label_names):
+                raise ValueError(f'Metric {name} is already registered as {metric}')
+            return metric
+
+    def reset(self):
+        """Reset the values of all the metrics, the metrics stay registered"""
+        for metric in self.metrics:
+            metric.reset()
+
+    def to_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        return ''.join(metric.to_prometheus() + '\n' for metric in self.metrics)
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {metric.name: metric.to_dict() for metric in self.metrics}
+
+
+REGISTRY = MetricsRegistry()
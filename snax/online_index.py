@@ -0,0 +1,87 @@
+from typing import List, Dict, Any, Optional, Tuple, Hashable
+
+import pandas as pd
+
+from snax.feature_view import FeatureView
+from snax.type_casting import cast_to_feature_type
+from snax.value_type import Timestamp
+
+
+def entity_row_key(entity_row: Dict[str, Any], join_keys: List[str]) -> Hashable:
+    """Key of an entity given by a dict of its join key values, a scalar for single-column join keys"""
+    if len(join_keys) == 1:
+        return entity_row[join_keys[0]]
+    return tuple(entity_row[join_key] for join_key in join_keys)
+
+
+class OnlineIndex:
+    """
+    In-memory hash index of the rows of a feature view by the entity's join keys, for low-latency lookups
+    of individual entities without building any data frames
+
+    The rows are read from the view's source and cast to the features' types once, when the index is built
+
+    Args:
+        view: Feature view to index
+        entity_name: Name of the entity whose join keys index the rows
+    """
+
+    def __init__(self, view: FeatureView, entity_name: str):
+        entity = view.get_entity(entity_name)
+        self._view_name = view.name
+        self._join_keys = list(entity.join_keys)
+        self._feature_names = [feature.name for feature in view.features if feature.name not in self._join_keys]
+        self._feature_positions = {feature_name: position for position, feature_name in enumerate(self._feature_names)}
+
+        columns = self._join_keys + self._feature_names
+        if view.timestamp_field is not None and view.timestamp_field not in columns:
+            columns = columns + [view.timestamp_field]
+        data = view.source.select(columns=columns)
+        data = view.cast_feature_values(data, self._feature_names)
+        if view.timestamp_field is not None:
+            # The latest row of each entity wins, same as in the online store
+            timestamps = pd.Series(pd.to_datetime(cast_to_feature_type(data[view.timestamp_field], Timestamp)).to_numpy())
+            data = data.iloc[timestamps.sort_values(kind='stable', na_position='first').index]
+
+        if len(self._join_keys) == 1:
+            keys = data[self._join_keys[0]].tolist()
+        else:
+            keys = list(zip(*[data[join_key].tolist() for join_key in self._join_keys]))
+        rows = list(zip(*[data[feature_name].tolist() for feature_name in self._feature_names]))
+        if len(self._feature_names) == 0:
+            rows = [tuple()] * len(keys)
+
+        if view.timestamp_field is not None:
+            self._rows: Dict[Hashable, Tuple] = dict(zip(keys, rows))
+        else:
+            # Reversed, so that the first row wins for duplicated keys, same as in the batch retrieval
+            self._rows = dict(zip(reversed(keys), reversed(rows)))
+
+    def __repr__(self):
+        return f'OnlineIndex(view={self._view_name}, join_keys={self._join_keys}, size={len(self)})'
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def join_keys(self) -> List[str]:
+        return self._join_keys
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self._feature_names
+
+    def feature_position(self, feature_name: str) -> int:
+        """Position of the feature's value in the rows returned by `get_row`"""
+        try:
+            return self._feature_positions[feature_name]
+        except KeyError:
+            raise ValueError(f'Feature {feature_name} not found in feature view {self._view_name}')
+
+    def get_row(self, key: Hashable) -> Optional[Tuple]:
+        """Feature values of the entity with the given key in the order of `feature_names`, None if not found"""
+        return self._rows.get(key)
+
+    def get_rows(self, keys: List[Hashable]) -> List[Optional[Tuple]]:
+        """Feature values of the entities with the given keys, None for entities not found"""
+        return [self._rows.get(key) for key in keys]
@@ -0,0 +1,313 @@
+import json
+import sqlite3
+import threading
+from contextlib import nullcontext
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple, Hashable, Any, Dict, ContextManager
+
+import numpy as np
+import pandas as pd
+
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.type_casting import cast_to_feature_types
+from snax.value_type import Timestamp
+
+_METADATA_TABLE = 'snax_online_views'
+_MAX_SQLITE_PARAMETERS = 900
+# Version of the stored rows' format kept in the database's user_version, rows are JSON since version 1
+_FORMAT_VERSION = 1
+_TIMESTAMP_TAG = '__timestamp__'
+_DATE_TAG = '__date__'
+_DECIMAL_TAG = '__decimal__'
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _python_scalar(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _normalize_key_value(value: Any) -> Any:
+    """Key value encoded equally for all values equal as keys of a dict, as in OnlineIndex, e.g. 2 and 2.0"""
+    value = _python_scalar(value)
+    if isinstance(value, (datetime, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, Decimal):
+        value = float(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _encode_key(key: Hashable) -> str:
+    if isinstance(key, tuple):
+        return json.dumps([_normalize_key_value(key_) for key_ in key])
+    return json.dumps(_normalize_key_value(key))
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, (datetime, np.datetime64)):
+        return {_TIMESTAMP_TAG: pd.Timestamp(value).isoformat()}
+    if isinstance(value, date):
+        return {_DATE_TAG: value.isoformat()}
+    if isinstance(value, Decimal):
+        return {_DECIMAL_TAG: str(value)}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f'Value {value!r} of type {type(value).__name__} cannot be stored in the online store')
+
+
+def _decode_value(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and _TIMESTAMP_TAG in obj:
+        return pd.Timestamp(obj[_TIMESTAMP_TAG])
+    if len(obj) == 1 and _DATE_TAG in obj:
+        return date.fromisoformat(obj[_DATE_TAG])
+    if len(obj) == 1 and _DECIMAL_TAG in obj:
+        return Decimal(obj[_DECIMAL_TAG])
+    return obj
+
+
+def _encode_row(row: Tuple) -> str:
+    return json.dumps(row, default=_encode_value)
+
+
+def _decode_row(encoded_row: str) -> Tuple:
+    return tuple(json.loads(encoded_row, object_hook=_decode_value))
+
+
+class SqliteOnlineTable:
+    """
+    Feature values of a single feature view materialized in a SqliteOnlineStore, with the same lookup interface
+    as OnlineIndex
+
+    Args:
+        store: Online store the table is in
+        table: Name of the SQLite table
+        join_keys: Join keys of the entity indexing the rows
+        feature_names: Names of the features in the stored rows
+    """
+
+    def __init__(self, store: 'SqliteOnlineStore', table: str, join_keys: List[str], feature_names: List[str]):
+        self._store = store
+        self._table = table
+        self._join_keys = join_keys
+        self._feature_names = feature_names
+        self._feature_positions = {feature_name: position for position, feature_name in enumerate(feature_names)}
+
+    def __repr__(self):
+        return f'SqliteOnlineTable(table={self._table}, join_keys={self._join_keys})'
+
+    @property
+    def join_keys(self) -> List[str]:
+        return self._join_keys
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self._feature_names
+
+    def feature_position(self, feature_name: str) -> int:
+        """Position of the feature's value in the rows returned by `get_row`"""
+        try:
+            return self._feature_positions[feature_name]
+        except KeyError:
+            raise ValueError(f'Feature {feature_name} not materialized in {self._table}')
+
+    def get_row(self, key: Hashable) -> Optional[Tuple]:
+        """Feature values of the entity with the given key in the order of `feature_names`, None if not found"""
+        return self.get_rows([key])[0]
+
+    def get_rows(self, keys: List[Hashable]) -> List[Optional[Tuple]]:
+        """Feature values of the entities with the given keys, None for entities not found"""
+        encoded_keys = [_encode_key(key) for key in keys]
+        rows = dict()
+        connection = self._store.connection()
+        with self._store._read_lock():
+            for start in range(0, len(encoded_keys), _MAX_SQLITE_PARAMETERS):
+                chunk = encoded_keys[start:start + _MAX_SQLITE_PARAMETERS]
+                query = f'SELECT key, value FROM {_quote(self._table)} WHERE key IN ({", ".join("?" * len(chunk))})'
+                rows.update(connection.execute(query, chunk).fetchall())
+        return [_decode_row(rows[key]) if key in rows else None for key in encoded_keys]
+
+
+class SqliteOnlineStore:
+    """
+    Online store in a local SQLite file, holds feature values of feature views materialized from their data sources
+    keyed by the entity, for fast lookups by `FeatureStore.get_online_features`
+
+    Args:
+        path: Path of the SQLite database file, ':memory:' for a private in-memory database
+    """
+
+    def __init__(self, path: str):
+        self._path = str(path)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._memory_connection = sqlite3.connect(':memory:', check_same_thread=False) \
+            if self._path == ':memory:' else None
+
+        with self.connection() as connection:
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {_METADATA_TABLE} (table_name TEXT PRIMARY KEY, join_keys TEXT, '
+                f'feature_names TEXT, watermark TEXT)')
+            if connection.execute('PRAGMA user_version').fetchone()[0] < _FORMAT_VERSION:
+                # Tables in an older format have to be materialized again
+                for table, in connection.execute(f'SELECT table_name FROM {_METADATA_TABLE}').fetchall():
+                    connection.execute(f'DROP TABLE IF EXISTS {_quote(table)}')
+                connection.execute(f'DELETE FROM {_METADATA_TABLE}')
+                connection.execute(f'PRAGMA user_version = {_FORMAT_VERSION}')
+
+    def __repr__(self):
+        return f'SqliteOnlineStore(path={self._path})'
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def connection(self) -> sqlite3.Connection:
+        """SQLite connection of the current thread"""
+        if self._memory_connection is not None:
+            return self._memory_connection
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Used only by its thread, but closed by `close` from any thread
+            connection = sqlite3.connect(self._path, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def close(self):
+        """Close the connections of all threads, the store can't be used afterwards"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        if self._memory_connection is not None:
+            connections.append(self._memory_connection)
+        for connection in connections:
+            connection.close()
+
+    def _read_lock(self) -> ContextManager:
+        """
+        Lock of reads from the in-memory database, whose connection is shared by all threads and so sees
+        the uncommitted writes, file databases are read from per-thread connections without locking
+        """
+        return self._write_lock if self._memory_connection is not None else nullcontext()
+
+    @staticmethod
+    def table_name(view_name: str, entity_name: str) -> str:
+        return f'{view_name}__{entity_name}'
+
+    def get_table(self, view_name: str, entity_name: str) -> Optional[SqliteOnlineTable]:
+        """Materialized feature values of the view, None if the view was not materialized"""
+        table = self.table_name(view_name, entity_name)
+        metadata = self.connection().execute(
+            f'SELECT join_keys, feature_names FROM {_METADATA_TABLE} WHERE table_name = ?', [table]).fetchone()
+        if metadata is None:
+            return None
+        return SqliteOnlineTable(self, table, json.loads(metadata[0]), json.loads(metadata[1]))
+
+    def get_watermark(self, view_name: str, entity_name: str) -> Optional[datetime]:
+        """Latest timestamp of the view's rows materialized so far, None if unknown"""
+        metadata = self.connection().execute(
+            f'SELECT watermark FROM {_METADATA_TABLE} WHERE table_name = ?',
+            [self.table_name(view_name, entity_name)]).fetchone()
+        if metadata is None or metadata[0] is None:
+            return None
+        return datetime.fromisoformat(metadata[0])
+
+    def materialize(self, view: FeatureView, entity_name: str, incremental: bool = True) -> int:
+        """
+        Copy the feature values of the view from its data source into the online store
+
+        Args:
+            view: Feature view to materialize
+            entity_name: Name of the entity whose join keys index the stored rows
+            incremental: If the view has a timestamp field, copy only rows with timestamp not older than the latest
+                timestamp copied before, otherwise replace all the stored rows of the view
+
+        Returns:
+            Number of rows written
+        """
+        entity = view.get_entity(entity_name)
+        join_keys = list(entity.join_keys)
+        feature_names = [feature.name for feature in view.features if feature.name not in join_keys]
+        table = self.table_name(view.name, entity_name)
+        watermark = self.get_watermark(view.name, entity_name) if incremental else None
+        stored_table = self.get_table(view.name, entity_name)
+        if stored_table is not None and stored_table.feature_names != feature_names:
+            watermark = None
+
+        columns = join_keys + feature_names
+        if view.timestamp_field is not None and view.timestamp_field not in columns:
+            columns.append(view.timestamp_field)
+        data = view.source.select(columns=columns, timestamp_field=view.timestamp_field, start=watermark)
+        data = view.cast_feature_values(data, feature_names)
+        if view.timestamp_field is not None:
+            data = cast_to_feature_types(data, [Feature(view.timestamp_field, Timestamp)])
+
+        new_watermark = None
+        if view.timestamp_field is not None:
+            timestamps = data[view.timestamp_field]
+            if watermark is not None:
+                # Data sources that can't filter by time return all rows
+                data = data[timestamps >= pd.Timestamp(watermark)]
+            # The latest row of each entity wins
+            data = data.sort_values(view.timestamp_field, kind='stable', na_position='first').iloc[::-1]
+            new_watermark = data[view.timestamp_field].max() if len(data) > 0 else watermark
+
+        data = data.drop_duplicates(subset=join_keys)
+        if len(join_keys) == 1:
+            keys = data[join_keys[0]].tolist()
+        else:
+            keys = list(zip(*[data[join_key].tolist() for join_key in join_keys]))
+        rows = zip(*[data[feature_name].tolist() for feature_name in feature_names]) \
+            if len(feature_names) > 0 else [tuple()] * len(keys)
+        records = [(_encode_key(key), _encode_row(row)) for key, row in zip(keys, rows)]
+
+        with self._write_lock:
+            connection = self.connection()
+            written_table = table
+            if watermark is None:
+                # A full refresh is written to a staging table swapped in by a single transaction, so that
+                # concurrent lookups read either the previous or the new rows
+                written_table = f'{table}__staging'
+                connection.execute(f'DROP TABLE IF EXISTS {_quote(written_table)}')
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {_quote(written_table)} (key TEXT PRIMARY KEY, value TEXT)')
+            connection.commit()
+
+            connection.execute('BEGIN')
+            try:
+                connection.executemany(f'INSERT OR REPLACE INTO {_quote(written_table)} (key, value) VALUES (?, ?)',
+                                       records)
+                if written_table != table:
+                    connection.execute(f'DROP TABLE IF EXISTS {_quote(table)}')
+                    connection.execute(f'ALTER TABLE {_quote(written_table)} RENAME TO {_quote(table)}')
+                connection.execute(
+                    f'INSERT OR REPLACE INTO {_METADATA_TABLE} (table_name, join_keys, feature_names, watermark) '
+                    f'VALUES (?, ?, ?, ?)',
+                    [table, json.dumps(join_keys), json.dumps(feature_names),
+                     pd.Timestamp(new_watermark).isoformat() if not pd.isna(new_watermark) else None])
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+
+        return len(records)
+
+    def list_tables(self) -> Dict[str, Optional[str]]:
+        """Names of the materialized tables with their watermarks"""
+        return dict(self.connection().execute(f'SELECT table_name, watermark FROM {_METADATA_TABLE}').fetchall())
@@ -1,23 +1,59 @@
+import ast
+import hashlib
 import importlib
+import json
+import os
+import threading
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Iterator, Dict, Union, Set
 
 from snax.data_sources.data_source_base import DataSourceBase
 from snax.entity import Entity
 from snax.feature_view import FeatureView
+from snax.repo_profiler import RepoLoadProfiler
 from snax.value_type import ValueType
 
 DUMMY_ENTITY_ID = '__dummy_id'
 DUMMY_ENTITY_NAME = '__dummy'
 DUMMY_ENTITY = Entity(DUMMY_ENTITY_NAME, [DUMMY_ENTITY_ID], ValueType.STRING)
+MANIFEST_FORMAT_VERSION = 1
+
+RepoObject = Union[DataSourceBase, FeatureView, Entity]
 
 
 class RepoContents:
+    """
+    Feature views, entities and data sources of a repo, indexed by name, objects with duplicated names are listed,
+    but the first one added is returned by the get methods
+
+    Args:
+        data_sources: Data sources of the repo
+        feature_views: Feature views of the repo
+        entities: Entities of the repo
+    """
+
     def __init__(self, data_sources: List[DataSourceBase] = None, feature_views: List[FeatureView] = None,
                  entities: List[Entity] = None):
-        self._data_sources = data_sources or []
-        self._feature_views = feature_views or []
-        self._entities = entities or []
+        self._data_sources: List[DataSourceBase] = []
+        self._feature_views: List[FeatureView] = []
+        self._entities: List[Entity] = []
+        self._data_sources_by_name: Dict[str, DataSourceBase] = dict()
+        self._feature_views_by_name: Dict[str, FeatureView] = dict()
+        self._entities_by_name: Dict[str, Entity] = dict()
+        self._feature_views_by_feature: Dict[str, List[FeatureView]] = dict()
+        # Ids of the added objects, for deduplication by identity
+        self._object_ids: Set[int] = set()
+        # Objects defined by the repo's files and the files' modification times when they were imported
+        self._file_objects: Dict[Path, List[RepoObject]] = dict()
+        self._file_mtimes: Dict[Path, int] = dict()
+
+        for data_source in data_sources or []:
+            self.add_data_source(data_source)
+        for feature_view in feature_views or []:
+            self.add_feature_view(feature_view)
+        for entity in entities or []:
+            self.add_entity(entity)
 
     @property
     def data_sources(self) -> List[DataSourceBase]:
@@ -31,20 +67,48 @@ class RepoContents:
     def entities(self) -> List[Entity]:
         return self._entities
 
+    def add_data_source(self, data_source: DataSourceBase):
+        """Add the data source, unless the very same object was already added"""
+        if self._add_object(data_source):
+            self._data_sources.append(data_source)
+            self._data_sources_by_name.setdefault(data_source.name, data_source)
+
+    def add_feature_view(self, feature_view: FeatureView):
+        """Add the feature view, unless the very same object was already added"""
+        if self._add_object(feature_view):
+            self._feature_views.append(feature_view)
+            self._feature_views_by_name.setdefault(feature_view.name, feature_view)
+            for feature in feature_view.features or []:
+                self._feature_views_by_feature.setdefault(feature.name, []).append(feature_view)
+
+    def add_entity(self, entity: Entity):
+        """Add the entity, unless the very same object was already added"""
+        if self._add_object(entity):
+            self._entities.append(entity)
+            self._entities_by_name.setdefault(entity.name, entity)
+
+    def _add_object(self, obj) -> bool:
+        if id(obj) in self._object_ids:
+            return False
+        self._object_ids.add(id(obj))
+        return True
+
     def get_data_source(self, name: str) -> DataSourceBase:
-        for data_source in self.data_sources:
-            if data_source.name == name:
-                return data_source
+        return self._data_sources_by_name.get(name)
 
     def get_feature_view(self, name: str) -> FeatureView:
-        for feature_view in self.feature_views:
-            if feature_view.name == name:
-                return feature_view
+        return self._feature_views_by_name.get(name)
 
     def get_entity(self, name: str) -> Entity:
-        for entity in self.entities:
-            if entity.name == name:
-                return entity
+        return self._entities_by_name.get(name)
+
+    def get_feature_views_by_feature(self, feature_name: str) -> List[FeatureView]:
+        """Feature views with a feature of the given name"""
+        return list(self._feature_views_by_feature.get(feature_name, []))
+
+    def get_file_objects(self, repo_file_path: Path) -> List[RepoObject]:
+        """Feature views, entities and data sources added from the repo file"""
+        return list(self._file_objects.get(repo_file_path, []))
 
 
 def import_as_module(repo_file_path: str, repo_path: str):
@@ -57,26 +121,421 @@ def import_as_module(repo_file_path: str, repo_path: str):
     return module
 
 
-def parse_repo(repo_path: str) -> RepoContents:
+def _add_repo_object(repo_contents: RepoContents, obj, repo_file_path: Path):
+    if id(obj) in repo_contents._object_ids:
+        return
+    if isinstance(obj, DataSourceBase):
+        repo_contents.add_data_source(obj)
+    elif isinstance(obj, FeatureView):
+        repo_contents.add_feature_view(obj)
+    elif isinstance(obj, Entity):
+        repo_contents.add_entity(obj)
+    else:
+        return
+    repo_contents._file_objects.setdefault(repo_file_path, []).append(obj)
+
+
+def _add_module_objects(repo_contents: RepoContents, module, repo_file_path: Path):
+    for attr_name in dir(module):
+        _add_repo_object(repo_contents, getattr(module, attr_name), repo_file_path)
+
+
+def _import_repo_file(repo_contents: RepoContents, repo_file_path: Path, repo_path: Path,
+                      profiler: Optional[RepoLoadProfiler] = None):
+    # Modification time from before the import, so that changes during the import are found by the next reload
+    repo_contents._file_mtimes[repo_file_path] = repo_file_path.stat().st_mtime_ns
+    if profiler is None:
+        module = import_as_module(repo_file_path, repo_path)
+    else:
+        with profiler.measure_module(str(repo_file_path.relative_to(repo_path.resolve()))):
+            module = import_as_module(repo_file_path, repo_path)
+    _add_module_objects(repo_contents, module, repo_file_path)
+    return module
+
+
+def _repo_file_paths(repo_path: Path) -> List[Path]:
+    return sorted({path.resolve() for path in repo_path.glob('**/*.py')
+                   if path.is_file() and path.name != '__init__.py'})
+
+
+class RepoFileDefinitions:
+    """
+    Names of the feature views, entities and data sources a repo file defines
+
+    Args:
+        feature_views: Names of the feature views
+        entities: Names of the entities
+        data_sources: Names of the data sources
+    """
+
+    def __init__(self, feature_views: List[str] = None, entities: List[str] = None, data_sources: List[str] = None):
+        self._feature_views = feature_views or []
+        self._entities = entities or []
+        self._data_sources = data_sources or []
+
+    def __repr__(self):
+        return f'RepoFileDefinitions(feature_views={self.feature_views}, entities={self.entities}, ' \
+               f'data_sources={self.data_sources})'
+
+    def __eq__(self, other):
+        if not isinstance(other, RepoFileDefinitions):
+            return False
+        return self.to_dict() == other.to_dict()
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        return {'feature_views': self._feature_views, 'entities': self._entities, 'data_sources': self._data_sources}
+
+    @classmethod
+    def from_dict(cls, definitions: Dict[str, List[str]]) -> 'RepoFileDefinitions':
+        return cls(definitions['feature_views'], definitions['entities'], definitions['data_sources'])
+
+    @property
+    def feature_views(self) -> List[str]:
+        return self._feature_views
+
+    @property
+    def entities(self) -> List[str]:
+        return self._entities
+
+    @property
+    def data_sources(self) -> List[str]:
+        return self._data_sources
+
+
+def _called_class_name(call: ast.Call) -> Optional[str]:
+    if isinstance(call.func, ast.Name):
+        return call.func.id
+    if isinstance(call.func, ast.Attribute):
+        return call.func.attr
+    return None
+
+
+def _literal_name_argument(call: ast.Call) -> Optional[str]:
+    for keyword in call.keywords:
+        if keyword.arg == 'name':
+            return keyword.value.value if isinstance(keyword.value, ast.Constant) else None
+    if len(call.args) > 0 and isinstance(call.args[0], ast.Constant):
+        return call.args[0].value
+    return None
+
+
+def _module_level_assigned_calls(statements: List[ast.stmt]) -> Iterator[ast.Call]:
+    """Calls whose results are assigned to module attributes, i.e. not in bodies of functions and classes"""
+    for statement in statements:
+        if isinstance(statement, (ast.Assign, ast.AnnAssign)) and isinstance(statement.value, ast.Call):
+            yield statement.value
+        elif isinstance(statement, (ast.If, ast.For, ast.While, ast.With, ast.Try)):
+            for block in [statement.body, statement.orelse if hasattr(statement, 'orelse') else [],
+                          getattr(statement, 'finalbody', [])] + \
+                         [handler.body for handler in getattr(statement, 'handlers', [])]:
+                yield from _module_level_assigned_calls(block)
+
+
+def scan_repo_file(repo_file_path: Path) -> RepoFileDefinitions:
+    """
+    Find the names of the feature views, entities and data sources the repo file defines without importing it,
+    only the module attributes assigned calls of FeatureView, Entity and *DataSource classes with literal names
+    are found
+    """
+    definitions = RepoFileDefinitions()
+    module = ast.parse(Path(repo_file_path).read_text(), filename=str(repo_file_path))
+    for call in _module_level_assigned_calls(module.body):
+        class_name = _called_class_name(call)
+        name = _literal_name_argument(call)
+        if class_name is None or not isinstance(name, str):
+            continue
+        if class_name == 'FeatureView':
+            definitions.feature_views.append(name)
+        elif class_name == 'Entity':
+            definitions.entities.append(name)
+        elif class_name.endswith('DataSource') or class_name == 'DataSourceBase':
+            definitions.data_sources.append(name)
+    return definitions
+
+
+def _module_definitions(module) -> RepoFileDefinitions:
+    """Names of the feature views, entities and data sources in the imported module's attributes"""
+    definitions = RepoFileDefinitions()
+    for attr_name in dir(module):
+        obj = getattr(module, attr_name)
+        if isinstance(obj, DataSourceBase):
+            definitions.data_sources.append(obj.name)
+        if isinstance(obj, FeatureView):
+            definitions.feature_views.append(obj.name)
+        elif isinstance(obj, Entity):
+            definitions.entities.append(obj.name)
+    return definitions
+
+
+def _file_hash(repo_file_path: Path) -> str:
+    return hashlib.sha256(repo_file_path.read_bytes()).hexdigest()
+
+
+class RepoManifest:
+    """
+    Definitions of the repo files persisted between runs, with the files' content hashes, so that only new and
+    changed files need to be scanned, the definitions of imported files are replaced by the names they really define
+
+    Args:
+        path: Path of the manifest's JSON file, it's created if it doesn't exist
+        repo_path: Path to the directory with the feature repo definitions
+    """
+
+    def __init__(self, path: Union[str, Path], repo_path: Path):
+        self._path = Path(path)
+        self._repo_path = repo_path
+        self._files: Dict[str, Dict] = dict()
+        if self._path.exists():
+            manifest = json.loads(self._path.read_text())
+            if manifest.get('version') == MANIFEST_FORMAT_VERSION:
+                self._files = manifest['files']
+        self._changed = False
+
+    def __repr__(self):
+        return f'RepoManifest(path={self._path})'
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def _relative_path(self, repo_file_path: Path) -> str:
+        return repo_file_path.relative_to(self._repo_path.resolve()).as_posix()
+
+    def get_definitions(self, repo_file_path: Path) -> Optional[RepoFileDefinitions]:
+        """Definitions of the file, None if the file is not in the manifest or changed since"""
+        file_entry = self._files.get(self._relative_path(repo_file_path))
+        if file_entry is None:
+            return None
+
+        stat = repo_file_path.stat()
+        if file_entry['mtime_ns'] != stat.st_mtime_ns or file_entry['size'] != stat.st_size:
+            # Touched, but possibly not changed
+            if file_entry['sha256'] != _file_hash(repo_file_path):
+                return None
+            file_entry['mtime_ns'], file_entry['size'] = stat.st_mtime_ns, stat.st_size
+            self._changed = True
+        return RepoFileDefinitions.from_dict(file_entry['definitions'])
+
+    def set_definitions(self, repo_file_path: Path, definitions: RepoFileDefinitions):
+        stat = repo_file_path.stat()
+        self._files[self._relative_path(repo_file_path)] = {
+            'sha256': _file_hash(repo_file_path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'definitions': definitions.to_dict()
+        }
+        self._changed = True
+
+    def retain(self, repo_file_paths: List[Path]):
+        """Drop the files not in repo_file_paths, e.g. deleted ones"""
+        relative_paths = {self._relative_path(repo_file_path) for repo_file_path in repo_file_paths}
+        for relative_path in list(self._files):
+            if relative_path not in relative_paths:
+                del self._files[relative_path]
+                self._changed = True
+
+    def save(self):
+        """Write the manifest if it changed, written atomically, so that concurrent readers never see it half-written"""
+        if not self._changed:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self._path.with_name(f'{self._path.name}.{os.getpid()}.{threading.get_ident()}')
+        temporary_path.write_text(json.dumps({'version': MANIFEST_FORMAT_VERSION, 'files': self._files}))
+        os.replace(temporary_path, self._path)
+        self._changed = False
+
+
+class LazyRepoContents(RepoContents):
+    """
+    Contents of a repo whose files are scanned by `scan_repo_file` and imported only when some of their
+    definitions are asked for, listing all the feature views, entities or data sources imports all the files
+
+    Args:
+        repo_path: Path to the directory with the feature repo definitions
+        manifest_path: Optional path of a RepoManifest with the files' definitions from previous runs
+        profiler: Optional profiler measuring the imports of the files
+    """
+
+    def __init__(self, repo_path: Path, manifest_path: Optional[Union[str, Path]] = None,
+                 profiler: Optional[RepoLoadProfiler] = None):
+        super().__init__()
+        self._repo_path = Path(repo_path)
+        self._profiler = profiler
+        self._not_imported_file_paths = _repo_file_paths(self._repo_path)
+        for repo_file_path in self._not_imported_file_paths:
+            self._file_mtimes[repo_file_path] = repo_file_path.stat().st_mtime_ns
+        self._manifest = RepoManifest(manifest_path, self._repo_path) if manifest_path is not None else None
+        self._definitions = {repo_file_path: self._get_file_definitions(repo_file_path)
+                             for repo_file_path in self._not_imported_file_paths}
+        if self._manifest is not None:
+            self._manifest.retain(self._not_imported_file_paths)
+            self._manifest.save()
+        self._lock = threading.RLock()
+
+    @property
+    def data_sources(self) -> List[DataSourceBase]:
+        self._import_all()
+        return self._data_sources
+
+    @property
+    def feature_views(self) -> List[FeatureView]:
+        self._import_all()
+        return self._feature_views
+
+    @property
+    def entities(self) -> List[Entity]:
+        self._import_all()
+        return self._entities
+
+    @property
+    def imported_file_paths(self) -> List[Path]:
+        return [path for path in self._definitions if path not in self._not_imported_file_paths]
+
+    def get_data_source(self, name: str) -> DataSourceBase:
+        return self._get('data_sources', name)
+
+    def get_feature_view(self, name: str) -> FeatureView:
+        return self._get('feature_views', name)
+
+    def get_entity(self, name: str) -> Entity:
+        if name == DUMMY_ENTITY_NAME:
+            return DUMMY_ENTITY
+        return self._get('entities', name)
+
+    def get_feature_views_by_feature(self, feature_name: str) -> List[FeatureView]:
+        self._import_all()
+        return super().get_feature_views_by_feature(feature_name)
+
+    def _get_file_definitions(self, repo_file_path: Path) -> RepoFileDefinitions:
+        definitions = self._manifest.get_definitions(repo_file_path) if self._manifest is not None else None
+        if definitions is None:
+            definitions = scan_repo_file(repo_file_path)
+            if self._manifest is not None:
+                self._manifest.set_definitions(repo_file_path, definitions)
+        return definitions
+
+    def _find(self, kind: str, name: str):
+        return getattr(self, f'_{kind}_by_name').get(name)
+
+    def _get(self, kind: str, name: str):
+        obj = self._find(kind, name)
+        if obj is not None:
+            return obj
+
+        with self._lock:
+            # Files defining the name first, then the others, for definitions the scan can't find
+            file_paths = sorted(self._not_imported_file_paths,
+                                key=lambda path: name not in getattr(self._definitions[path], kind))
+            for file_path in file_paths:
+                obj = self._find(kind, name)
+                if obj is not None:
+                    return obj
+                self._import(file_path)
+            return self._find(kind, name)
+
+    def _import(self, repo_file_path: Path):
+        if repo_file_path in self._not_imported_file_paths:
+            module = _import_repo_file(self, repo_file_path, self._repo_path, self._profiler)
+            self._not_imported_file_paths.remove(repo_file_path)
+
+            definitions = _module_definitions(module)
+            if self._manifest is not None and definitions != self._definitions[repo_file_path]:
+                self._definitions[repo_file_path] = definitions
+                self._manifest.set_definitions(repo_file_path, definitions)
+                self._manifest.save()
+
+    def _reloaded(self, changed_file_paths: List[Path]) -> 'LazyRepoContents':
+        """New contents of the repo, with the objects of the imported files that didn't change"""
+        reloaded = LazyRepoContents(self._repo_path, self._manifest.path if self._manifest is not None else None,
+                                    self._profiler)
+        for repo_file_path in self.imported_file_paths:
+            if repo_file_path not in changed_file_paths and repo_file_path in reloaded._not_imported_file_paths:
+                reloaded._not_imported_file_paths.remove(repo_file_path)
+                reloaded._file_mtimes[repo_file_path] = self._file_mtimes[repo_file_path]
+                for obj in self.get_file_objects(repo_file_path):
+                    _add_repo_object(reloaded, obj, repo_file_path)
+        return reloaded
+
+    def _import_all(self):
+        if len(self._not_imported_file_paths) > 0 or DUMMY_ENTITY_NAME not in self._entities_by_name:
+            with self._lock, self._profiler.tracing() if self._profiler is not None else nullcontext():
+                for repo_file_path in list(self._not_imported_file_paths):
+                    self._import(repo_file_path)
+                self.add_entity(DUMMY_ENTITY)
+
+
+def parse_repo(repo_path: str, lazy: bool = False, manifest_path: Optional[Union[str, Path]] = None,
+               profiler: Optional[RepoLoadProfiler] = None) -> RepoContents:
+    """
+    Collect the feature views, entities and data sources defined in the repo's python files
+
+    Args:
+        repo_path: Path to the directory with the feature repo definitions
+        lazy: Import the files only when their definitions are first asked for, see LazyRepoContents
+        manifest_path: Optional path of a RepoManifest persisting the files' definitions between runs of lazy parsing
+        profiler: Optional profiler measuring the imports of the files and the data sources constructed by them
+
+    Returns:
+        Contents of the repo
+    """
     # TODO: Implement also for git repos
     repo_path = Path(repo_path)
-    repo_file_paths = {path.resolve() for path in repo_path.glob('**/*.py')
-                       if path.is_file() and path.name != '__init__.py'}
+    if lazy:
+        return LazyRepoContents(repo_path, manifest_path, profiler)
+    if manifest_path is not None:
+        raise ValueError('Manifest is supported only by lazy parsing')
 
     repo_contents = RepoContents()
-    data_sources_set = set()
-    for repo_file_paths in repo_file_paths:
-        module = import_as_module(repo_file_paths, repo_path)
-
-        for attr_name in dir(module):
-            obj = getattr(module, attr_name)
-            if isinstance(obj, DataSourceBase) and not any((obj is ds) for ds in repo_contents.data_sources):
-                repo_contents.data_sources.append(obj)
-                data_sources_set.add(obj)
-            if isinstance(obj, FeatureView) and not any((obj is fv) for fv in repo_contents.feature_views):
-                repo_contents.feature_views.append(obj)
-            elif isinstance(obj, Entity) and not any((obj is entity) for entity in repo_contents.entities):
-                repo_contents.entities.append(obj)
-
-    repo_contents.entities.append(DUMMY_ENTITY)
+    with profiler.tracing() if profiler is not None else nullcontext():
+        for repo_file_path in _repo_file_paths(repo_path):
+            _import_repo_file(repo_contents, repo_file_path, repo_path, profiler)
+
+    repo_contents.add_entity(DUMMY_ENTITY)
     return repo_contents
+
+
+def changed_repo_file_paths(repo_contents: RepoContents, repo_path: str) -> List[Path]:
+    """New, modified and deleted files of the repo since they were imported (or scanned by lazy parsing)"""
+    file_mtimes = dict()
+    for repo_file_path in _repo_file_paths(Path(repo_path)):
+        try:
+            file_mtimes[repo_file_path] = repo_file_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            continue
+
+    changed_file_paths = [repo_file_path for repo_file_path, mtime in file_mtimes.items()
+                          if repo_contents._file_mtimes.get(repo_file_path) != mtime]
+    deleted_file_paths = [repo_file_path for repo_file_path in repo_contents._file_mtimes
+                          if repo_file_path not in file_mtimes]
+    return sorted(changed_file_paths + deleted_file_paths)
+
+
+def reload_repo(repo_contents: RepoContents, repo_path: str, changed_file_paths: List[Path]) -> RepoContents:
+    """
+    New contents of the repo with the changed files imported again, the objects of the other files are kept,
+    so that their loaded data and caches stay warm
+
+    Args:
+        repo_contents: Current contents of the repo, they are not modified
+        repo_path: Path to the directory with the feature repo definitions
+        changed_file_paths: New, modified and deleted files of the repo, see `changed_repo_file_paths`
+
+    Returns:
+        Contents of the repo
+    """
+    if isinstance(repo_contents, LazyRepoContents):
+        return repo_contents._reloaded(changed_file_paths)
+
+    repo_path = Path(repo_path)
+    reloaded = RepoContents()
+    for repo_file_path in _repo_file_paths(repo_path):
+        if repo_file_path in changed_file_paths or repo_file_path not in repo_contents._file_mtimes:
+            _import_repo_file(reloaded, repo_file_path, repo_path)
+            continue
+
+        reloaded._file_mtimes[repo_file_path] = repo_contents._file_mtimes[repo_file_path]
+        for obj in repo_contents.get_file_objects(repo_file_path):
+            _add_repo_object(reloaded, obj, repo_file_path)
+
+    reloaded.add_entity(DUMMY_ENTITY)
+    return reloaded
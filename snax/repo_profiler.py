@@ -0,0 +1,322 @@
+"""
+Profiling of loading a feature repo, to find the repo files and data sources that make it slow
+
+Each imported repo module and each data source constructed while importing it is measured for its wall time,
+the change of memory allocated by python (traced by tracemalloc) and the bytes read and written by the process
+(from /proc/self/io, so only on Linux). A module's cost includes the costs of the data sources it constructs.
+Memory allocations are traced for the whole load, the wall times include the overhead of the tracing, which slows
+down allocation-heavy code, profile with `RepoLoadProfiler(trace_memory=False)` for wall times without it
+"""
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import List, Optional, Dict, Tuple, Iterator, Any, Union, Callable
+
+from snax.data_sources.data_source_base import DataSourceBase
+
+_PROC_IO_PATH = Path('/proc/self/io')
+
+_TABLE_COLUMNS = [('kind', 11), ('name', 40), ('wall time [ms]', 14), ('memory [KiB]', 12), ('read [KiB]', 10),
+                  ('written [KiB]', 13)]
+_SORT_KEYS = ['wall_time', 'memory_delta', 'read_bytes', 'written_bytes']
+
+
+def _io_counters() -> Optional[Tuple[int, int]]:
+    """Bytes read and written by the process, including reads served from the page cache, None if unknown"""
+    try:
+        counters = dict(line.split(': ') for line in _PROC_IO_PATH.read_text().splitlines())
+    except OSError:
+        return None
+    return int(counters['rchar']), int(counters['wchar'])
+
+
+class LoadCost:
+    """
+    Cost of importing a repo module or of constructing a data source
+
+    Args:
+        kind: Either 'module' or 'data_source'
+        name: Path of the module relative to the repo, or name of the data source with its class
+        wall_time: Wall time in seconds
+        memory_delta: Change of the memory allocated by python in bytes, None if the allocations weren't traced
+        read_bytes: Bytes read by the process, None if unknown
+        written_bytes: Bytes written by the process, None if unknown
+    """
+
+    def __init__(self, kind: str, name: str, wall_time: float, memory_delta: Optional[int],
+                 read_bytes: Optional[int] = None, written_bytes: Optional[int] = None):
+        self._kind = kind
+        self._name = name
+        self._wall_time = wall_time
+        self._memory_delta = memory_delta
+        self._read_bytes = read_bytes
+        self._written_bytes = written_bytes
+
+    def __repr__(self):
+        return f'LoadCost(kind={self._kind}, name={self._name}, wall_time={self._wall_time:.4f})'
+
+    @property
+    def kind(self) -> str:
+        return self._kind
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def wall_time(self) -> float:
+        return self._wall_time
+
+    @property
+    def memory_delta(self) -> Optional[int]:
+        return self._memory_delta
+
+    @property
+    def read_bytes(self) -> Optional[int]:
+        return self._read_bytes
+
+    @property
+    def written_bytes(self) -> Optional[int]:
+        return self._written_bytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'kind': self._kind, 'name': self._name, 'wall_time': self._wall_time,
+                'memory_delta': self._memory_delta, 'read_bytes': self._read_bytes,
+                'written_bytes': self._written_bytes}
+
+
+def _format_kib(value: Optional[int]) -> str:
+    return '' if value is None else f'{value / 1024:.1f}'
+
+
+class RepoLoadProfile:
+    """
+    Costs of loading a repo, see `RepoLoadProfiler`
+
+    Args:
+        costs: Costs of the imported modules and constructed data sources, in the order they were measured
+    """
+
+    def __init__(self, costs: Optional[List[LoadCost]] = None):
+        self._costs = costs if costs is not None else []
+
+    def __repr__(self):
+        return f'RepoLoadProfile(modules={len(self.modules)}, data_sources={len(self.data_sources)}, ' \
+               f'wall_time={self.wall_time:.4f})'
+
+    def __str__(self):
+        return self.format_table()
+
+    @property
+    def costs(self) -> List[LoadCost]:
+        return self._costs
+
+    @property
+    def modules(self) -> List[LoadCost]:
+        return [cost for cost in self._costs if cost.kind == 'module']
+
+    @property
+    def data_sources(self) -> List[LoadCost]:
+        return [cost for cost in self._costs if cost.kind == 'data_source']
+
+    @property
+    def wall_time(self) -> float:
+        """Total wall time of importing the modules"""
+        return sum(cost.wall_time for cost in self.modules)
+
+    def sorted(self, by: str = 'wall_time') -> List[LoadCost]:
+        """Costs sorted from the highest by one of 'wall_time', 'memory_delta', 'read_bytes' and 'written_bytes'"""
+        if by not in _SORT_KEYS:
+            raise ValueError(f'by must be one of {_SORT_KEYS}')
+        return sorted(self._costs, key=lambda cost: getattr(cost, by) or 0, reverse=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'wall_time': self.wall_time, 'costs': [cost.to_dict() for cost in self._costs]}
+
+    def format_table(self, by: str = 'wall_time', limit: Optional[int] = None) -> str:
+        """
+        Table of the costs sorted from the highest
+
+        Args:
+            by: Cost to sort by, see `sorted`
+            limit: Maximal number of rows, if None, all costs are listed
+
+        Returns:
+            The table as a string
+        """
+        lines = ['  '.join(column.ljust(width) for column, width in _TABLE_COLUMNS)]
+        for cost in self.sorted(by)[:limit]:
+            values = [cost.kind, cost.name, f'{cost.wall_time * 1000:.1f}', _format_kib(cost.memory_delta),
+                      _format_kib(cost.read_bytes), _format_kib(cost.written_bytes)]
+            lines.append('  '.join(value.ljust(width) if i < 2 else value.rjust(width)
+                                   for i, (value, (_, width)) in enumerate(zip(values, _TABLE_COLUMNS))))
+        return '\n'.join(lines)
+
+
+class RepoLoadProfiler:
+    """
+    Measures the costs of importing repo modules and of the data sources constructed by them,
+    pass it to `parse_repo` or use `FeatureStore(..., profile=True)`
+
+    Data sources are measured by wrapping the constructors of the DataSourceBase subclasses defined before
+    the measuring started, subclasses defined in the repo itself are measured only as part of their module.
+    The constructors are wrapped once for all the profilers measuring concurrently and restored when the last
+    of them stops, the same way the memory allocations are traced
+
+    Args:
+        trace_memory: Trace the memory allocations to measure the memory deltas, slows down allocations
+    """
+
+    def __init__(self, trace_memory: bool = True):
+        self._trace_memory = trace_memory
+        self._costs: List[LoadCost] = []
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'RepoLoadProfiler(costs={len(self._costs)})'
+
+    @property
+    def trace_memory(self) -> bool:
+        return self._trace_memory
+
+    @property
+    def profile(self) -> RepoLoadProfile:
+        with self._lock:
+            return RepoLoadProfile(list(self._costs))
+
+    @contextmanager
+    def tracing(self) -> Iterator[None]:
+        """Trace the memory allocations for all the measurements in the context, instead of for each of them"""
+        if not self._trace_memory:
+            yield
+            return
+        _start_tracing()
+        try:
+            yield
+        finally:
+            _stop_tracing()
+
+    @contextmanager
+    def measure(self, kind: str, name: Union[str, Callable[[], str]]) -> Iterator[None]:
+        """
+        Measure the cost of the code in the context and record it under the kind and name,
+        the name can be a function called after the code ran
+        """
+        with self.tracing():
+            io_counters_before = _io_counters()
+            memory_before = tracemalloc.get_traced_memory()[0] if self._trace_memory else None
+            start_time = time.perf_counter()
+            try:
+                yield
+            finally:
+                wall_time = time.perf_counter() - start_time
+                memory_delta = None
+                # Tracing stopped by code outside the profilers loses the traced memory
+                if memory_before is not None and tracemalloc.is_tracing():
+                    memory_delta = tracemalloc.get_traced_memory()[0] - memory_before
+                io_counters_after = _io_counters()
+                read_bytes = written_bytes = None
+                if io_counters_before is not None and io_counters_after is not None:
+                    read_bytes = io_counters_after[0] - io_counters_before[0]
+                    written_bytes = io_counters_after[1] - io_counters_before[1]
+                name = name() if callable(name) else name
+                with self._lock:
+                    self._costs.append(LoadCost(kind, name, wall_time, memory_delta, read_bytes, written_bytes))
+
+    @contextmanager
+    def measure_module(self, name: str) -> Iterator[None]:
+        """Measure importing the module together with the data sources constructed during the import"""
+        with self.measure('module', name), self._data_source_constructors_measured():
+            yield
+
+    @contextmanager
+    def _data_source_constructors_measured(self) -> Iterator[None]:
+        token = _active_profiler.set(self)
+        _patch_data_source_constructors()
+        try:
+            yield
+        finally:
+            _active_profiler.reset(token)
+            _restore_data_source_constructors()
+
+
+# Data source constructors are patched once for all the profilers measuring concurrently, the patched constructors
+# measure into the profiler active in the context they are called in
+_active_profiler: ContextVar[Optional[RepoLoadProfiler]] = ContextVar('snax_active_profiler', default=None)
+# Only the outermost data source constructor is measured
+_constructor_depth: ContextVar[int] = ContextVar('snax_constructor_depth', default=0)
+_patch_lock = threading.Lock()
+_patch_count = 0
+_original_constructors: Dict[type, Callable] = dict()
+# Memory allocations are traced once for all the profilers measuring concurrently, until the last of them stops,
+# tracing started outside the profilers is left running
+_tracing_count = 0
+_started_tracing = False
+
+
+def _start_tracing():
+    global _tracing_count, _started_tracing
+    with _patch_lock:
+        _tracing_count += 1
+        if _tracing_count == 1 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+
+
+def _stop_tracing():
+    global _tracing_count, _started_tracing
+    with _patch_lock:
+        _tracing_count -= 1
+        if _tracing_count == 0 and _started_tracing:
+            _started_tracing = False
+            tracemalloc.stop()
+
+
+def _patch_data_source_constructors():
+    global _patch_count
+    with _patch_lock:
+        _patch_count += 1
+        if _patch_count > 1:
+            return
+        data_source_classes = [DataSourceBase]
+        while data_source_classes:
+            data_source_class = data_source_classes.pop()
+            data_source_classes.extend(data_source_class.__subclasses__())
+            if '__init__' in vars(data_source_class) and data_source_class not in _original_constructors:
+                _original_constructors[data_source_class] = vars(data_source_class)['__init__']
+                data_source_class.__init__ = _measured_constructor(vars(data_source_class)['__init__'])
+
+
+def _restore_data_source_constructors():
+    global _patch_count
+    with _patch_lock:
+        _patch_count -= 1
+        if _patch_count > 0:
+            return
+        for data_source_class, constructor in _original_constructors.items():
+            data_source_class.__init__ = constructor
+        _original_constructors.clear()
+
+
+def _measured_constructor(constructor):
+    def measured_constructor(data_source: DataSourceBase, *args, **kwargs):
+        profiler = _active_profiler.get()
+        if profiler is None or _constructor_depth.get() > 0:
+            return constructor(data_source, *args, **kwargs)
+
+        def name() -> str:
+            # The name is known only after the construction
+            return f'{getattr(data_source, "name", None)} ({type(data_source).__name__})'
+
+        token = _constructor_depth.set(1)
+        try:
+            with profiler.measure('data_source', name):
+                constructor(data_source, *args, **kwargs)
+        finally:
+            _constructor_depth.reset(token)
+
+    measured_constructor.__wrapped__ = constructor
+    return measured_constructor
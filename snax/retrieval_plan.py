@@ -0,0 +1,253 @@
+from typing import List, Dict, Optional, Tuple, Hashable, Union
+
+import pandas as pd
+
+from snax import tracing
+from snax.async_executor import run_blocking
+from snax.data_sources.data_source_base import DataSourceBase
+from snax.data_sources.oracle_data_source import OracleDataSource, select_joined
+from snax.feature_view import FeatureView
+from snax.type_casting import CastStats
+
+
+def _cast_views_feature_values(feature_values: pd.DataFrame, join_keys: List[str],
+                               view_feature_names: List[Tuple[FeatureView, List[str]]],
+                               cast_stats: Optional[CastStats] = None) -> pd.DataFrame:
+    cast_feature_values = [feature_values[join_keys]]
+    cast_columns = set()
+    for view, feature_names in view_feature_names:
+        feature_names = [name for name in feature_names if name not in cast_columns and name not in join_keys]
+        cast_feature_values.append(view.cast_feature_values(feature_values[feature_names], feature_names, cast_stats))
+        cast_columns.update(feature_names)
+
+    return pd.concat(cast_feature_values, axis=1)
+
+
+class RetrievalStep:
+    """
+    Single select from a data source that retrieves features of one or more feature views sharing the source
+
+    Args:
+        source: Data source to select from
+        join_keys: Join keys of the entity used to select the rows
+        view_feature_names: Feature views with names of their features retrieved in this step
+    """
+
+    def __init__(self, source: DataSourceBase, join_keys: List[str],
+                 view_feature_names: List[Tuple[FeatureView, List[str]]]):
+        self._source = source
+        self._join_keys = join_keys
+        self._view_feature_names = view_feature_names
+
+    def __repr__(self):
+        return f'RetrievalStep(source={self.source.name}, join_keys={self.join_keys}, columns={self.columns})'
+
+    @property
+    def source(self) -> DataSourceBase:
+        return self._source
+
+    @property
+    def join_keys(self) -> List[str]:
+        return self._join_keys
+
+    @property
+    def view_feature_names(self) -> List[Tuple[FeatureView, List[str]]]:
+        return self._view_feature_names
+
+    @property
+    def columns(self) -> List[str]:
+        """Feature columns selected in this step, in the order they were requested"""
+        columns = dict()
+        for _, feature_names in self._view_feature_names:
+            columns.update(dict.fromkeys(feature_names))
+        return [column for column in columns if column not in self._join_keys]
+
+    def get_feature_values(self, key_values: pd.DataFrame, cast_stats: Optional[CastStats] = None) -> pd.DataFrame:
+        """Select the step's columns for the distinct key values and cast them to the types of their feature views"""
+        with tracing.span('retrieval.step', source=self._source.name, key_values=len(key_values)) as span:
+            if span.is_recording:
+                span.set_attribute('views', self._view_names())
+            feature_values = self._source.select(
+                columns=self._join_keys + self.columns,
+                key=self._join_keys,
+                key_values=key_values
+            )
+
+            return _cast_views_feature_values(feature_values, self._join_keys, self._view_feature_names, cast_stats)
+
+    async def get_feature_values_async(self, key_values: pd.DataFrame,
+                                       cast_stats: Optional[CastStats] = None) -> pd.DataFrame:
+        """Asyncio counterpart of `get_feature_values`"""
+        with tracing.span('retrieval.step', source=self._source.name, key_values=len(key_values)) as span:
+            if span.is_recording:
+                span.set_attribute('views', self._view_names())
+            feature_values = await self._source.select_async(
+                columns=self._join_keys + self.columns,
+                key=self._join_keys,
+                key_values=key_values
+            )
+
+            return await run_blocking(_cast_views_feature_values, feature_values, self._join_keys,
+                                      self._view_feature_names, cast_stats)
+
+    def _view_names(self) -> List[str]:
+        return [view.name for view, _ in self._view_feature_names]
+
+    def explain(self) -> str:
+        return f'select [{", ".join(self.columns)}] from {self.source} by [{", ".join(self.join_keys)}]'
+
+
+class JoinedRetrievalStep:
+    """
+    Single select that left joins tables of several Oracle data sources on the same engine in the database
+
+    Args:
+        steps: Retrieval steps of the data sources to join, they need to share the join keys
+    """
+
+    def __init__(self, steps: List[RetrievalStep]):
+        self._steps = steps
+
+    def __repr__(self):
+        return f'JoinedRetrievalStep(steps={self.steps})'
+
+    @property
+    def steps(self) -> List[RetrievalStep]:
+        return self._steps
+
+    @property
+    def sources(self) -> List[DataSourceBase]:
+        return [step.source for step in self._steps]
+
+    @property
+    def join_keys(self) -> List[str]:
+        return self._steps[0].join_keys
+
+    @property
+    def view_feature_names(self) -> List[Tuple[FeatureView, List[str]]]:
+        return sum([step.view_feature_names for step in self._steps], [])
+
+    @property
+    def columns(self) -> List[str]:
+        return sum([step.columns for step in self._steps], [])
+
+    def get_feature_values(self, key_values: pd.DataFrame, cast_stats: Optional[CastStats] = None) -> pd.DataFrame:
+        """Select the columns of all the joined steps for the distinct key values and cast them"""
+        with tracing.span('retrieval.joined_step', key_values=len(key_values)) as joined_span:
+            if joined_span.is_recording:
+                joined_span.set_attributes(sources=[source.name for source in self.sources],
+                                           views=[view.name for view, _ in self.view_feature_names])
+            with tracing.span('data_source.select_joined') as span:
+                feature_values = select_joined(
+                    sources_columns=[(step.source, step.columns) for step in self._steps],
+                    key=self.join_keys,
+                    key_values=key_values
+                )
+                if span.is_recording:
+                    span.set_attributes(rows=len(feature_values), bytes=tracing.dataframe_bytes(feature_values))
+            return _cast_views_feature_values(feature_values, self.join_keys, self.view_feature_names, cast_stats)
+
+    async def get_feature_values_async(self, key_values: pd.DataFrame,
+                                       cast_stats: Optional[CastStats] = None) -> pd.DataFrame:
+        """Asyncio counterpart of `get_feature_values`"""
+        return await run_blocking(self.get_feature_values, key_values, cast_stats)
+
+    def explain(self) -> str:
+        sources = ' joined with '.join(str(source) for source in self.sources)
+        return f'select [{", ".join(self.columns)}] from {sources} by [{", ".join(self.join_keys)}] in the database'
+
+
+AnyRetrievalStep = Union[RetrievalStep, JoinedRetrievalStep]
+
+
+class RetrievalPlan:
+    """
+    Retrieval of features of several feature views, grouped into one step per physical data source and entity key
+
+    Args:
+        steps: Retrieval steps of the plan
+    """
+
+    def __init__(self, steps: List[AnyRetrievalStep]):
+        self._steps = steps
+
+    def __repr__(self):
+        return f'RetrievalPlan(steps={self.steps})'
+
+    @property
+    def steps(self) -> List[AnyRetrievalStep]:
+        return self._steps
+
+    def explain(self) -> str:
+        """Human-readable description of the plan"""
+        n_views = sum(len(step.view_feature_names) for step in self._steps)
+        lines = [f'RetrievalPlan: {len(self._steps)} select(s) for {n_views} feature view(s)']
+        for step_number, step in enumerate(self._steps, start=1):
+            lines.append(f'  {step_number}. {step.explain()}')
+            for view, feature_names in step.view_feature_names:
+                lines.append(f'     - {view.name}: {", ".join(feature_names)}')
+        return '\n'.join(lines)
+
+
+def _source_group_key(source: DataSourceBase, join_keys: List[str]) -> Hashable:
+    return source.storage_key, tuple(sorted(source.field_mapping.items())), tuple(join_keys)
+
+
+def plan_retrieval(views_feature_names: List[Tuple[FeatureView, List[str]]], entity_name: str) -> RetrievalPlan:
+    """
+    Group the requested features of feature views by the physical data source and the entity join keys,
+    so that each such group is retrieved by a single select
+
+    Args:
+        views_feature_names: Feature views with names of the requested features
+        entity_name: Name of the entity identifying the rows
+
+    Returns:
+        The retrieval plan
+    """
+    steps: List[RetrievalStep] = []
+    group_steps: Dict[Hashable, List[RetrievalStep]] = dict()
+    for view, feature_names in views_feature_names:
+        join_keys = view.get_entity(entity_name).join_keys
+        group_key = _source_group_key(view.source, join_keys)
+        # A column is selected once and cast to a single type, views defining it with another type get their own step
+        step = next((step for step in group_steps.get(group_key, [])
+                     if not _has_conflicting_feature_types(step, view, feature_names)), None)
+        if step is None:
+            step = RetrievalStep(source=view.source, join_keys=list(join_keys), view_feature_names=[])
+            steps.append(step)
+            group_steps.setdefault(group_key, []).append(step)
+        step.view_feature_names.append((view, feature_names))
+
+    return RetrievalPlan(_join_steps_in_database(steps))
+
+
+def _has_conflicting_feature_types(step: RetrievalStep, view: FeatureView, feature_names: List[str]) -> bool:
+    """If some of the features are retrieved by the step with a different feature type"""
+    for step_view, step_feature_names in step.view_feature_names:
+        for feature_name in set(feature_names).intersection(step_feature_names).difference(step.join_keys):
+            if view.get_feature(feature_name).dtype != step_view.get_feature(feature_name).dtype:
+                return True
+    return False
+
+
+def _join_steps_in_database(steps: List[RetrievalStep]) -> List[AnyRetrievalStep]:
+    """Replace steps reading Oracle tables on the same engine by the same keys by a single joined step"""
+    open_groups: Dict[Hashable, List[RetrievalStep]] = dict()
+    groups: List[List[RetrievalStep]] = []
+    for step in steps:
+        group_key = (str(step.source.engine.url), tuple(step.join_keys)) \
+            if isinstance(step.source, OracleDataSource) else None
+        group = open_groups.get(group_key) if group_key is not None else None
+        # Columns of the joined tables must not collide, otherwise the step gets its own select
+        if group is not None and not any(column in grouped_step.columns
+                                         for grouped_step in group for column in step.columns):
+            group.append(step)
+            continue
+
+        group = [step]
+        groups.append(group)
+        if group_key is not None:
+            open_groups[group_key] = group
+
+    return [group[0] if len(group) == 1 else JoinedRetrievalStep(group) for group in groups]
@@ -0,0 +1,237 @@
+"""
+Data published once to shared memory by a parent process and read without copying by worker processes
+
+A publisher under a name owns a small manifest segment with the current generation number and one segment per
+published generation with the data encoded by `snax.snapshot.encode_dataframe`. Republishing creates a segment of
+the next generation and then switches the manifest to it, so readers always see a complete generation
+"""
+import json
+import logging
+import threading
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from snax.snapshot import EncodedData, encode_dataframe
+
+_ALIGNMENT = 64
+_HEADER_LENGTH_SIZE = 8
+_MANIFEST_SIZE = 8
+_MAX_ATTACH_ATTEMPTS = 10
+
+# Segments created by publishers of this process, they stay registered with its resource tracker
+_created_segment_names = set()
+
+logger = logging.getLogger(__name__)
+
+
+def _generation_segment_name(name: str, generation: int) -> str:
+    return f'{name}_{generation}'
+
+
+def _attach(segment_name: str) -> SharedMemory:
+    """Attach to an existing segment without letting this process' resource tracker unlink it at exit"""
+    segment = SharedMemory(name=segment_name)
+    if segment_name not in _created_segment_names:
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
+
+
+def _create(segment_name: str, size: int) -> SharedMemory:
+    segment = SharedMemory(name=segment_name, create=True, size=size)
+    _created_segment_names.add(segment_name)
+    return segment
+
+
+def _unlink(segment: SharedMemory):
+    segment.close()
+    segment.unlink()
+    _created_segment_names.discard(segment.name)
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+class SharedMemoryPublisher:
+    """
+    Publishes data frames to shared memory under a name, for `InMemoryDataSource(shared_memory_name=...)`
+    in other processes, the published segments live until `close` is called
+
+    Args:
+        name: Name the data is published under
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._manifest = _create(name, _MANIFEST_SIZE)
+        self._generation_number = np.ndarray((1,), dtype=np.int64, buffer=self._manifest.buf)
+        self._generation_number[0] = 0
+        self._segment: Optional[SharedMemory] = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'SharedMemoryPublisher(name={self._name}, generation={self.generation})'
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def generation(self) -> int:
+        """Number of the currently published generation, 0 if nothing was published yet"""
+        return int(self._generation_number[0])
+
+    def publish(self, dataframe: pd.DataFrame, key: Optional[List[str]] = None) -> int:
+        """
+        Publish the data frame as the new generation, replacing the previous one
+
+        Processes reading the previous generation keep reading it until their next select
+
+        Args:
+            dataframe: Data to publish
+            key: Optional columns to build the key index on, used for selecting rows by key values
+
+        Returns:
+            Number of the published generation
+        """
+        metadata, arrays = encode_dataframe(dataframe, key)
+
+        # Layout of the arrays after the header, the header size is not known yet
+        layout = {'metadata': metadata, 'arrays': dict()}
+        offset = 0
+        for array_name, array in arrays.items():
+            offset = _aligned(offset)
+            layout['arrays'][array_name] = {'offset': offset, 'descr': np.lib.format.dtype_to_descr(array.dtype),
+                                            'shape': list(array.shape)}
+            offset += array.nbytes
+
+        header = json.dumps(layout).encode()
+        data_offset = _aligned(_HEADER_LENGTH_SIZE + len(header))
+
+        with self._lock:
+            generation = self.generation + 1
+            segment = _create(_generation_segment_name(self._name, generation), max(data_offset + offset, 1))
+            segment.buf[:_HEADER_LENGTH_SIZE] = len(header).to_bytes(_HEADER_LENGTH_SIZE, 'little')
+            segment.buf[_HEADER_LENGTH_SIZE:_HEADER_LENGTH_SIZE + len(header)] = header
+            for array_name, array in arrays.items():
+                array_layout = layout['arrays'][array_name]
+                shared_array = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf,
+                                          offset=data_offset + array_layout['offset'])
+                shared_array[...] = array
+                del shared_array
+
+            # Readers attach to the new generation from now on, the previous one is unlinked, but stays mapped
+            # in the processes still reading it
+            self._generation_number[0] = generation
+            if self._segment is not None:
+                _unlink(self._segment)
+            self._segment = segment
+
+        return generation
+
+    def close(self):
+        """Unlink the published data and the manifest"""
+        with self._lock:
+            if self._segment is not None:
+                _unlink(self._segment)
+                self._segment = None
+            del self._generation_number
+            _unlink(self._manifest)
+
+
+class SharedTable(EncodedData):
+    """
+    Single generation of data published by SharedMemoryPublisher, the arrays are views of the shared memory
+
+    Args:
+        segment: Attached shared memory segment of the generation
+        generation: Number of the generation
+    """
+
+    def __init__(self, segment: SharedMemory, generation: int):
+        self._segment = segment
+        self._generation = generation
+        header_length = int.from_bytes(bytes(segment.buf[:_HEADER_LENGTH_SIZE]), 'little')
+        layout = json.loads(bytes(segment.buf[_HEADER_LENGTH_SIZE:_HEADER_LENGTH_SIZE + header_length]))
+        data_offset = _aligned(_HEADER_LENGTH_SIZE + header_length)
+
+        arrays = dict()
+        for array_name, array_layout in layout['arrays'].items():
+            # np.frombuffer keeps the buffer exported while the array is alive, so closing the segment under
+            # a view fails instead of unmapping memory the view still points to
+            shape = tuple(array_layout['shape'])
+            array = np.frombuffer(segment.buf, dtype=np.lib.format.descr_to_dtype(array_layout['descr']),
+                                  count=int(np.prod(shape)), offset=data_offset + array_layout['offset']).reshape(shape)
+            array.flags.writeable = False
+            arrays[array_name] = array
+        super().__init__(layout['metadata'], arrays)
+
+    def __repr__(self):
+        return f'SharedTable(name={self._segment.name}, generation={self._generation})'
+
+    def __del__(self):
+        # The arrays are views of the segment's buffer, they need to be released before closing it
+        self._arrays = dict()
+        self._dictionaries = dict()
+        self._key_array = self._key_order = None
+        try:
+            self._segment.close()
+        except BufferError:
+            # Views of the arrays are still referenced elsewhere, the segment stays mapped until the process exits
+            logger.warning('Shared memory segment %s not closed, views of its data are still in use',
+                           self._segment.name)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+
+class SharedTableReader:
+    """
+    Reads data published under a name by SharedMemoryPublisher in another process, following its republishing
+
+    Args:
+        name: Name the data is published under
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._manifest = _attach(name)
+        self._generation_number = np.ndarray((1,), dtype=np.int64, buffer=self._manifest.buf)
+        self._table: Optional[SharedTable] = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'SharedTableReader(name={self._name})'
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def get_table(self) -> SharedTable:
+        """Currently published generation of the data, attached on the first call after republishing"""
+        table = self._table
+        generation = int(self._generation_number[0])
+        if table is not None and table.generation == generation:
+            return table
+
+        with self._lock:
+            for _ in range(_MAX_ATTACH_ATTEMPTS):
+                generation = int(self._generation_number[0])
+                if generation == 0:
+                    raise ValueError(f'Nothing published under {self._name} yet')
+                if self._table is not None and self._table.generation == generation:
+                    return self._table
+                try:
+                    segment = _attach(_generation_segment_name(self._name, generation))
+                except FileNotFoundError:
+                    # Republished in the meantime and the generation unlinked, try the next one
+                    continue
+                self._table = SharedTable(segment, generation)
+                return self._table
+
+        raise ValueError(f'Failed to attach to data published under {self._name}')
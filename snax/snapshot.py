@@ -0,0 +1,416 @@
+"""
+Snapshot format for loading data without parsing or copying it
+
+A snapshot is a directory with one memory-mappable .npy file per column, string (and other object) columns are
+dictionary-encoded into int32 codes, and an optional index sorted by the key columns. The dictionaries are stored
+as arrays too, with the values' UTF-8 texts concatenated, and decoded only for the values taken. Opening a snapshot
+only maps the files, so it's O(1) and processes opening the same snapshot share its pages in the OS page cache
+
+Each write of a snapshot creates a new generation directory inside the snapshot's directory and then switches
+the metadata to it, files of earlier generations are never modified, so processes keep reading the generation
+they opened. Generations older than the previous one are removed
+"""
+import bisect
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import List, Optional, Dict, Union, Tuple, Any
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_FORMAT_VERSION = 4
+_METADATA_FILE = 'snapshot.json'
+_DICTIONARY_DATA_SUFFIX = '_dictionary_data'
+_DICTIONARY_OFFSETS_SUFFIX = '_dictionary_offsets'
+_DICTIONARY_TYPES_SUFFIX = '_dictionary_types'
+_KEY_ARRAY = 'key'
+_KEY_ORDER_ARRAY = 'key_order'
+_GENERATION_PREFIX = 'generation-'
+_OPEN_ATTEMPTS = 3
+
+
+def _is_array_dtype(dtype: np.dtype) -> bool:
+    return isinstance(dtype, np.dtype) and (dtype.kind in 'biuf' or dtype == np.dtype('datetime64[ns]'))
+
+
+# Types of dictionary values, the values are stored as their texts
+_STR, _INT, _FLOAT, _BOOL, _DECIMAL, _TIMESTAMP, _DATE = range(7)
+
+
+def _decode_bool(text: str) -> bool:
+    return text == 'True'
+
+
+_DICTIONARY_VALUE_DECODERS = {
+    _STR: str,
+    _INT: int,
+    _FLOAT: float,
+    _BOOL: _decode_bool,
+    _DECIMAL: Decimal,
+    _TIMESTAMP: pd.Timestamp,
+    _DATE: date.fromisoformat,
+}
+
+
+def _encode_dictionary_value(value: Any) -> Tuple[int, str]:
+    if isinstance(value, str):
+        return _STR, value
+    if isinstance(value, (bool, np.bool_)):
+        return _BOOL, str(bool(value))
+    if isinstance(value, (int, np.integer)):
+        return _INT, str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return _FLOAT, repr(float(value))
+    if isinstance(value, Decimal):
+        return _DECIMAL, str(value)
+    if isinstance(value, (datetime, np.datetime64)):
+        return _TIMESTAMP, pd.Timestamp(value).isoformat()
+    if isinstance(value, date):
+        return _DATE, value.isoformat()
+    raise ValueError(f'Values of type {type(value).__name__} can\'t be dictionary-encoded')
+
+
+def _encode_dictionary(dictionary: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """UTF-8 texts of the values concatenated, offsets of the values' texts and the values' types"""
+    types = np.empty(len(dictionary), dtype=np.int8)
+    encoded_values = []
+    for position, value in enumerate(dictionary):
+        types[position], text = _encode_dictionary_value(value)
+        encoded_values.append(text.encode())
+    offsets = np.zeros(len(dictionary) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(encoded_value) for encoded_value in encoded_values])
+    data = np.frombuffer(b''.join(encoded_values), dtype=np.uint8)
+    return data, offsets, types
+
+
+class _Dictionary:
+    """
+    Values of a dictionary-encoded column stored by `_encode_dictionary`, the values are decoded only when taken
+
+    Args:
+        data: Concatenated UTF-8 texts of the values
+        offsets: Offsets of the values' texts in data, with the end of the last one
+        types: Types of the values
+        is_sorted: If the values are strings in sorted order, so that they can be looked up by bisection
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, types: np.ndarray, is_sorted: bool):
+        self._data = data
+        self._offsets = offsets
+        self._types = types
+        self._is_sorted = is_sorted
+        self._codes: Optional[Dict[Any, int]] = None
+
+    def __len__(self):
+        return len(self._types)
+
+    def __getitem__(self, code: int) -> Any:
+        text = bytes(self._data[self._offsets[code]:self._offsets[code + 1]]).decode()
+        return _DICTIONARY_VALUE_DECODERS[int(self._types[code])](text)
+
+    def take(self, codes: np.ndarray) -> np.ndarray:
+        """Values of the non-negative codes, each distinct value is decoded once"""
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        values = np.empty(len(unique_codes), dtype=object)
+        if len(unique_codes) == 0:
+            return values[inverse]
+
+        # The texts are sliced from a temporary copy of the range of the data they are in
+        starts = self._offsets[unique_codes]
+        ends = self._offsets[unique_codes + 1]
+        window_start = int(starts[0])
+        window = self._data[window_start:int(ends[-1])].tobytes()
+        texts = [window[start:end].decode() for start, end in zip((starts - window_start).tolist(),
+                                                                  (ends - window_start).tolist())]
+        if self._is_sorted:
+            values[:] = texts
+        else:
+            decoders = [_DICTIONARY_VALUE_DECODERS[value_type] for value_type in self._types[unique_codes].tolist()]
+            values[:] = [decoder(text) for decoder, text in zip(decoders, texts)]
+        return values[inverse]
+
+    def get_indexer(self, values: np.ndarray) -> np.ndarray:
+        """Codes of the values, -1 for values not in the dictionary"""
+        if self._is_sorted:
+            codes = np.full(len(values), -1, dtype=np.int64)
+            for position, value in enumerate(values):
+                if isinstance(value, str):
+                    code = bisect.bisect_left(self, value)
+                    if code < len(self) and self[code] == value:
+                        codes[position] = code
+            return codes
+
+        # Dictionaries of other than string values are decoded for lookups
+        if self._codes is None:
+            self._codes = {self[code]: code for code in range(len(self))}
+        return np.array([self._codes.get(value, -1) if not pd.isna(value) else -1 for value in values],
+                        dtype=np.int64)
+
+
+def encode_dataframe(dataframe: pd.DataFrame, key: Optional[List[str]] = None) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """
+    Encode the data frame into flat numpy arrays, as stored in snapshots and in shared memory
+
+    Args:
+        dataframe: Data to encode
+        key: Optional columns to build the key index on, used for selecting rows by key values
+
+    Returns:
+        Metadata and arrays by their names, including the arrays of the dictionaries of dictionary-encoded columns
+    """
+    columns_metadata = []
+    arrays = dict()
+    for column_number, column in enumerate(dataframe.columns):
+        values = dataframe[column]
+        array_name = f'column_{column_number}'
+        if _is_array_dtype(values.dtype):
+            arrays[array_name] = values.to_numpy()
+            columns_metadata.append({'name': column, 'encoding': 'plain', 'array': array_name})
+            continue
+
+        codes, dictionary = pd.factorize(values)
+        dictionary = np.asarray(dictionary, dtype=object)
+        is_sorted = all(isinstance(value, str) for value in dictionary)
+        if is_sorted:
+            # Strings are stored sorted, to be looked up by bisection without decoding the whole dictionary
+            order = np.argsort(dictionary, kind='stable')
+            ranks = np.empty(len(order), dtype=np.int64)
+            ranks[order] = np.arange(len(order))
+            codes = np.where(codes >= 0, ranks[codes], -1) if len(order) > 0 else codes
+            dictionary = dictionary[order]
+        arrays[array_name] = codes.astype(np.int32)
+        try:
+            data, offsets, types = _encode_dictionary(dictionary)
+        except ValueError as error:
+            raise ValueError(f'Column {column} can\'t be encoded: {error}')
+        arrays[array_name + _DICTIONARY_DATA_SUFFIX] = data
+        arrays[array_name + _DICTIONARY_OFFSETS_SUFFIX] = offsets
+        arrays[array_name + _DICTIONARY_TYPES_SUFFIX] = types
+        columns_metadata.append({'name': column, 'encoding': 'dictionary', 'array': array_name,
+                                 'sorted': is_sorted})
+
+    if key is not None:
+        columns_metadata_by_name = {column_metadata['name']: column_metadata for column_metadata in columns_metadata}
+        key_columns = [arrays[columns_metadata_by_name[key_]['array']] for key_ in key]
+        # Rows with missing key values can't match any key value, they are left out of the index
+        has_key = np.logical_and.reduce([
+            column >= 0 if columns_metadata_by_name[key_]['encoding'] == 'dictionary' else ~pd.isna(column)
+            for key_, column in zip(key, key_columns)
+        ])
+        key_array = np.empty(len(dataframe), dtype=[(f'k{i}', column.dtype) for i, column in enumerate(key_columns)])
+        for i, column in enumerate(key_columns):
+            key_array[f'k{i}'] = column
+        key_order = np.flatnonzero(has_key)
+        key_order = key_order[np.argsort(key_array[key_order], kind='stable')]
+        arrays[_KEY_ARRAY] = key_array[key_order]
+        arrays[_KEY_ORDER_ARRAY] = key_order.astype(np.int64)
+
+    metadata = {'version': SNAPSHOT_FORMAT_VERSION, 'length': len(dataframe), 'columns': columns_metadata,
+                'key': key, 'arrays': list(arrays)}
+    return metadata, arrays
+
+
+def write_snapshot(dataframe: pd.DataFrame, path: Union[str, Path], key: Optional[List[str]] = None):
+    """
+    Write the data frame as a snapshot
+
+    Args:
+        dataframe: Data to write
+        path: Directory of the snapshot, created if it doesn't exist
+        key: Optional columns to build the key index on, used for selecting rows by key values
+
+    Returns:
+        None
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    metadata, arrays = encode_dataframe(dataframe, key)
+    previous_generation = _read_metadata(path).get('generation') if (path / _METADATA_FILE).exists() else None
+
+    # The generation is written to a temporary directory, so that it's never opened half-written
+    generation = f'{_GENERATION_PREFIX}{time.time_ns()}-{os.getpid()}'
+    temporary_generation_path = path / f'.{generation}.tmp'
+    temporary_generation_path.mkdir()
+    for array_name, array in arrays.items():
+        np.save(temporary_generation_path / f'{array_name}.npy', array)
+    os.rename(temporary_generation_path, path / generation)
+
+    metadata['generation'] = generation
+    temporary_metadata_path = path / f'{_METADATA_FILE}.{os.getpid()}'
+    temporary_metadata_path.write_text(json.dumps(metadata))
+    os.replace(temporary_metadata_path, path / _METADATA_FILE)
+
+    # Removing files doesn't affect the processes that mapped them, the previous generation is kept for
+    # the processes that read the previous metadata and didn't open the generation yet
+    for generation_path in path.glob(f'{_GENERATION_PREFIX}*'):
+        if generation_path.name not in (generation, previous_generation):
+            shutil.rmtree(generation_path, ignore_errors=True)
+
+
+def _read_metadata(path: Path) -> Dict:
+    return json.loads((path / _METADATA_FILE).read_text())
+
+
+class EncodedData:
+    """
+    Read-only data encoded by `encode_dataframe`, values are decoded only for the rows and columns taken
+
+    Args:
+        metadata: Metadata of the encoded data
+        arrays: Encoded arrays by their names
+    """
+
+    def __init__(self, metadata: Dict, arrays: Dict[str, np.ndarray]):
+        if metadata['version'] != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f'Unsupported snapshot format version {metadata["version"]}')
+
+        self._length = metadata['length']
+        self._key = metadata['key']
+        self._columns_metadata = {column_metadata['name']: column_metadata
+                                  for column_metadata in metadata['columns']}
+        self._arrays = {name: arrays[column_metadata['array']]
+                        for name, column_metadata in self._columns_metadata.items()}
+        self._dictionaries = {
+            name: _Dictionary(arrays[column_metadata['array'] + _DICTIONARY_DATA_SUFFIX],
+                              arrays[column_metadata['array'] + _DICTIONARY_OFFSETS_SUFFIX],
+                              arrays[column_metadata['array'] + _DICTIONARY_TYPES_SUFFIX],
+                              column_metadata['sorted'])
+            for name, column_metadata in self._columns_metadata.items() if column_metadata['encoding'] == 'dictionary'
+        }
+        if self._key is not None:
+            self._key_array = arrays[_KEY_ARRAY]
+            self._key_order = arrays[_KEY_ORDER_ARRAY]
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns_metadata.keys())
+
+    @property
+    def key(self) -> Optional[List[str]]:
+        return self._key
+
+    def _decode(self, column: str, encoded: np.ndarray) -> np.ndarray:
+        if self._columns_metadata[column]['encoding'] == 'plain':
+            return encoded
+        decoded = np.full(len(encoded), np.nan, dtype=object)
+        present = encoded >= 0
+        decoded[present] = self._dictionaries[column].take(encoded[present])
+        return decoded
+
+    def take(self, positions: Optional[np.ndarray] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Data frame with the rows at the given positions, only the taken values are read and copied
+
+        Args:
+            positions: Positions of the rows, if None, all rows are taken
+            columns: Columns to take, if None, all columns are taken
+
+        Returns:
+            Data frame with the taken rows
+        """
+        columns = columns if columns is not None else self.columns
+        data = dict()
+        for column in columns:
+            encoded = self._arrays[column]
+            encoded = encoded[positions] if positions is not None else np.array(encoded)
+            data[column] = self._decode(column, encoded)
+        index = pd.RangeIndex(self._length) if positions is None else pd.Index(positions)
+        return pd.DataFrame(data, columns=columns, index=index)
+
+    def _encode_key_values(self, key_values: pd.DataFrame) -> Optional[np.ndarray]:
+        """
+        Key values in the encoding of the key index without rows that can't match any row,
+        None if the values can't be cast to the types of the key columns
+        """
+        encoded = np.empty(len(key_values), dtype=self._key_array.dtype)
+        matchable = np.ones(len(key_values), dtype=bool)
+        for i, key_ in enumerate(self._key):
+            values = key_values[key_].to_numpy()
+            if self._columns_metadata[key_]['encoding'] == 'dictionary':
+                codes = self._dictionaries[key_].get_indexer(values)
+                matchable &= codes >= 0
+                encoded[f'k{i}'] = codes
+                continue
+
+            dtype = self._key_array.dtype[f'k{i}']
+            try:
+                cast_values = values.astype(dtype)
+            except (ValueError, TypeError):
+                return None
+            # Values changed by the cast (e.g. 1.5 cast to int) don't match any key
+            matchable &= pd.notna(values) & (pd.Series(cast_values) == pd.Series(values)).to_numpy()
+            encoded[f'k{i}'] = cast_values
+
+        return encoded[matchable]
+
+    def lookup(self, key_values: pd.DataFrame) -> np.ndarray:
+        """
+        Positions of the rows whose key columns match some row of key_values, in the order of the data
+
+        Args:
+            key_values: Data frame with the key columns
+
+        Returns:
+            Sorted array of row positions
+        """
+        if self._key is None:
+            raise ValueError(f'{self} has no key index')
+
+        encoded = self._encode_key_values(key_values)
+        if encoded is None or len(encoded) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        starts = np.searchsorted(self._key_array, encoded, side='left')
+        ends = np.searchsorted(self._key_array, encoded, side='right')
+        found = ends > starts
+        starts, ends = starts[found], ends[found]
+        if len(starts) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        # Concatenated ranges [start, end) of the sorted index
+        lengths = ends - starts
+        offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        index_positions = np.arange(lengths.sum()) + offsets
+        return np.unique(self._key_order[index_positions])
+
+
+class Snapshot(EncodedData):
+    """
+    Read-only snapshot opened by memory mapping its files, see `write_snapshot`
+
+    Args:
+        path: Directory of the snapshot
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self._path = Path(path)
+        for attempt in range(_OPEN_ATTEMPTS):
+            metadata = _read_metadata(self._path)
+            if metadata.get('version') != SNAPSHOT_FORMAT_VERSION:
+                raise ValueError(f'Unsupported snapshot format version {metadata.get("version")}')
+            self._generation_path = self._path / metadata['generation']
+            try:
+                # Mapped files stay readable after their removal
+                arrays = {array_name: np.load(self._generation_path / f'{array_name}.npy', mmap_mode='r')
+                          for array_name in metadata['arrays']}
+                break
+            except FileNotFoundError:
+                # The generation was removed by later writes after the metadata were read
+                if attempt == _OPEN_ATTEMPTS - 1:
+                    raise
+        super().__init__(metadata, arrays)
+
+    def __repr__(self):
+        return f'Snapshot(path={self._path})'
+
+    @property
+    def path(self) -> Path:
+        return self._path
@@ -0,0 +1,129 @@
+"""
+Synthetic data generated from feature view schemas, for benchmarks and tests at production scale
+"""
+import json
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.value_type import ValueType, Int, Float, String, Bool, Timestamp, StringList, IntList, FloatList, \
+    BoolList, TimestampList, Null
+
+DEFAULT_VALUE_TYPES = (Int, Float, String, Bool, Timestamp)
+DEFAULT_STRING_CARDINALITY = 1000
+DEFAULT_MAX_LIST_LENGTH = 3
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+_START_TIMESTAMP = np.datetime64('2020-01-01T00:00:00', 'ns')
+_TIMESTAMP_RANGE_SECONDS = 365 * 24 * 60 * 60
+_LIST_ITEM_TYPES = {StringList: String, IntList: Int, FloatList: Float, BoolList: Bool, TimestampList: Timestamp}
+
+
+def generate_features(n_features: int, value_types: Sequence[ValueType] = DEFAULT_VALUE_TYPES,
+                      prefix: str = 'feature') -> List[Feature]:
+    """
+    Features named {prefix}_{number} with the value types repeated in turns
+
+    Args:
+        n_features: Number of features
+        value_types: Value types of the features
+        prefix: Prefix of the features' names
+
+    Returns:
+        List of features
+    """
+    return [Feature(f'{prefix}_{i}', value_types[i % len(value_types)]) for i in range(n_features)]
+
+
+def _generate_values(value_type: ValueType, n_rows: int, rng: np.random.Generator,
+                     string_cardinality: int, max_list_length: int) -> np.ndarray:
+    if value_type == Int:
+        return rng.integers(0, 1_000_000, n_rows)
+    if value_type == Bool:
+        return rng.random(n_rows) < 0.5
+    if value_type == String:
+        dictionary = np.array([f'value_{i}' for i in range(string_cardinality)], dtype=object)
+        return dictionary[rng.integers(0, string_cardinality, n_rows)]
+    if value_type == Timestamp:
+        seconds = rng.integers(0, _TIMESTAMP_RANGE_SECONDS, n_rows)
+        return _START_TIMESTAMP + seconds.astype('timedelta64[s]')
+    if value_type == Null:
+        return np.full(n_rows, None, dtype=object)
+    if value_type in _LIST_ITEM_TYPES:
+        # Lists are stored as JSON strings, the way `cast_to_feature_type` parses them
+        item_type = _LIST_ITEM_TYPES[value_type]
+        lengths = rng.integers(1, max_list_length + 1, n_rows)
+        items = _generate_values(item_type, int(lengths.sum()), rng, string_cardinality, max_list_length)
+        if item_type == Timestamp:
+            items = pd.to_datetime(items).strftime(TIMESTAMP_FORMAT).to_numpy(dtype=object)
+        items = items.tolist()
+        ends = np.cumsum(lengths)
+        return np.array([json.dumps(items[end - length:end]) for end, length in zip(ends, lengths)], dtype=object)
+    return rng.normal(size=n_rows)
+
+
+def _with_nulls(values: np.ndarray, nulls: np.ndarray) -> pd.Series:
+    series = pd.Series(values)
+    if nulls.any():
+        series = series.astype(float) if series.dtype.kind in 'iu' else series
+        series = series.astype(object) if series.dtype.kind == 'b' else series
+        series[nulls] = None
+    return series
+
+
+def generate_data(join_keys: List[str], features: List[Feature], n_rows: int,
+                  key_cardinality: Optional[int] = None, null_rate: float = 0.,
+                  timestamp_field: Optional[str] = None, seed: Optional[int] = 0,
+                  string_cardinality: int = DEFAULT_STRING_CARDINALITY,
+                  max_list_length: int = DEFAULT_MAX_LIST_LENGTH) -> pd.DataFrame:
+    """
+    Data frame with random values of the features
+
+    Integer and float features are uniform and normal numbers, strings have string_cardinality distinct values,
+    timestamps are spread over a year and list features are non-empty JSON lists, as data sources store them
+
+    Args:
+        join_keys: Integer key columns of the data
+        features: Features whose columns are generated
+        n_rows: Number of rows
+        key_cardinality: Number of distinct values of each key column drawn at random, if None, each row
+            has a distinct key
+        null_rate: Fraction of missing values in the feature columns
+        timestamp_field: Optional column with the timestamp of each row, for views with point-in-time data
+        seed: Seed of the random generator, the data are the same for the same arguments
+        string_cardinality: Number of distinct values of string features
+        max_list_length: Maximal length of the values of list features
+
+    Returns:
+        Data frame with the key columns, the timestamp field and the feature columns
+    """
+    rng = np.random.default_rng(seed)
+    data = dict()
+    for join_key in join_keys:
+        data[join_key] = rng.permutation(n_rows) if key_cardinality is None \
+            else rng.integers(0, key_cardinality, n_rows)
+    if timestamp_field is not None:
+        data[timestamp_field] = _generate_values(Timestamp, n_rows, rng, string_cardinality, max_list_length)
+    for feature in features:
+        values = _generate_values(feature.dtype, n_rows, rng, string_cardinality, max_list_length)
+        data[feature.name] = _with_nulls(values, rng.random(n_rows) < null_rate)
+    return pd.DataFrame(data)
+
+
+def generate_feature_view_data(feature_view: FeatureView, n_rows: int, key_cardinality: Optional[int] = None,
+                               null_rate: float = 0., seed: Optional[int] = 0,
+                               string_cardinality: int = DEFAULT_STRING_CARDINALITY,
+                               max_list_length: int = DEFAULT_MAX_LIST_LENGTH) -> pd.DataFrame:
+    """
+    Data frame with random values for the feature view, with the join keys of its entities, its timestamp field
+    and its features named as in the view's data source, see `generate_data` for the arguments
+    """
+    join_keys = list(dict.fromkeys(join_key for entity in feature_view.entities or []
+                                   for join_key in entity.join_keys))
+    features = [feature for feature in feature_view.features or [] if feature.name not in join_keys]
+    data = generate_data(join_keys, features, n_rows, key_cardinality, null_rate, feature_view.timestamp_field,
+                         seed, string_cardinality, max_list_length)
+    inverse_field_mapping = {feature_name: field for field, feature_name in feature_view.source.field_mapping.items()}
+    return data.rename(columns=inverse_field_mapping)
@@ -0,0 +1,223 @@
+"""
+Tracing of the stages of feature retrieval and of data source selects and inserts
+
+The instrumented code opens spans with `span`, the spans are nested by the context they are opened in (also across
+the feature store's worker threads and the asyncio API) and reported to the hooks registered by `add_hook`, e.g.
+`add_hook(JsonLinesCollector('spans.jsonl'))`. While no hook is registered, `span` returns a shared no-op span,
+so the instrumentation costs only a function call per stage
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple, Union, TextIO
+
+import pandas as pd
+
+
+class SpanHook:
+    """Receives the spans of the instrumented code, override the methods to process them"""
+
+    def on_start(self, span: 'Span'):
+        pass
+
+    def on_end(self, span: 'Span'):
+        pass
+
+
+_hooks: Tuple[SpanHook, ...] = ()
+_hooks_lock = threading.Lock()
+_current_span: ContextVar[Optional['Span']] = ContextVar('snax_current_span', default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """
+    Timed stage of the instrumented code with attributes describing it, nested in the span it was opened in
+
+    Args:
+        name: Name of the stage
+        attributes: Attributes of the stage, e.g. names of the feature view and data source, row counts
+        hooks: Hooks to report the span to
+    """
+    is_recording = True
+
+    def __init__(self, name: str, attributes: Dict[str, Any], hooks: Tuple[SpanHook, ...]):
+        self._name = name
+        self._attributes = attributes
+        self._hooks = hooks
+        parent = _current_span.get()
+        self._span_id = next(_span_ids)
+        self._parent_id = parent.span_id if parent is not None else None
+        self._trace_id = parent.trace_id if parent is not None else self._span_id
+        self._thread_name = threading.current_thread().name
+        self._start_time: Optional[float] = None
+        self._start_counter: Optional[float] = None
+        self._duration: Optional[float] = None
+        self._error: Optional[str] = None
+        self._token = None
+
+    def __repr__(self):
+        return f'Span(name={self._name}, span_id={self._span_id}, duration={self._duration})'
+
+    def __enter__(self) -> 'Span':
+        self._token = _current_span.set(self)
+        self._start_time = time.time()
+        self._start_counter = time.perf_counter()
+        for hook in self._hooks:
+            hook.on_start(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._duration = time.perf_counter() - self._start_counter
+        if exc_val is not None:
+            self._error = repr(exc_val)
+        _current_span.reset(self._token)
+        for hook in self._hooks:
+            hook.on_end(self)
+        return False
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def attributes(self) -> Dict[str, Any]:
+        return self._attributes
+
+    @property
+    def span_id(self) -> int:
+        return self._span_id
+
+    @property
+    def parent_id(self) -> Optional[int]:
+        return self._parent_id
+
+    @property
+    def trace_id(self) -> int:
+        """Id of the outermost span this span is nested in"""
+        return self._trace_id
+
+    @property
+    def thread_name(self) -> str:
+        return self._thread_name
+
+    @property
+    def start_time(self) -> Optional[float]:
+        """Unix time the span started at"""
+        return self._start_time
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Wall time of the span in seconds, None until it ends"""
+        return self._duration
+
+    @property
+    def error(self) -> Optional[str]:
+        """Representation of the exception the span ended with, if any"""
+        return self._error
+
+    def set_attribute(self, key: str, value: Any):
+        self._attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        self._attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'name': self._name, 'trace_id': self._trace_id, 'span_id': self._span_id,
+                'parent_id': self._parent_id, 'start_time': self._start_time, 'duration': self._duration,
+                'thread': self._thread_name, 'pid': os.getpid(), 'error': self._error,
+                'attributes': self._attributes}
+
+
+class _NoopSpan:
+    """Span returned while no hook is registered, it records nothing"""
+    is_recording = False
+
+    def __enter__(self) -> '_NoopSpan':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+AnySpan = Union[Span, _NoopSpan]
+
+
+def span(name: str, **attributes: Any) -> AnySpan:
+    """
+    Span of a stage to be used as a context manager, attributes that are expensive to compute should be set
+    only if the span `is_recording`
+
+    Args:
+        name: Name of the stage
+        **attributes: Attributes of the stage
+
+    Returns:
+        The span, a no-op span if no hook is registered
+    """
+    hooks = _hooks
+    if not hooks:
+        return _NOOP_SPAN
+    return Span(name, attributes, hooks)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def add_hook(hook: SpanHook):
+    """Report the spans of the instrumented code to the hook from now on"""
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + (hook,)
+
+
+def remove_hook(hook: SpanHook):
+    global _hooks
+    with _hooks_lock:
+        _hooks = tuple(registered_hook for registered_hook in _hooks if registered_hook is not hook)
+
+
+def dataframe_bytes(dataframe: pd.DataFrame) -> int:
+    """Memory of the data frame's columns, without the contents of the python objects they reference"""
+    return int(dataframe.memory_usage(index=False, deep=False).sum())
+
+
+class JsonLinesCollector(SpanHook):
+    """
+    Hook writing each ended span as a line of JSON, see `Span.to_dict` for its fields
+
+    Args:
+        file: Path of the file to append the spans to, or an open text file
+    """
+
+    def __init__(self, file: Union[str, Path, TextIO]):
+        self._owns_file = isinstance(file, (str, Path))
+        self._file = open(file, 'a') if self._owns_file else file
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'JsonLinesCollector(file={getattr(self._file, "name", self._file)})'
+
+    def on_end(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        """Stop collecting the spans and close the file if it was opened by the collector"""
+        remove_hook(self)
+        if self._owns_file:
+            self._file.close()
@@ -1,15 +1,22 @@
 """Utilities for casting snax.ValueType to pandas.dtypes"""
 import json
 import re
+import threading
 from datetime import datetime
-from typing import List, Union, Any, Optional
+from typing import List, Union, Any, Optional, Dict
 
+import numpy as np
 import pandas as pd
 
 from snax.feature import Feature
+from snax.metrics import REGISTRY
 from snax.value_type import ValueType, Null, TimestampList, BoolList, FloatList, IntList, StringList, Timestamp, Bool, \
     Float, Int, String, Unknown
 
+_CAST_FAILURES = REGISTRY.counter(
+    'snax_cast_failures_total', 'Values replaced by missing values because they could not be cast to the feature type',
+    ['feature'])
+
 
 def _safe_cast(cast_fn):
     def safe_cast_fn(value, *args, **kwargs):
@@ -119,6 +126,173 @@ _FEATURE_TYPE_TO_CAST_FN = {
 }
 
 
+def _with_missing(values: pd.Series, missing: pd.Series) -> pd.Series:
+    """Put None on missing positions, keeping the dtype a per-value cast would have produced"""
+    if missing.any():
+        values = values.astype(object)
+        values[missing] = None
+    return values
+
+
+def _is_string_value(series: pd.Series) -> pd.Series:
+    return series.map(type) == str
+
+
+def _to_float(series: pd.Series) -> pd.Series:
+    return pd.to_numeric(series, errors='coerce').astype(float)
+
+
+def _is_datetimelike(series: pd.Series) -> bool:
+    return pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_timedelta64_dtype(series)
+
+
+def _all_missing(series: pd.Series) -> pd.Series:
+    return pd.Series([None] * len(series), index=series.index, dtype=object)
+
+
+def _cast_failed_values(series: pd.Series, failed: pd.Series, cast_fn) -> Optional[pd.Series]:
+    """
+    Cast the values the column-wise cast failed on value by value, e.g. '1_000' or integers beyond int64
+
+    Returns:
+        Per-value casts of the failed values, indexed by their positions in series, None if none of them succeeded
+    """
+    if not failed.any():
+        return None
+
+    failed_positions = np.flatnonzero(failed.to_numpy())
+    cast_values = pd.Series([cast_fn(value) for value in series.iloc[failed_positions]], index=failed_positions,
+                            dtype=object)
+    if cast_values.isna().all():
+        return None
+    return cast_values
+
+
+def _vectorized_cast_unknown(series: pd.Series) -> pd.Series:
+    return series.copy()
+
+
+def _vectorized_cast_string(series: pd.Series) -> pd.Series:
+    return _with_missing(series.astype(object).astype(str).astype(object), series.isna())
+
+
+def _vectorized_cast_int(series: pd.Series) -> pd.Series:
+    if _is_datetimelike(series):
+        return _all_missing(series)
+
+    numbers = _to_float(series)
+    in_range = np.isfinite(numbers) & (numbers.abs() < 2 ** 63)
+    values = np.trunc(numbers.where(in_range))
+    cast_values = _cast_failed_values(series, series.notna() & ~in_range, _cast_int)
+    if cast_values is not None:
+        if cast_values.dropna().abs().max() >= 2 ** 63:
+            # Python ints, as some of the values don't fit into int64
+            values = _with_missing(values.fillna(0).astype('int64').astype(object), ~in_range)
+            values.iloc[cast_values.index] = cast_values.to_numpy()
+            return values
+        values.iloc[cast_values.index] = cast_values.astype(float).to_numpy()
+
+    if values.isna().any():
+        return values
+    return values.astype('int64')
+
+
+def _vectorized_cast_float(series: pd.Series) -> pd.Series:
+    if _is_datetimelike(series):
+        return _all_missing(series)
+
+    values = _to_float(series)
+    cast_values = _cast_failed_values(series, series.notna() & values.isna(), _cast_float)
+    if cast_values is not None:
+        values.iloc[cast_values.index] = cast_values.astype(float).to_numpy()
+    return values
+
+
+_STRING_TO_BOOL = {
+    'true': True, 't': True, '1': True, '1.0': True,
+    'false': False, 'f': False, '0': False, '0.0': False
+}
+
+
+def _vectorized_cast_bool(series: pd.Series) -> pd.Series:
+    missing = series.isna()
+    if not pd.api.types.is_string_dtype(series):
+        if not missing.any():
+            return series.astype(bool)
+        # Nullable extension dtypes can't cast their missing values to bool
+        values = pd.Series(None, index=series.index, dtype=object)
+        values[~missing] = series[~missing].astype(bool).astype(object)
+        return _with_missing(values, missing)
+
+    series = series.astype(object)
+    values = pd.Series(None, index=series.index, dtype=object)
+    is_string = _is_string_value(series)
+    values[is_string] = series[is_string].str.lower().map(_STRING_TO_BOOL)
+    unmatched = values.isna() & ~missing
+    values[unmatched] = series[unmatched].astype(bool)
+    if missing.any():
+        return _with_missing(values, missing)
+    return values.astype(bool)
+
+
+def _vectorized_cast_timestamp(series: pd.Series, format_string: Optional[str] = None) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.copy()
+
+    if format_string is not None:
+        return pd.to_datetime(series.where(_is_string_value(series)), format=format_string, errors='coerce')
+
+    return pd.to_datetime(series.where(series.map(type) == pd.Timestamp), errors='coerce')
+
+
+_FEATURE_TYPE_TO_VECTORIZED_CAST_FN = {
+    Unknown: _vectorized_cast_unknown,
+    String: _vectorized_cast_string,
+    Int: _vectorized_cast_int,
+    Float: _vectorized_cast_float,
+    Bool: _vectorized_cast_bool,
+    Timestamp: _vectorized_cast_timestamp,
+    Null: _vectorized_cast_unknown,
+}
+
+
+# Casts to these types keep every non-missing value, their failures are not counted
+_LOSSLESS_FEATURE_TYPES = {Unknown, String, Null}
+
+
+class CastStats:
+    """
+    Counts of values that were present before casting to the feature type and missing after it, per feature
+
+    Args:
+        failures: Initial mapping from feature name to the number of failed casts
+    """
+
+    def __init__(self, failures: Optional[Dict[str, int]] = None):
+        self._failures = dict(failures or dict())
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'CastStats(failures={self.failures})'
+
+    @property
+    def failures(self) -> Dict[str, int]:
+        return self._failures
+
+    @property
+    def total_failures(self) -> int:
+        return sum(self._failures.values())
+
+    def add(self, feature_name: str, count: int):
+        with self._lock:
+            self._failures[feature_name] = self._failures.get(feature_name, 0) + int(count)
+
+
+def count_cast_failures(raw_series: pd.Series, cast_series: pd.Series) -> int:
+    """Number of values that were not missing in raw_series but are missing in cast_series"""
+    return int((raw_series.notna() & cast_series.isna()).sum())
+
+
 def _get_first_non_missing_item(series: pd.Series) -> Any:
     for item in series:
         if not pd.isna(item):
@@ -158,21 +332,57 @@ def guess_timestamp_format(series: pd.Series) -> str:
 
 
 def cast_to_feature_type(series: pd.Series, feature_type: ValueType) -> pd.Series:
-    cast_fn = _FEATURE_TYPE_TO_CAST_FN.get(feature_type, _cast_unknown)
+    """
+    Cast values of the series to the given feature type, values that can't be cast are replaced by missing values
+
+    Scalar types are cast column-wise, invalid values are detected through coercion masks instead of exceptions,
+    and the values the column-wise cast fails on are cast value by value, e.g. '1_000' or integers beyond int64.
+    List types are parsed value by value.
+
+    The values match the per-value cast, the dtypes differ where all the values are missing: the result keeps
+    the column's dtype (NaN for Int and Float, NaT for Timestamp) instead of None in an object column.
+    Int columns with integers beyond int64 are object columns of Python ints with None for missing values.
+    """
     kwargs = dict()
 
     if feature_type in [TimestampList, Timestamp] and _is_string_type(series):
         kwargs['format_string'] = guess_timestamp_format(series)
 
+    vectorized_cast_fn = _FEATURE_TYPE_TO_VECTORIZED_CAST_FN.get(feature_type)
+    if vectorized_cast_fn is not None:
+        return vectorized_cast_fn(series, **kwargs)
+
+    cast_fn = _FEATURE_TYPE_TO_CAST_FN.get(feature_type, _cast_unknown)
+
     def cast_fn_kwargs(value):
         return cast_fn(value, **kwargs)
 
     return series.apply(cast_fn_kwargs)
 
 
-def cast_to_feature_types(dataframe: pd.DataFrame, features: List[Feature]) -> pd.DataFrame:
-    dataframe = dataframe.copy()
+def cast_to_feature_types(dataframe: pd.DataFrame, features: List[Feature],
+                          cast_stats: Optional[CastStats] = None) -> pd.DataFrame:
+    """
+    Cast columns of the dataframe to the types of the corresponding features
+
+    Args:
+        dataframe: Data frame with columns named after the features
+        features: Features whose columns should be cast
+        cast_stats: Optional stats object where the number of values lost in casting is added for each feature
+
+    Returns:
+        Copy of the dataframe with cast columns, columns that are not cast share data with the original dataframe
+    """
+    dataframe = dataframe.copy(deep=False)
     for feature in features:
-        dataframe[feature.name] = cast_to_feature_type(dataframe[feature.name], feature.dtype)
+        raw_series = dataframe[feature.name]
+        dataframe[feature.name] = cast_to_feature_type(raw_series, feature.dtype)
+        cast_failures = 0
+        if feature.dtype not in _LOSSLESS_FEATURE_TYPES:
+            cast_failures = count_cast_failures(raw_series, dataframe[feature.name])
+        if cast_failures > 0:
+            _CAST_FAILURES.labels(feature=feature.name).inc(cast_failures)
+        if cast_stats is not None:
+            cast_stats.add(feature.name, cast_failures)
 
     return dataframe
@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from snax.data_sources.buffered_writer import BufferedWriter
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+
+
+class _CountingDataSource(InMemoryDataSource):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.insert_calls = 0
+
+    def _insert(self, *args, **kwargs):
+        self.insert_calls += 1
+        super()._insert(*args, **kwargs)
+
+
+@pytest.fixture
+def users_data_source():
+    return _CountingDataSource(name='users', data=pd.DataFrame({'id': [1, 2], 'score': [0.5, 1.5]}))
+
+
+def _scores(data_source):
+    return data_source.select().set_index('id')['score'].to_dict()
+
+
+def test_buffered_writer_merges_inserts_by_key(users_data_source):
+    with BufferedWriter(users_data_source, max_delay=None) as writer:
+        writer.insert(['id'], ['score'], pd.DataFrame({'id': [2, 3], 'score': [2.0, 3.0]}), if_exists='replace')
+        writer.insert(['id'], ['score'], pd.DataFrame({'id': [3, 4], 'score': [4.0, 5.0]}), if_exists='replace')
+        writer.insert(['id'], ['score'], pd.DataFrame({'id': [1, 4], 'score': [9.0, 9.0]}), if_exists='ignore')
+        writer.insert(['id'], ['score'], pd.DataFrame({'id': [1, 4], 'score': [8.0, 8.0]}), if_exists='ignore')
+        assert writer.buffered_rows == 8
+        assert users_data_source.insert_calls == 0
+
+    assert users_data_source.insert_calls == 2
+    assert _scores(users_data_source) == {1: 0.5, 2: 2.0, 3: 4.0, 4: 5.0}
+
+
+def test_buffered_writer_error_on_duplicated_key(users_data_source):
+    writer = BufferedWriter(users_data_source, max_delay=None)
+    writer.insert(['id'], ['score'], pd.DataFrame({'id': [3], 'score': [3.0]}))
+    with pytest.raises(ValueError):
+        writer.insert(['id'], ['score'], pd.DataFrame({'id': [3], 'score': [4.0]}))
+
+    # Keys existing in the data source are detected by its insert
+    writer.insert(['id'], ['score'], pd.DataFrame({'id': [1], 'score': [4.0]}))
+    with pytest.raises(ValueError):
+        writer.flush()
+
+
+def test_buffered_writer_flushes_on_size_and_time(users_data_source):
+    writer = BufferedWriter(users_data_source, max_buffered_rows=2, max_delay=0.05)
+    writer.insert(['id'], ['score'], pd.DataFrame({'id': [3], 'score': [3.0]}))
+    writer.insert(['id'], ['score'], pd.DataFrame({'id': [4], 'score': [4.0]}))
+    assert users_data_source.insert_calls == 1
+
+    writer.insert(['id'], ['score'], pd.DataFrame({'id': [5], 'score': [5.0]}))
+    deadline = time.monotonic() + 5
+    while writer.buffered_rows > 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+
+    assert users_data_source.insert_calls == 2
+    assert _scores(users_data_source) == {1: 0.5, 2: 1.5, 3: 3.0, 4: 4.0, 5: 5.0}
+
+
+def test_buffered_writer_drops_failed_insert(users_data_source):
+    writer = BufferedWriter(users_data_source, max_delay=None)
+    writer.insert(['id'], ['score'], pd.DataFrame({'id': [5], 'score': [5.0]}), if_exists='replace')
+    writer.insert(['id'], ['score'], pd.DataFrame({'id': [1], 'score': [4.0]}))
+    writer.insert(['id'], ['score'], pd.DataFrame({'id': [7], 'score': [7.0]}), if_exists='replace')
+    with pytest.raises(ValueError):
+        writer.flush()
+
+    # The failed insert doesn't block the following ones
+    assert writer.buffered_rows == 0
+    assert sorted(_scores(users_data_source)) == [1, 2, 5, 7]
+    writer.insert(['id'], ['score'], pd.DataFrame({'id': [8], 'score': [8.0]}))
+    writer.flush()
+    assert sorted(_scores(users_data_source)) == [1, 2, 5, 7, 8]
+
+
+def test_buffered_writer_inserts_during_slow_write(users_data_source):
+    write_started = threading.Event()
+    release_write = threading.Event()
+    insert = users_data_source.insert
+
+    def slow_insert(key, columns, data, if_exists='error'):
+        write_started.set()
+        release_write.wait(5)
+        insert(key, columns, data, if_exists)
+
+    users_data_source.insert = slow_insert
+    writer = BufferedWriter(users_data_source, max_buffered_rows=2, max_delay=None)
+    flush_thread = threading.Thread(
+        target=writer.insert, args=(['id'], ['score'], pd.DataFrame({'id': [3, 5], 'score': [3.0, 5.0]})))
+    flush_thread.start()
+    assert write_started.wait(5)
+
+    # Buffering doesn't wait for the write in progress
+    writer.insert(['id'], ['score'], pd.DataFrame({'id': [4], 'score': [4.0]}), if_exists='replace')
+    assert flush_thread.is_alive()
+    assert writer.buffered_rows == 1
+    release_write.set()
+    flush_thread.join()
+    writer.close()
+    assert sorted(_scores(users_data_source)) == [1, 2, 3, 4, 5]
+
+
+def test_buffered_writer_flushes_in_write_order(users_data_source):
+    inserted = []
+    insert = users_data_source.insert
+
+    def spy(key, columns, data, if_exists='error'):
+        inserted.append((if_exists, data['id'].tolist()))
+        insert(key, columns, data, if_exists)
+
+    users_data_source.insert = spy
+    with BufferedWriter(users_data_source, max_delay=None) as writer:
+        writer.insert(['id'], ['score'], pd.DataFrame({'id': [3], 'score': [3.0]}), if_exists='replace')
+        writer.insert(['id'], ['score'], pd.DataFrame({'id': [3], 'score': [9.0]}), if_exists='ignore')
+        writer.insert(['id'], ['score'], pd.DataFrame({'id': [4], 'score': [4.0]}), if_exists='replace')
+
+    assert inserted == [('replace', [3]), ('ignore', [3]), ('replace', [4])]
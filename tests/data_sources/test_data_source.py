@@ -1,3 +1,4 @@
+import asyncio
 from typing import Union
 from unittest import skip
 
@@ -325,6 +326,12 @@ def test_select_from_datasource_with_field_mapping(users_with_nas_field_mapping_
     assert list(data.columns) == ['time_stamp', 'issubscribed']
 
 
+def test_get_column_names_with_field_mapping(users_with_nas_field_mapping_data_source):
+    column_names = users_with_nas_field_mapping_data_source.get_column_names(
+        ['id', 'time_stamp', Feature('issubscribed', Bool)])
+    assert column_names == ['id', 'timestamp', 'is_subscribed']
+
+
 def test_insert_to_datasource_with_field_mapping(users_with_nas_field_mapping_data_source):
     data = pd.DataFrame({
         'id': [10, 11],
@@ -358,3 +365,15 @@ def test_insert_into_empty_datasource(empty_data_source):
     )
     retrieved_data = empty_data_source.select(['id', 'first_name', 'last_name'])
     assert frames_equal_up_to_row_ordering(data, retrieved_data)
+
+
+def test_select_and_insert_async(users_with_nas_data_source):
+    new_data = pd.DataFrame({'id': [0, 11], 'first_name': ['CIRILLO', 'CODI']})
+
+    async def insert_and_select():
+        await users_with_nas_data_source.insert_async(key=['id'], columns=['first_name'], data=new_data)
+        return await users_with_nas_data_source.select_async(
+            columns=['id', 'first_name'], key=['id'], key_values=pd.DataFrame({'id': [0, 11]}))
+
+    retrieved_data = asyncio.run(insert_and_select())
+    assert frames_equal_up_to_row_ordering(retrieved_data.reset_index(drop=True), new_data)
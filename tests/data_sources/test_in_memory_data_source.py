@@ -1,8 +1,12 @@
+import warnings
+
 import pandas as pd
 import pytest
 
 import snax.data_sources.examples.in_memory
 from snax._utils import frames_equal_up_to_row_ordering
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.snapshot import write_snapshot
 
 
 @pytest.fixture
@@ -17,3 +21,42 @@ def test_select_with_where(nhl_data_source):
     )
     expected_data = pd.DataFrame({'game_id': [2016020045, 2017020812, 2015020314], 'home_goals': [7, 3, 1]})
     assert frames_equal_up_to_row_ordering(data, expected_data)
+
+
+def test_select_from_snapshot(tmp_path, nhl_data_source):
+    write_snapshot(nhl_data_source.select(), tmp_path / 'nhl_games', key=['game_id'])
+    snapshot_data_source = InMemoryDataSource(name='nhl_games_snapshot', snapshot_path=tmp_path / 'nhl_games')
+    key_values = pd.DataFrame({'game_id': [2016020045, 2017020812, 1]})
+
+    for kwargs in [dict(columns=['game_id', 'home_goals', 'venue']),
+                   dict(columns=['game_id', 'home_goals', 'venue'], key=['game_id'], key_values=key_values),
+                   dict(where_sql_query='home_goals > 4 and venue.str.contains("Center")')]:
+        data = snapshot_data_source.select(**kwargs)
+        expected_data = nhl_data_source.select(**kwargs)
+        assert frames_equal_up_to_row_ordering(data, expected_data)
+
+    with pytest.raises(ValueError):
+        snapshot_data_source.insert(key=['game_id'], columns=['home_goals'], data=key_values.assign(home_goals=0))
+
+
+def test_select_with_where_does_not_warn(tmp_path, nhl_data_source):
+    write_snapshot(nhl_data_source.select(), tmp_path / 'nhl_games', key=['game_id'])
+    snapshot_data_source = InMemoryDataSource(name='nhl_games_snapshot', snapshot_path=tmp_path / 'nhl_games')
+
+    for data_source in [nhl_data_source, snapshot_data_source]:
+        for columns in [None, ['game_id', 'home_goals']]:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', pd.errors.SettingWithCopyWarning)
+                data = data_source.select(columns=columns, where_sql_query='home_goals > 4')
+            assert (data['home_goals'] > 4).all()
+
+
+def test_select_by_many_key_values():
+    data = pd.DataFrame({'game_id': range(5000), 'season': [2020, 2021] * 2500, 'goals': range(5000)})
+    data_source = InMemoryDataSource(name='games', data=data)
+    key_values = pd.DataFrame({'game_id': [float(i) for i in range(0, 5000, 2)] + [None],
+                               'season': [2020] * 2500 + [2020]})
+
+    selected_data = data_source.select(columns=['goals'], key=['game_id', 'season'], key_values=key_values)
+
+    assert selected_data['goals'].tolist() == list(range(0, 5000, 2))
@@ -0,0 +1,94 @@
+import logging
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from snax.data_sources._oracle_utils import ensure_table_exists
+from snax.data_sources.oracle_data_source import OracleDataSource, select_joined
+from snax.data_sources.sql_statements import normalize_sql, StatementRecorder, OTHER_STATEMENTS
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT a,b FROM main.t0 WHERE (id, name) IN ((1, 'x'), (2, 'it''s'), (3, null))") == \
+        ('SELECT a,b FROM main.t0 WHERE (id, name) IN ((?, ?), ...)', 6)
+    assert normalize_sql('SELECT *\n  FROM t WHERE id IN (1, 2.5, 3e2)') == ('SELECT * FROM t WHERE id IN (?, ...)', 3)
+    assert normalize_sql('SELECT * FROM t WHERE id IS NULL') == ('SELECT * FROM t WHERE id IS NULL', 0)
+
+
+@pytest.fixture
+def engine():
+    # SQLite stands in for Oracle here, the selects are plain enough to run on both
+    engine = create_engine('sqlite://')
+    pd.DataFrame({'game_id': [1, 2, 3], 'home_goals': [5, 8, 1]}).to_sql('goals', engine, index=False)
+    pd.DataFrame({'game_id': [2, 3], 'venue': ['Arena', 'Center']}).to_sql('venues', engine, index=False)
+    return engine
+
+
+def test_statement_recorder(engine):
+    recorder = StatementRecorder(slow_query_threshold=None)
+    goals = OracleDataSource('goals', 'main', 'goals', engine, statement_recorder=recorder)
+    venues = OracleDataSource('venues', 'main', 'venues', engine, statement_recorder=recorder)
+    recorder.reset()
+
+    goals.select(columns=['home_goals'], key=['game_id'], key_values=pd.DataFrame({'game_id': [1, 2]}))
+    goals.select(columns=['home_goals'], key=['game_id'], key_values=pd.DataFrame({'game_id': [3, 4, 5]}))
+    select_joined([(goals, ['home_goals']), (venues, ['venue'])], ['game_id'], pd.DataFrame({'game_id': [1, 3]}))
+
+    goals_statistics, = recorder.statistics(source='goals')
+    assert goals_statistics.statement == 'SELECT home_goals FROM main.goals WHERE (game_id) IN ((?), ...)'
+    assert goals_statistics.executions == 2
+    assert goals_statistics.binds == 5
+    assert goals_statistics.rows == 3
+    assert goals_statistics.fetch_time > 0
+    assert goals_statistics.total_time >= goals_statistics.max_time > 0
+    joined_statistics, = recorder.statistics(source='goals+venues')
+    assert joined_statistics.rows == 2
+    assert joined_statistics.statement.startswith('WITH snax_keys AS (')
+    # Each table is read only for the key values
+    assert joined_statistics.statement.count(' IN ') == 2
+    assert 'goals' in recorder.format_table()
+    assert len(recorder.to_dict()) == 2
+
+
+def test_statement_recorder_logs_slow_statements_and_errors(engine, caplog):
+    recorder = StatementRecorder(slow_query_threshold=0.)
+    goals = OracleDataSource('goals', 'main', 'goals', engine, statement_recorder=recorder)
+    recorder.reset()
+
+    with caplog.at_level(logging.WARNING, logger='snax.data_sources.sql_statements'):
+        goals.select(columns=['home_goals'], where_sql_query='game_id = 1')
+    with pytest.raises(Exception):
+        goals.select(columns=['missing_column'])
+
+    statistics = {statement_statistics.statement: statement_statistics for statement_statistics in recorder.statistics()}
+    assert statistics['SELECT home_goals FROM main.goals WHERE game_id = ?'].slow_executions == 1
+    assert statistics['SELECT missing_column FROM main.goals'].errors == 1
+    assert 'Slow SQL statement of data source goals' in caplog.text
+    recorder.detach(engine)
+
+
+def test_statement_recorder_bounds_statements(engine):
+    recorder = StatementRecorder(slow_query_threshold=None, max_statements=1)
+    goals = OracleDataSource('goals', 'main', 'goals', engine, statement_recorder=recorder)
+    recorder.reset()
+
+    goals.select(columns=['home_goals'])
+    goals.select(columns=['game_id'])
+    goals.select(columns=['game_id, home_goals'])
+
+    assert [statement_statistics.statement for statement_statistics in recorder.statistics(sort_by='executions')] == \
+        [OTHER_STATEMENTS, 'SELECT home_goals FROM main.goals']
+
+
+def test_statement_recorder_logs_slow_selects_not_fetched_by_read_sql(engine, caplog):
+    recorder = StatementRecorder(slow_query_threshold=0.)
+    recorder.attach(engine)
+
+    with caplog.at_level(logging.WARNING, logger='snax.data_sources.sql_statements'):
+        ensure_table_exists('goals', 'main', engine)
+
+    statistics = {statement_statistics.statement: statement_statistics for statement_statistics in recorder.statistics()}
+    assert statistics['SELECT * FROM main.goals'].slow_executions == 1
+    assert 'unknown rows' in caplog.text
+    recorder.detach(engine)
@@ -0,0 +1,27 @@
+from snax.benchmarks import run_benchmarks, results_to_dict, compare_to_baseline, main
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(n_rows=200, n_features=5, n_key_values=10, n_entity_rows=50, insert_rows=5, repeat=2)
+
+    assert {(result.name, result.backend) for result in results} == {
+        (name, backend) for name in ['select', 'select_by_key', 'cast_to_feature_types', 'add_features_to_dataframe']
+        for backend in ['in-memory', 'csv', 'sqlite']
+    } | {('insert', 'in-memory'), ('insert', 'csv')}
+    assert all(len(result.latencies) == 2 and result.throughput > 0 for result in results)
+
+    baseline = results_to_dict(results)
+    comparisons = compare_to_baseline(results, baseline)
+    assert len(comparisons) == 2 * len(results)
+    assert not any(comparison.is_regression for comparison in comparisons)
+
+    baseline['results'][0]['latency_p50'] /= 10
+    assert compare_to_baseline(results, baseline)[0].is_regression
+
+
+def test_main(tmp_path, capsys):
+    arguments = ['--backends', 'in-memory', '--rows', '100', '--entity-rows', '10', '--insert-rows', '5',
+                 '--repeat', '1', '--output', str(tmp_path / 'results.json')]
+    assert main(arguments) == 0
+    assert main(arguments[:-2] + ['--baseline', str(tmp_path / 'results.json'), '--tolerance', '1000']) == 0
+    assert 'add_features_to_dataframe' in capsys.readouterr().out
@@ -0,0 +1,118 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from snax.example_feature_repos import sports_feature_repo
+from snax.feature_server import FeatureServer, MicroBatcher
+from snax.feature_store import FeatureStore
+
+
+@pytest.fixture
+def feature_store():
+    return FeatureStore(repo_path=Path(sports_feature_repo.__file__).parent)
+
+
+def _post(url: str, body: Any) -> dict:
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def test_micro_batcher_coalesces_requests(feature_store):
+    calls = []
+    add_features_to_dataframe = feature_store.add_features_to_dataframe
+
+    def spy(dataframe, *args, **kwargs):
+        calls.append(len(dataframe))
+        return add_features_to_dataframe(dataframe, *args, **kwargs)
+
+    feature_store.add_features_to_dataframe = spy
+    micro_batcher = MicroBatcher(feature_store, batch_window=0.2)
+    micro_batcher.start()
+    barrier = threading.Barrier(4)
+
+    def get_features(game_id):
+        barrier.wait()
+        return micro_batcher.get_features([{'game_id': game_id}], ['nhl_games_csv:home_goals'], 'game')
+
+    try:
+        with ThreadPoolExecutor(4) as executor:
+            responses = list(executor.map(get_features, [2016020045, 2017020812, 2015020314, 1]))
+        # An unknown feature fails only its own request
+        with pytest.raises(KeyError):
+            micro_batcher.get_features([{'game_id': 1}], ['nhl_games_csv:unknown'], 'game')
+    finally:
+        micro_batcher.stop()
+
+    assert responses == [{'nhl_games_csv:home_goals': [7]}, {'nhl_games_csv:home_goals': [3]},
+                         {'nhl_games_csv:home_goals': [1]}, {'nhl_games_csv:home_goals': [None]}]
+    assert calls[0] == 4
+
+
+_HOME_AWAY_GOALS_REPO_DEFINITION = '''
+import pandas as pd
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.entity import Entity
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.value_type import Int
+
+game = Entity(name='game', join_keys=['game_id'])
+home_view = FeatureView(name='home', entities=[game], features=[Feature('goals', Int)], source=InMemoryDataSource(
+    name='home_source', data=pd.DataFrame({'game_id': [1, 2], 'goals': [3, 1]})))
+away_view = FeatureView(name='away', entities=[game], features=[Feature('goals', Int)], source=InMemoryDataSource(
+    name='away_source', data=pd.DataFrame({'game_id': [1, 2], 'goals': [2, 4]})))
+'''
+
+
+def test_micro_batcher_with_features_of_same_name(tmp_path):
+    (tmp_path / 'games.py').write_text(_HOME_AWAY_GOALS_REPO_DEFINITION)
+    micro_batcher = MicroBatcher(FeatureStore(repo_path=tmp_path), batch_window=0.2)
+    micro_batcher.start()
+    barrier = threading.Barrier(2)
+
+    def get_features(feature_names):
+        barrier.wait()
+        return micro_batcher.get_features([{'game_id': 2}, {'game_id': 1}], feature_names, 'game')
+
+    try:
+        with ThreadPoolExecutor(2) as executor:
+            responses = list(executor.map(get_features, [['home:goals'], ['home:goals', 'away:goals']]))
+    finally:
+        micro_batcher.stop()
+
+    assert responses == [{'home:goals': [1, 3]}, {'home:goals': [1, 3], 'away:goals': [4, 2]}]
+
+
+def test_feature_server(feature_store):
+    server = FeatureServer(feature_store, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://{server.server_address[0]}:{server.server_address[1]}'
+    try:
+        response = _post(f'{url}/features', {
+            'entity_name': 'game',
+            'features': ['nhl_games_csv:home_goals', 'nhl_games_csv:outcome'],
+            'entities': {'game_id': [2016020045, 2017020812]}
+        })
+        with pytest.raises(urllib.error.HTTPError) as error:
+            _post(f'{url}/features', {'entity_name': 'game', 'features': ['home_goals'], 'entities': []})
+        with pytest.raises(urllib.error.HTTPError) as list_body_error:
+            _post(f'{url}/features', [{'entity_name': 'game'}])
+        with urllib.request.urlopen(f'{url}/metrics') as metrics_response:
+            metrics = metrics_response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert response == {'features': {'nhl_games_csv:home_goals': [7, 3],
+                                     'nhl_games_csv:outcome': ['home win REG', 'away win OT']}}
+    assert error.value.code == 400
+    assert list_body_error.value.code == 400
+    assert '# TYPE snax_retrieval_seconds histogram' in metrics
+    assert 'snax_retrieval_rows_total{method="add_features_to_dataframe"}' in metrics
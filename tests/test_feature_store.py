@@ -1,10 +1,16 @@
+import asyncio
+import os
+import sqlite3
+import threading
 from pathlib import Path
 
 import pandas as pd
+import pytest
 from pandas.testing import assert_frame_equal
 
 from snax.example_feature_repos import sports_feature_repo
 from snax.feature_store import FeatureStore
+from snax.online_store import SqliteOnlineStore
 
 
 def test_initialize():
@@ -52,3 +58,293 @@ def test_add_features_to_dataframe():
     expected_feature_dataframe.reset_index(inplace=True, drop=True)
 
     assert_frame_equal(feature_dataframe, expected_feature_dataframe)
+
+
+_TWO_VIEWS_REPO_DEFINITION = '''
+import threading
+
+import pandas as pd
+
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.entity import Entity
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.value_type import Int, String
+
+select_barrier = threading.Barrier(2, timeout=5)
+
+
+class BarrierInMemoryDataSource(InMemoryDataSource):
+    def _select(self, columns=None, where_sql_query=None):
+        select_barrier.wait()
+        return super()._select(columns=columns, where_sql_query=where_sql_query)
+
+
+user = Entity(name='user', join_keys=['user_id'])
+names_view = FeatureView(
+    name='names',
+    entities=[user],
+    features=[Feature('user_id', Int), Feature('name', String)],
+    source=BarrierInMemoryDataSource(
+        name='names_source',
+        data=pd.DataFrame({'user_id': [1, 2, 3], 'name': ['a', 'b', 'c']})
+    )
+)
+ages_view = FeatureView(
+    name='ages',
+    entities=[user],
+    features=[Feature('user_id', Int), Feature('age', Int)],
+    source=BarrierInMemoryDataSource(
+        name='ages_source',
+        data=pd.DataFrame({'user_id': [1, 2, 3], 'age': [30, 40, 50]})
+    )
+)
+'''
+
+
+def test_add_features_to_dataframe_retrieves_views_concurrently(tmp_path):
+    (tmp_path / 'users.py').write_text(_TWO_VIEWS_REPO_DEFINITION)
+    feature_store = FeatureStore(repo_path=tmp_path, max_workers=2)
+
+    feature_dataframe = feature_store.add_features_to_dataframe(
+        dataframe=pd.DataFrame({'user_id': [3, 1]}),
+        feature_names=['names:name', 'ages:age'],
+        entity_name='user',
+    )
+
+    expected_feature_dataframe = pd.DataFrame({'user_id': [3, 1], 'name': ['c', 'a'], 'age': [50, 30]})
+    assert_frame_equal(feature_dataframe, expected_feature_dataframe)
+
+
+def test_close_shuts_down_executor(tmp_path):
+    (tmp_path / 'users.py').write_text(_TWO_VIEWS_REPO_DEFINITION)
+    with FeatureStore(repo_path=tmp_path, max_workers=2) as feature_store:
+        executors = set()
+        threads = [threading.Thread(target=lambda: executors.add(feature_store._get_executor())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        feature_store.add_features_to_dataframe(pd.DataFrame({'user_id': [1]}), ['names:name', 'ages:age'], 'user')
+
+    # All the threads got the same executor, it is shut down when the feature store is closed
+    assert len(executors) == 1
+    assert executors.pop()._shutdown
+    assert feature_store._executor is None
+
+
+_USER_BALANCES_REPO_DEFINITION = '''
+from datetime import timedelta
+
+import pandas as pd
+
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.entity import Entity
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.value_type import Int, Float, Timestamp
+
+user = Entity(name='user', join_keys=['user_id'])
+balances_view = FeatureView(
+    name='balances',
+    entities=[user],
+    features=[Feature('user_id', Int), Feature('updated_at', Timestamp), Feature('balance', Float)],
+    source=InMemoryDataSource(
+        name='balances_source',
+        data=pd.DataFrame({
+            'user_id': [1, 1, 2],
+            'updated_at': ['2022-01-01T00:00:00', '2022-01-10T00:00:00', '2022-01-05T00:00:00'],
+            'balance': [10.0, 20.0, 30.0]
+        })
+    ),
+    timestamp_field='updated_at',
+    ttl=timedelta(days=7)
+)
+'''
+
+
+def test_get_historical_features(tmp_path):
+    (tmp_path / 'balances.py').write_text(_USER_BALANCES_REPO_DEFINITION)
+    feature_store = FeatureStore(repo_path=tmp_path)
+
+    event_dataframe = pd.DataFrame({
+        'user_id': [1, 1, 1, 2, 2],
+        'event_timestamp': pd.to_datetime(['2021-12-31', '2022-01-02', '2022-01-12', '2022-01-06', '2022-01-20'])
+    })
+    feature_dataframe = feature_store.get_historical_features(
+        dataframe=event_dataframe,
+        feature_names=['balances:balance'],
+        entity_name='user',
+        timestamp_column='event_timestamp'
+    )
+
+    expected_feature_dataframe = event_dataframe.assign(balance=[None, 10.0, 20.0, 30.0, None])
+    assert_frame_equal(feature_dataframe, expected_feature_dataframe)
+
+
+def test_iter_features_to_dataframe():
+    sports_feature_repo_path = Path(sports_feature_repo.__file__).parent
+    feature_store = FeatureStore(repo_path=sports_feature_repo_path)
+    game_ids = feature_store.get_data_source('nhl_games_csv').select(columns=['game_id']).head(25)
+    feature_names = ['nhl_games_csv:outcome', 'nhl_games_csv:home_goals']
+
+    batches = list(feature_store.iter_features_to_dataframe(game_ids, feature_names, 'game', batch_size=10))
+
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert_frame_equal(pd.concat(batches), feature_store.add_features_to_dataframe(game_ids, feature_names, 'game'))
+
+
+def test_add_features_to_dataframe_async():
+    sports_feature_repo_path = Path(sports_feature_repo.__file__).parent
+    feature_store = FeatureStore(repo_path=sports_feature_repo_path)
+    game_ids = pd.DataFrame({'game_id': [2017020001, 2017020423]})
+    feature_names = ['nhl_games_csv:outcome', 'nhl_games_csv:venue']
+
+    feature_dataframe = asyncio.run(feature_store.add_features_to_dataframe_async(game_ids, feature_names, 'game'))
+
+    assert_frame_equal(feature_dataframe, feature_store.add_features_to_dataframe(game_ids, feature_names, 'game'))
+
+
+def test_get_online_features():
+    sports_feature_repo_path = Path(sports_feature_repo.__file__).parent
+    feature_store = FeatureStore(repo_path=sports_feature_repo_path)
+
+    feature_values = feature_store.get_online_features(
+        entity_rows=[{'game_id': 2017020423}, {'game_id': 1}, {'game_id': 2017020001}],
+        feature_names=['nhl_games_csv:outcome', 'nhl_games_csv:home_goals'],
+        entity_name='game'
+    )
+
+    assert feature_values == {
+        'nhl_games_csv:outcome': ['home win REG', None, 'away win REG'],
+        'nhl_games_csv:home_goals': [3, None, 2]
+    }
+
+
+_HOME_AWAY_GOALS_REPO_DEFINITION = '''
+import pandas as pd
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.entity import Entity
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.value_type import Int
+
+game = Entity(name='game', join_keys=['game_id'])
+home_view = FeatureView(name='home', entities=[game], features=[Feature('goals', Int)], source=InMemoryDataSource(
+    name='home_source', data=pd.DataFrame({'game_id': [1, 2], 'goals': [3, 1]})))
+away_view = FeatureView(name='away', entities=[game], features=[Feature('goals', Int)], source=InMemoryDataSource(
+    name='away_source', data=pd.DataFrame({'game_id': [1, 2], 'goals': [2, 4]})))
+'''
+
+
+def test_get_online_features_of_views_with_same_feature_name(tmp_path):
+    (tmp_path / 'games.py').write_text(_HOME_AWAY_GOALS_REPO_DEFINITION)
+    feature_store = FeatureStore(repo_path=tmp_path)
+
+    feature_values = feature_store.get_online_features([{'game_id': 2}, {'game_id': 1}],
+                                                       ['home:goals', 'away:goals'], 'game')
+
+    assert feature_values == {'home:goals': [1, 3], 'away:goals': [4, 2]}
+
+
+def test_add_features_to_dataframe_with_duplicated_feature_names(tmp_path):
+    (tmp_path / 'games.py').write_text(_HOME_AWAY_GOALS_REPO_DEFINITION)
+    feature_store = FeatureStore(repo_path=tmp_path)
+
+    feature_dataframe = feature_store.add_features_to_dataframe(pd.DataFrame({'game_id': [2, 1]}),
+                                                                ['home:goals', 'home:goals'], 'game')
+
+    assert_frame_equal(feature_dataframe, pd.DataFrame({'game_id': [2, 1], 'goals': [1, 3]}))
+
+
+@pytest.mark.parametrize('dataframe,feature_names', [
+    (pd.DataFrame({'game_id': [1]}), ['home:goals', 'away:goals']),
+    (pd.DataFrame({'game_id': [1], 'goals': [0]}), ['home:goals']),
+])
+def test_add_features_to_dataframe_with_colliding_columns(tmp_path, dataframe, feature_names):
+    (tmp_path / 'games.py').write_text(_HOME_AWAY_GOALS_REPO_DEFINITION)
+    feature_store = FeatureStore(repo_path=tmp_path)
+    for view in feature_store.list_feature_views():
+        view.source.select = None
+
+    # Raised before any select
+    with pytest.raises(ValueError, match='goals'):
+        feature_store.add_features_to_dataframe(dataframe, feature_names, 'game')
+
+
+def test_get_online_features_from_online_store(tmp_path):
+    (tmp_path / 'balances.py').write_text(_USER_BALANCES_REPO_DEFINITION)
+    feature_store = FeatureStore(repo_path=tmp_path, online_store=SqliteOnlineStore(tmp_path / 'online.db'))
+
+    assert feature_store.materialize(['balances']) == {'balances__user': 2}
+    feature_store.get_feature_view('balances').source.insert(
+        key=['user_id', 'updated_at'], columns=['balance'],
+        data=pd.DataFrame({'user_id': [2], 'updated_at': ['2022-01-12T00:00:00'], 'balance': [40.0]})
+    )
+
+    # Values are read from the online store, they don't change until the next materialization
+    feature_values = feature_store.get_online_features([{'user_id': 2}, {'user_id': 3}], ['balances:balance'], 'user')
+    assert feature_values == {'balances:balance': [30.0, None]}
+
+    feature_store.materialize(['balances'], 'user')
+    feature_values = feature_store.get_online_features([{'user_id': 2}], ['balances:balance'], 'user')
+    assert feature_values == {'balances:balance': [40.0]}
+
+    # Closing the feature store closes the online store's connections
+    connection = feature_store._online_store.connection()
+    feature_store.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute('SELECT 1')
+
+
+def test_lazy_feature_store():
+    sports_feature_repo_path = Path(sports_feature_repo.__file__).parent
+    feature_store = FeatureStore(repo_path=sports_feature_repo_path, lazy=True)
+    game_ids = pd.DataFrame({'game_id': [2016020045, 2017020812]})
+
+    feature_dataframe = feature_store.add_features_to_dataframe(game_ids, ['nhl_games_csv:home_goals'], 'game')
+
+    assert feature_dataframe['home_goals'].tolist() == [7, 3]
+    assert [entity.name for entity in feature_store.list_entities()] == ['game', '__dummy']
+
+
+def test_reload(tmp_path):
+    (tmp_path / 'games.py').write_text("""
+import pandas as pd
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.entity import Entity
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.value_type import Int
+
+game = Entity(name='game', join_keys=['game_id'])
+games_source = InMemoryDataSource(name='games_source', data=pd.DataFrame({'game_id': [1], 'goals': [3]}))
+games_view = FeatureView(name='games', entities=[game], features=[Feature('goals', Int)], source=games_source)
+""")
+    feature_store = FeatureStore(repo_path=tmp_path)
+    assert feature_store.get_online_features([{'game_id': 1}], ['games:goals'], 'game') == {'games:goals': [3]}
+    assert feature_store.reload() == []
+
+    games_file_path = tmp_path / 'games.py'
+    games_file_path.write_text(games_file_path.read_text().replace("'goals': [3]", "'goals': [5]"))
+    mtime_ns = games_file_path.stat().st_mtime_ns + 1_000_000_000
+    os.utime(games_file_path, ns=(mtime_ns, mtime_ns))
+
+    assert [path.name for path in feature_store.reload()] == ['games.py']
+    assert feature_store.get_online_features([{'game_id': 1}], ['games:goals'], 'game') == {'games:goals': [5]}
+
+    # A file failing to import keeps the previous definitions
+    games_file_path.write_text('raise RuntimeError()')
+    os.utime(games_file_path, ns=(mtime_ns + 1_000_000_000, mtime_ns + 1_000_000_000))
+    with pytest.raises(RuntimeError):
+        feature_store.reload()
+    assert feature_store.get_feature_view('games') is not None
+
+
+def test_load_profile():
+    sports_feature_repo_path = Path(sports_feature_repo.__file__).parent
+    assert FeatureStore(repo_path=sports_feature_repo_path).load_profile is None
+
+    load_profile = FeatureStore(repo_path=sports_feature_repo_path, profile=True).load_profile
+    assert [cost.name for cost in load_profile.modules] == ['nhl_games.py']
+    assert [cost.name for cost in load_profile.data_sources] == ['nhl_games_csv (CsvDataSource)']
@@ -84,3 +84,24 @@ def test_add_feature_to_dataframe_on_multi_key_entity(feature_view_users_with_na
     expected_feature_values.reset_index(inplace=True, drop=True)
 
     assert feature_values.equals(expected_feature_values)
+
+
+def test_add_feature_to_dataframe_selects_each_key_once(feature_view_users_with_nas: FeatureView, monkeypatch):
+    source = feature_view_users_with_nas.source
+    selected_key_values = []
+
+    def select_spy(columns=None, key=None, key_values=None, where_sql_query=None):
+        selected_key_values.append(key_values)
+        return type(source).select(source, columns=columns, key=key, key_values=key_values)
+
+    monkeypatch.setattr(source, 'select', select_spy)
+
+    entity_dataframe = pd.DataFrame({'id': [2, 1, 2, 2, None, 1]})
+    feature_values = feature_view_users_with_nas.add_features_to_dataframe(
+        dataframe=entity_dataframe,
+        feature_names=['first_name'],
+        entity_name='user',
+    )
+
+    assert sorted(selected_key_values[0]['id']) == [1, 2]
+    assert list(feature_values['first_name'].fillna('-')) == ['Codi', 'Cirillo', 'Codi', 'Codi', '-', 'Cirillo']
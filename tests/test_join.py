@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from snax._join import EntityKeyIndex, AsOfIndex, join_feature_values
+
+
+def test_get_row_indexer_with_repeated_and_missing_keys():
+    key_index = EntityKeyIndex(pd.DataFrame({'id': [3, 1, 3, 7]}))
+    feature_values = pd.DataFrame({'id': [1, 2, 3], 'age': [10, 20, 30]})
+    assert list(key_index.get_row_indexer(feature_values)) == [2, 0, 2, -1]
+
+
+def test_get_row_indexer_uses_first_of_duplicated_feature_rows():
+    key_index = EntityKeyIndex(pd.DataFrame({'id': [2, 1]}))
+    feature_values = pd.DataFrame({'id': [1, 2, 2], 'age': [10, 20, 21]})
+    assert list(key_index.get_row_indexer(feature_values)) == [1, 0]
+
+
+def test_join_feature_values_matches_left_merge():
+    dataframe = pd.DataFrame({'id': [2, 3, 5, 2], 'string_id': ['b', 'c', 'e', 'x']})
+    names = pd.DataFrame({'id': [2, 3, 5], 'string_id': ['b', 'c', 'e'], 'name': ['Codi', 'Marion', 'Ada']})
+    ages = pd.DataFrame({'id': [2, 5], 'age': [4, 62]})
+
+    joined = join_feature_values(dataframe, [
+        (EntityKeyIndex(dataframe[['id', 'string_id']]), names),
+        (EntityKeyIndex(dataframe[['id']]), ages),
+    ])
+
+    expected = dataframe.merge(names, on=['id', 'string_id'], how='left').merge(ages, on=['id'], how='left')
+    assert_frame_equal(joined, expected)
+    assert joined['age'].equals(pd.Series([4, np.nan, 62, 4], name='age'))
+
+
+def test_join_feature_values_rejects_duplicate_columns():
+    dataframe = pd.DataFrame({'id': [1]})
+    key_index = EntityKeyIndex(dataframe[['id']])
+    feature_values = pd.DataFrame({'id': [1], 'age': [10]})
+    with pytest.raises(ValueError):
+        join_feature_values(dataframe, [(key_index, feature_values), (key_index, feature_values)])
+
+
+def test_asof_index_picks_latest_feature_row_not_after_event():
+    dataframe = pd.DataFrame({
+        'id': [1, 1, 2, 3, 1],
+        'event_timestamp': pd.to_datetime(['2020-01-05', '2020-01-01', '2020-01-10', None, '2020-01-03'])
+    })
+    feature_values = pd.DataFrame({
+        'id': [1, 1, 2],
+        'timestamp': pd.to_datetime(['2020-01-02', '2020-01-04', '2020-01-01']),
+        'value': [10, 20, 30]
+    })
+
+    asof_index = AsOfIndex(dataframe[['id']], dataframe['event_timestamp'], 'timestamp')
+    assert list(asof_index.get_row_indexer(feature_values)) == [1, -1, 2, -1, 0]
+
+    asof_index_with_ttl = AsOfIndex(dataframe[['id']], dataframe['event_timestamp'], 'timestamp', timedelta(days=2))
+    assert list(asof_index_with_ttl.get_row_indexer(feature_values)) == [1, -1, -1, -1, 0]
+
+    joined = join_feature_values(dataframe, [(asof_index, feature_values)])
+    assert list(joined.columns) == ['id', 'event_timestamp', 'value']
+
+
+def _users_dataframe_and_feature_values():
+    dataframe = pd.DataFrame({'id': [2, 3, 1]})
+    feature_values = pd.DataFrame({'id': [1, 2], 'age': [10, 20], 'name': ['Ada', 'Bob'], 'is_active': [True, False]})
+    return dataframe, [(EntityKeyIndex(dataframe[['id']]), feature_values)]
+
+
+def test_join_feature_values_numpy_output():
+    dataframe, key_indices_and_feature_values = _users_dataframe_and_feature_values()
+    joined = join_feature_values(dataframe, key_indices_and_feature_values, output='numpy')
+
+    assert list(joined) == ['id', 'age', 'name', 'is_active']
+    np.testing.assert_array_equal(joined['age'], np.array([20, np.nan, 10]))
+    assert list(joined['name']) == ['Bob', np.nan, 'Ada']
+
+
+def test_join_feature_values_matrix_output():
+    dataframe, key_indices_and_feature_values = _users_dataframe_and_feature_values()
+    matrix = join_feature_values(dataframe, key_indices_and_feature_values, output='matrix',
+                                 feature_order=['is_active', 'age', 'id'])
+
+    assert matrix.dtype == np.float32
+    np.testing.assert_array_equal(matrix, np.array([[0, 20, 2], [np.nan, np.nan, 3], [1, 10, 1]], dtype=np.float32))
+    with pytest.raises(ValueError):
+        join_feature_values(dataframe, key_indices_and_feature_values, output='matrix', feature_order=['name'])
+
+
+def test_join_feature_values_arrow_output():
+    pytest.importorskip('pyarrow')
+    dataframe, key_indices_and_feature_values = _users_dataframe_and_feature_values()
+    table = join_feature_values(dataframe, key_indices_and_feature_values, output='arrow')
+
+    assert table.column_names == ['id', 'age', 'name', 'is_active']
+    assert table.column('name').to_pylist() == ['Bob', None, 'Ada']
+    assert table.column('age').to_pylist() == [20, None, 10]
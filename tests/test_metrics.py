@@ -0,0 +1,94 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.example_feature_repos import sports_feature_repo
+from snax.feature import Feature
+from snax.feature_store import FeatureStore
+from snax.metrics import MetricsRegistry, REGISTRY
+from snax.type_casting import cast_to_feature_types
+from snax.value_type import Int
+
+
+def test_counter_and_histogram_to_prometheus():
+    registry = MetricsRegistry()
+    rows = registry.counter('rows_total', 'Rows read', ['source'])
+    rows.labels(source='games').inc(3)
+    rows.labels(source='games').inc(2)
+    rows.labels(source='say "hi"').inc()
+    latency = registry.histogram('select_seconds', 'Select latency', buckets=[0.1, 1.])
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(2.)
+
+    assert registry.to_prometheus() == (
+        '# HELP rows_total Rows read\n'
+        '# TYPE rows_total counter\n'
+        'rows_total{source="games"} 5\n'
+        'rows_total{source="say \\"hi\\""} 1\n'
+        '# HELP select_seconds Select latency\n'
+        '# TYPE select_seconds histogram\n'
+        'select_seconds_bucket{le="0.1"} 1\n'
+        'select_seconds_bucket{le="1"} 2\n'
+        'select_seconds_bucket{le="+Inf"} 3\n'
+        'select_seconds_sum 2.55\n'
+        'select_seconds_count 3\n'
+    )
+    assert registry.to_dict()['select_seconds']['samples'] == [
+        {'labels': {}, 'sum': 2.55, 'count': 3, 'buckets': {'0.1': 1, '1': 2, '+Inf': 3}}
+    ]
+
+
+def test_registry_returns_registered_metric():
+    registry = MetricsRegistry()
+    counter = registry.counter('rows_total', 'Rows read', ['source'])
+    assert registry.counter('rows_total', 'Rows read', ['source']) is counter
+    with pytest.raises(ValueError):
+        registry.histogram('rows_total', 'Rows read', ['source'])
+    with pytest.raises(ValueError):
+        counter.labels(view='games')
+    with pytest.raises(ValueError):
+        counter.labels(source='games').inc(-1)
+
+    counter.labels(source='games').inc()
+    registry.reset()
+    assert registry.to_dict()['rows_total']['samples'] == []
+
+
+def _samples(name):
+    return {tuple(sample['labels'].values()): sample for sample in REGISTRY.to_dict()[name]['samples']}
+
+
+def test_data_source_metrics():
+    data_source = InMemoryDataSource('metrics_games', data=pd.DataFrame({'game_id': [1, 2], 'goals': [3, 4]}))
+    data_source.select(key=['game_id'], key_values=pd.DataFrame({'game_id': [1]}))
+    data_source.insert(key=['game_id'], columns=['goals'], data=pd.DataFrame({'game_id': [3], 'goals': [5]}))
+
+    assert _samples('snax_data_source_rows_read_total')[('metrics_games',)]['value'] == 1
+    assert _samples('snax_data_source_read_bytes_total')[('metrics_games',)]['value'] > 0
+    assert _samples('snax_data_source_select_seconds')[('metrics_games',)]['count'] == 1
+    assert _samples('snax_data_source_rows_written_total')[('metrics_games',)]['value'] == 1
+    assert _samples('snax_data_source_insert_seconds')[('metrics_games',)]['count'] == 1
+
+
+def test_cast_failure_metrics():
+    failures = _samples('snax_cast_failures_total').get(('metrics_goals',), {'value': 0})['value']
+    cast_to_feature_types(pd.DataFrame({'metrics_goals': ['1', 'x', None]}), [Feature('metrics_goals', Int)])
+    assert _samples('snax_cast_failures_total')[('metrics_goals',)]['value'] == failures + 1
+
+
+def test_online_index_metrics():
+    feature_store = FeatureStore(repo_path=Path(sports_feature_repo.__file__).parent)
+    requests = _samples('snax_online_index_requests_total')
+    misses = requests.get(('nhl_games_csv', 'miss'), {'value': 0})['value']
+    hits = requests.get(('nhl_games_csv', 'hit'), {'value': 0})['value']
+    for _ in range(2):
+        feature_store.get_online_features([{'game_id': 2016020045}, {'game_id': -1}], ['nhl_games_csv:home_goals'],
+                                          'game')
+
+    requests = _samples('snax_online_index_requests_total')
+    assert requests[('nhl_games_csv', 'miss')]['value'] == misses + 1
+    assert requests[('nhl_games_csv', 'hit')]['value'] == hits + 1
+    assert _samples('snax_online_lookups_total')[('nhl_games_csv', 'missing')]['value'] >= 2
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.entity import Entity
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.online_index import OnlineIndex, entity_row_key
+from snax.value_type import Int, String, Timestamp
+
+
+@pytest.fixture
+def users_feature_view():
+    return FeatureView(
+        name='users',
+        entities=[Entity('user', join_keys=['id']), Entity('full_user', join_keys=['id', 'string_id'])],
+        features=[Feature('id', Int), Feature('string_id', String), Feature('name', String),
+                  Feature('signup', Timestamp)],
+        source=InMemoryDataSource(
+            name='users_source',
+            data=pd.DataFrame({
+                'id': [1, 2, 2],
+                'string_id': ['a', 'b', 'c'],
+                'name': ['Ada', 'Bob', 'Cyd'],
+                'signup': ['2021-09-04', '2021-12-24', None]
+            })
+        )
+    )
+
+
+def test_online_index_single_key(users_feature_view):
+    online_index = OnlineIndex(users_feature_view, 'user')
+
+    assert online_index.feature_names == ['string_id', 'name', 'signup']
+    assert online_index.get_row(1) == ('a', 'Ada', datetime(2021, 9, 4))
+    assert online_index.get_row(2)[online_index.feature_position('name')] == 'Bob'
+    assert online_index.get_row(3) is None
+
+
+def test_online_index_multi_key(users_feature_view):
+    online_index = OnlineIndex(users_feature_view, 'full_user')
+    row = online_index.get_row(entity_row_key({'id': 2, 'string_id': 'c', 'other': 0}, online_index.join_keys))
+
+    assert online_index.feature_names == ['name', 'signup']
+    assert row[0] == 'Cyd'
+    assert pd.isna(row[1])
+    with pytest.raises(ValueError):
+        online_index.feature_position('age')
+
+
+def test_online_index_keeps_latest_row():
+    view = FeatureView(
+        name='balances',
+        entities=[Entity('user', join_keys=['id'])],
+        features=[Feature('id', Int), Feature('balance', Int)],
+        source=InMemoryDataSource(
+            name='balances_source',
+            data=pd.DataFrame({
+                'id': [1, 1, 2, 2],
+                'updated_at': ['2022-01-01T00:00:00', '2022-01-10T00:00:00', None, '2022-01-05T00:00:00'],
+                'balance': [10, 20, 0, 30]
+            })
+        ),
+        timestamp_field='updated_at'
+    )
+    online_index = OnlineIndex(view, 'user')
+
+    assert online_index.get_rows([1, 2]) == [(20,), (30,)]
@@ -0,0 +1,145 @@
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.entity import Entity
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.online_store import SqliteOnlineStore
+from snax.value_type import Int, Float, Timestamp, Unknown
+
+
+@pytest.fixture
+def balances_feature_view():
+    return FeatureView(
+        name='balances',
+        entities=[Entity('user', join_keys=['user_id'])],
+        features=[Feature('user_id', Int), Feature('updated_at', Timestamp), Feature('balance', Float)],
+        source=InMemoryDataSource(
+            name='balances_source',
+            data=pd.DataFrame({
+                'user_id': [1, 1, 2],
+                'updated_at': ['2022-01-01T00:00:00', '2022-01-10T00:00:00', '2022-01-05T00:00:00'],
+                'balance': [10.0, 20.0, 30.0]
+            })
+        ),
+        timestamp_field='updated_at'
+    )
+
+
+def test_materialize(tmp_path, balances_feature_view):
+    online_store = SqliteOnlineStore(tmp_path / 'online.db')
+
+    assert online_store.get_table('balances', 'user') is None
+    assert online_store.materialize(balances_feature_view, 'user') == 2
+
+    online_table = online_store.get_table('balances', 'user')
+    assert online_table.feature_names == ['updated_at', 'balance']
+    assert online_table.get_rows([1, 2, 3]) == [(datetime(2022, 1, 10), 20.0), (datetime(2022, 1, 5), 30.0), None]
+    assert online_store.get_watermark('balances', 'user') == datetime(2022, 1, 10)
+
+
+def test_materialize_incremental(tmp_path, balances_feature_view):
+    online_store = SqliteOnlineStore(tmp_path / 'online.db')
+    online_store.materialize(balances_feature_view, 'user')
+
+    balances_feature_view.source.insert(
+        key=['user_id', 'updated_at'],
+        columns=['balance'],
+        data=pd.DataFrame({'user_id': [2, 3], 'updated_at': ['2022-01-12T00:00:00', '2022-01-02T00:00:00'],
+                           'balance': [40.0, 50.0]})
+    )
+
+    # Only rows since the watermark are copied, user 3's row is older than it
+    assert online_store.materialize(balances_feature_view, 'user') == 2
+    online_table = online_store.get_table('balances', 'user')
+    assert [row[1] if row is not None else None for row in online_table.get_rows([1, 2, 3])] == [20.0, 40.0, None]
+
+    assert online_store.materialize(balances_feature_view, 'user', incremental=False) == 3
+    assert online_table.get_row(3)[1] == 50.0
+
+
+def test_materialize_normalizes_keys(tmp_path):
+    view = FeatureView(
+        name='logins',
+        entities=[Entity('user', join_keys=['user_id']), Entity('day', join_keys=['day'])],
+        features=[Feature('user_id', Float), Feature('day', Timestamp), Feature('logins', Int)],
+        source=InMemoryDataSource(name='logins_source', data=pd.DataFrame({
+            'user_id': [1.0, 2.0, None],
+            'day': [pd.Timestamp('2022-01-01'), pd.Timestamp('2022-01-02'), pd.Timestamp('2022-01-03')],
+            'logins': [3, 4, 5]
+        }))
+    )
+    online_store = SqliteOnlineStore(tmp_path / 'online.db')
+    online_store.materialize(view, 'user')
+    online_store.materialize(view, 'day')
+
+    assert online_store.get_table('logins', 'user').get_rows([1, 2.0]) == [(pd.Timestamp('2022-01-01'), 3),
+                                                                           (pd.Timestamp('2022-01-02'), 4)]
+    assert online_store.get_table('logins', 'day').get_row(datetime(2022, 1, 2)) == (2.0, 4)
+
+
+def test_full_materialize_keeps_table_readable(tmp_path, balances_feature_view):
+    online_store = SqliteOnlineStore(tmp_path / 'online.db')
+    online_store.materialize(balances_feature_view, 'user')
+    online_table = online_store.get_table('balances', 'user')
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        reader_store = SqliteOnlineStore(tmp_path / 'online.db')
+        reader_table = reader_store.get_table('balances', 'user')
+        while not stop.is_set():
+            try:
+                assert reader_table.get_row(1) is not None
+            except Exception as exception:
+                errors.append(exception)
+                return
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for _ in range(20):
+        online_store.materialize(balances_feature_view, 'user', incremental=False)
+    stop.set()
+    reader.join()
+
+    assert errors == []
+    assert online_table.get_row(1)[1] == 20.0
+
+
+def test_materialize_decimal_and_date_values(tmp_path):
+    feature_view = FeatureView(
+        name='accounts',
+        entities=[Entity('user', join_keys=['user_id'])],
+        features=[Feature('user_id', Int), Feature('opened_on', Unknown), Feature('limit', Unknown)],
+        source=InMemoryDataSource(
+            name='accounts_source',
+            data=pd.DataFrame({'user_id': [Decimal(1), 2], 'opened_on': [date(2022, 1, 3), None],
+                               'limit': [Decimal('100.50'), Decimal('7')]})
+        )
+    )
+    online_store = SqliteOnlineStore(tmp_path / 'online.db')
+
+    assert online_store.materialize(feature_view, 'user') == 2
+    assert online_store.get_table('accounts', 'user').get_rows([1, 2.0]) == [
+        (date(2022, 1, 3), Decimal('100.50')), (None, Decimal('7'))]
+
+
+def test_close_closes_connections_of_all_threads(tmp_path, balances_feature_view):
+    online_store = SqliteOnlineStore(tmp_path / 'online.db')
+    online_store.materialize(balances_feature_view, 'user')
+    connections = [online_store.connection()]
+    thread = threading.Thread(target=lambda: connections.append(online_store.connection()))
+    thread.start()
+    thread.join()
+
+    online_store.close()
+
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute('SELECT 1')
@@ -1,10 +1,13 @@
+import os
 from pathlib import Path
 
 import snax.example_feature_repos.winequality_feature_repo as winequality_feature_repo
+import snax.repo_contents
 from snax.data_sources.csv_data_source import CsvDataSource
 from snax.feature import Feature
 from snax.feature_view import FeatureView
-from snax.repo_contents import parse_repo, DUMMY_ENTITY
+from snax.repo_contents import parse_repo, scan_repo_file, RepoContents, DUMMY_ENTITY, changed_repo_file_paths, \
+    reload_repo
 from snax._utils import copy_to_temp
 from snax.value_type import Float
 
@@ -40,3 +43,153 @@ def test_parse_repo():
     assert repo_contents.entities[0] == expected_entity
     assert repo_contents.data_sources[0] == expected_data_source
     assert repo_contents.feature_views[0] == expected_feature_view
+
+
+_LAZY_REPO_FILES = {
+    'games.py': '''
+import pandas as pd
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.entity import Entity
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.value_type import Int
+
+game = Entity(name='game', join_keys=['game_id'])
+games_source = InMemoryDataSource(name='games_source', data=pd.DataFrame({'game_id': [1], 'goals': [3]}))
+games_view = FeatureView(
+    name='games',
+    entities=[game],
+    features=[Feature('game_id', Int), Feature('goals', Int)],
+    source=games_source
+)
+''',
+    'unused.py': '''
+raise RuntimeError('Must not be imported')
+''',
+    'computed_names.py': '''
+from snax.entity import Entity
+
+player = Entity(name='play' + 'er', join_keys=['player_id'])
+'''
+}
+
+
+def test_parse_repo_lazy(tmp_path):
+    for file_name, definition in _LAZY_REPO_FILES.items():
+        (tmp_path / file_name).write_text(definition)
+
+    repo_contents = parse_repo(repo_path=tmp_path, lazy=True)
+    assert repo_contents.imported_file_paths == []
+
+    assert repo_contents.get_feature_view('games').name == 'games'
+    assert repo_contents.get_data_source('games_source').name == 'games_source'
+    assert repo_contents.get_entity(DUMMY_ENTITY.name) is DUMMY_ENTITY
+    assert [path.name for path in repo_contents.imported_file_paths] == ['games.py']
+
+    # Names the scan can't find are looked up by importing the remaining files
+    assert repo_contents.get_entity('player').join_keys == ['player_id']
+    assert [path.name for path in repo_contents.imported_file_paths] == ['computed_names.py', 'games.py']
+
+
+def test_scan_repo_file(tmp_path):
+    (tmp_path / 'games.py').write_text(_LAZY_REPO_FILES['games.py'])
+
+    definitions = scan_repo_file(tmp_path / 'games.py')
+
+    assert definitions.feature_views == ['games']
+    assert definitions.entities == ['game']
+    assert definitions.data_sources == ['games_source']
+
+
+def test_parse_repo_lazy_with_manifest(tmp_path, monkeypatch):
+    repo_path = tmp_path / 'repo'
+    repo_path.mkdir()
+    for file_name, definition in _LAZY_REPO_FILES.items():
+        (repo_path / file_name).write_text(definition)
+    manifest_path = tmp_path / 'manifest.json'
+
+    repo_contents = parse_repo(repo_path=repo_path, lazy=True, manifest_path=manifest_path)
+    assert repo_contents.get_entity('player') is not None
+    assert manifest_path.exists()
+
+    # Unchanged files are not scanned again and the computed name is known from the previous import
+    def fail_scan(repo_file_path):
+        raise AssertionError(f'{repo_file_path} scanned')
+
+    monkeypatch.setattr(snax.repo_contents, 'scan_repo_file', fail_scan)
+    repo_contents = parse_repo(repo_path=repo_path, lazy=True, manifest_path=manifest_path)
+    assert repo_contents.get_entity('player') is not None
+    assert [path.name for path in repo_contents.imported_file_paths] == ['computed_names.py']
+
+    monkeypatch.undo()
+    (repo_path / 'games.py').write_text(_LAZY_REPO_FILES['games.py'].replace("name='games'", "name='matches'"))
+    repo_contents = parse_repo(repo_path=repo_path, lazy=True, manifest_path=manifest_path)
+    assert repo_contents.get_feature_view('matches').name == 'matches'
+    assert [path.name for path in repo_contents.imported_file_paths] == ['games.py']
+
+
+def test_repo_contents_indices():
+    data_source = CsvDataSource(name='games_csv', csv_file_path=None)
+    games_view = FeatureView(name='games', entities=None, features=[Feature('goals', Float)], source=data_source)
+    matches_view = FeatureView(name='matches', entities=None, features=[Feature('goals', Float)], source=data_source)
+    repo_contents = RepoContents(data_sources=[data_source, data_source], feature_views=[games_view, matches_view])
+    repo_contents.add_feature_view(games_view)
+
+    assert repo_contents.data_sources == [data_source]
+    assert repo_contents.feature_views == [games_view, matches_view]
+    assert repo_contents.get_feature_view('matches') is matches_view
+    assert repo_contents.get_feature_view('players') is None
+    assert repo_contents.get_feature_views_by_feature('goals') == [games_view, matches_view]
+    assert repo_contents.get_feature_views_by_feature('assists') == []
+
+
+def _write_reload_repo(repo_path):
+    (repo_path / 'games.py').write_text(_LAZY_REPO_FILES['games.py'])
+    (repo_path / 'computed_names.py').write_text(_LAZY_REPO_FILES['computed_names.py'])
+
+
+def _modify(repo_file_path, old, new):
+    repo_file_path.write_text(repo_file_path.read_text().replace(old, new))
+    # Modification time resolution of some file systems is too coarse to tell the write apart
+    mtime_ns = repo_file_path.stat().st_mtime_ns + 1_000_000_000
+    os.utime(repo_file_path, ns=(mtime_ns, mtime_ns))
+
+
+def test_reload_repo(tmp_path):
+    _write_reload_repo(tmp_path)
+    repo_contents = parse_repo(repo_path=tmp_path)
+    player = repo_contents.get_entity('player')
+    assert changed_repo_file_paths(repo_contents, tmp_path) == []
+
+    _modify(tmp_path / 'games.py', "name='games'", "name='matches'")
+    (tmp_path / 'teams.py').write_text("from snax.entity import Entity\nteam = Entity(name='team', join_keys=['id'])\n")
+    changed_file_paths = changed_repo_file_paths(repo_contents, tmp_path)
+    assert [path.name for path in changed_file_paths] == ['games.py', 'teams.py']
+
+    reloaded_contents = reload_repo(repo_contents, tmp_path, changed_file_paths)
+    assert reloaded_contents.get_feature_view('games') is None
+    assert reloaded_contents.get_feature_view('matches') is not None
+    assert reloaded_contents.get_entity('player') is player
+    assert reloaded_contents.get_entity('team') is not None
+    assert repo_contents.get_feature_view('games') is not None
+    assert changed_repo_file_paths(reloaded_contents, tmp_path) == []
+
+    (tmp_path / 'teams.py').unlink()
+    assert [path.name for path in changed_repo_file_paths(reloaded_contents, tmp_path)] == ['teams.py']
+    reloaded_contents = reload_repo(reloaded_contents, tmp_path, changed_repo_file_paths(reloaded_contents, tmp_path))
+    assert reloaded_contents.get_entity('team') is None
+    assert [entity.name for entity in reloaded_contents.entities] == ['player', 'game', '__dummy']
+
+
+def test_reload_repo_lazy(tmp_path):
+    _write_reload_repo(tmp_path)
+    repo_contents = parse_repo(repo_path=tmp_path, lazy=True)
+    player = repo_contents.get_entity('player')
+    repo_contents.get_feature_view('games')
+
+    _modify(tmp_path / 'games.py', "name='games'", "name='matches'")
+    reloaded_contents = reload_repo(repo_contents, tmp_path, changed_repo_file_paths(repo_contents, tmp_path))
+    assert [path.name for path in reloaded_contents.imported_file_paths] == ['computed_names.py']
+    assert reloaded_contents.get_entity('player') is player
+    assert reloaded_contents.get_feature_view('matches') is not None
+    assert reloaded_contents.get_feature_view('games') is None
@@ -0,0 +1,118 @@
+import sys
+import threading
+import tracemalloc
+
+import pytest
+
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.repo_contents import parse_repo
+from snax.repo_profiler import RepoLoadProfiler, RepoLoadProfile, LoadCost
+
+
+def test_profile_parse_repo(tmp_path):
+    (tmp_path / 'games.py').write_text('''
+import time
+import pandas as pd
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+
+time.sleep(0.05)
+games_source = InMemoryDataSource(name='games_source', data=pd.DataFrame({'game_id': [1]}))
+''')
+    (tmp_path / 'players.py').write_text('''
+from snax.entity import Entity
+
+player = Entity(name='player', join_keys=['player_id'])
+''')
+    profiler = RepoLoadProfiler()
+    parse_repo(tmp_path, profiler=profiler)
+    profile = profiler.profile
+
+    assert [cost.name for cost in profile.modules] == ['games.py', 'players.py']
+    assert [cost.name for cost in profile.data_sources] == ['games_source (InMemoryDataSource)']
+    assert profile.sorted()[0].name == 'games.py'
+    assert profile.sorted()[0].wall_time >= 0.05
+    assert profile.wall_time >= 0.05
+    assert profile.format_table(limit=1).splitlines()[1].startswith('module       games.py')
+    assert profile.to_dict()['costs'][0]['kind'] == 'data_source'
+    # The data sources' constructors are measured only during the imports
+    assert '__wrapped__' not in vars(InMemoryDataSource.__init__)
+
+
+def test_sort_profile():
+    profile = RepoLoadProfile([LoadCost('module', 'a.py', 0.1, 10), LoadCost('module', 'b.py', 0.2, 5, 7, 0)])
+
+    assert [cost.name for cost in profile.sorted('memory_delta')] == ['a.py', 'b.py']
+    assert [cost.name for cost in profile.sorted('read_bytes')] == ['b.py', 'a.py']
+    with pytest.raises(ValueError):
+        profile.sorted('cpu_time')
+
+
+def test_overlapping_profiles_restore_constructors():
+    constructor = InMemoryDataSource.__init__
+    first_profiler, second_profiler = RepoLoadProfiler(), RepoLoadProfiler()
+    first_entered, second_entered = threading.Event(), threading.Event()
+
+    def first_load():
+        with first_profiler.measure_module('first.py'):
+            first_entered.set()
+            second_entered.wait()
+
+    # The first load ends while the second one is still running
+    first_thread = threading.Thread(target=first_load)
+    first_thread.start()
+    first_entered.wait()
+    with second_profiler.measure_module('second.py'):
+        second_entered.set()
+        first_thread.join()
+        InMemoryDataSource(name='second_source')
+
+    assert InMemoryDataSource.__init__ is constructor
+    InMemoryDataSource(name='unmeasured_source')
+    assert [cost.name for cost in first_profiler.profile.data_sources] == []
+    assert [cost.name for cost in second_profiler.profile.data_sources] == ['second_source (InMemoryDataSource)']
+
+
+def test_tracing_started_once_per_load(tmp_path, monkeypatch):
+    for file_name in ['a.py', 'b.py', 'c.py']:
+        (tmp_path / file_name).write_text('values = list(range(1000))\n')
+    starts = []
+    start = tracemalloc.start
+    monkeypatch.setattr(tracemalloc, 'start', lambda *args: starts.append(args) or start(*args))
+
+    profiler = RepoLoadProfiler()
+    parse_repo(tmp_path, profiler=profiler)
+
+    assert len(starts) <= 1
+    assert not tracemalloc.is_tracing()
+    assert all(cost.memory_delta > 0 for cost in profiler.profile.modules)
+
+
+def test_overlapping_measurements_keep_tracing():
+    first_profiler, second_profiler = RepoLoadProfiler(), RepoLoadProfiler()
+    first_entered, second_entered = threading.Event(), threading.Event()
+
+    def first_load():
+        with first_profiler.measure('module', 'first.py'):
+            first_entered.set()
+            second_entered.wait()
+
+    # The first measurement started the tracing and ends while the second one is running
+    first_thread = threading.Thread(target=first_load)
+    first_thread.start()
+    first_entered.wait()
+    with second_profiler.measure('module', 'second.py'):
+        second_entered.set()
+        first_thread.join()
+        values = [str(value) for value in range(10000)]
+
+    assert second_profiler.profile.modules[0].memory_delta >= sys.getsizeof(values)
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_without_tracing_memory():
+    profiler = RepoLoadProfiler(trace_memory=False)
+    with profiler.measure('module', 'a.py'):
+        assert not tracemalloc.is_tracing()
+
+    assert profiler.profile.modules[0].memory_delta is None
+    assert profiler.profile.format_table().splitlines()[1].startswith('module       a.py')
@@ -0,0 +1,94 @@
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from sqlalchemy import create_engine
+
+from snax.data_sources.csv_data_source import CsvDataSource
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.data_sources.oracle_data_source import OracleDataSource
+from snax.entity import Entity
+from snax.example_feature_repos.sports_feature_repo.nhl_games import data_path as nhl_data_path
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.retrieval_plan import plan_retrieval, JoinedRetrievalStep
+from snax.value_type import Int, String
+
+game = Entity(name='game', join_keys=['game_id'])
+
+
+def _create_view(name: str, source, features) -> FeatureView:
+    return FeatureView(name=name, entities=[game], features=[Feature('game_id', Int)] + features, source=source)
+
+
+def test_plan_retrieval_coalesces_views_on_same_storage():
+    goals_view = _create_view('goals', CsvDataSource('games_a', nhl_data_path), [Feature('home_goals', Int)])
+    venue_view = _create_view('venue', CsvDataSource('games_b', nhl_data_path), [Feature('venue', String)])
+    other_view = _create_view(
+        'other', InMemoryDataSource('other', pd.DataFrame({'game_id': [1], 'outcome': ['x']})),
+        [Feature('outcome', String)])
+
+    plan = plan_retrieval(
+        [(goals_view, ['home_goals']), (venue_view, ['venue']), (other_view, ['outcome'])],
+        entity_name='game'
+    )
+
+    assert len(plan.steps) == 2
+    assert plan.steps[0].columns == ['home_goals', 'venue']
+    assert plan.steps[1].columns == ['outcome']
+    assert plan.explain().splitlines()[0] == 'RetrievalPlan: 2 select(s) for 3 feature view(s)'
+
+
+def test_plan_retrieval_separates_views_with_different_feature_types():
+    source = CsvDataSource('games', nhl_data_path)
+    goals_view = _create_view('goals', source, [Feature('home_goals', Int)])
+    goals_text_view = _create_view('goals_text', source, [Feature('home_goals', String)])
+    goals_copy_view = _create_view('goals_copy', source, [Feature('home_goals', Int)])
+
+    plan = plan_retrieval(
+        [(goals_view, ['home_goals']), (goals_text_view, ['home_goals']), (goals_copy_view, ['home_goals'])],
+        entity_name='game'
+    )
+
+    assert [[view.name for view, _ in step.view_feature_names] for step in plan.steps] == \
+        [['goals', 'goals_copy'], ['goals_text']]
+    feature_values = plan.steps[1].get_feature_values(pd.DataFrame({'game_id': [2016020045]}))
+    assert feature_values['home_goals'].tolist() == ['7']
+
+
+def test_retrieval_step_get_feature_values():
+    source = CsvDataSource('games', nhl_data_path)
+    goals_view = _create_view('goals', source, [Feature('home_goals', Int)])
+    venue_view = _create_view('venue', source, [Feature('venue', String)])
+    step = plan_retrieval([(goals_view, ['home_goals']), (venue_view, ['venue'])], entity_name='game').steps[0]
+
+    feature_values = step.get_feature_values(pd.DataFrame({'game_id': [2016020045, 2017020812]}))
+
+    expected_feature_values = pd.DataFrame({
+        'game_id': [2016020045, 2017020812],
+        'home_goals': [7, 3],
+        'venue': ['United Center', 'KeyBank Center']
+    })
+    assert_frame_equal(feature_values.sort_values('game_id').reset_index(drop=True), expected_feature_values)
+
+
+def test_joined_retrieval_step_joins_tables_in_database():
+    # SQLite stands in for Oracle here, the generated SQL is plain enough to run on both
+    engine = create_engine('sqlite://')
+    pd.DataFrame({'game_id': [1, 2], 'home_goals': [5, 8]}).to_sql('goals', engine, index=False)
+    pd.DataFrame({'id': [2, 3], 'venue': ['Arena', 'Center']}).to_sql('venues', engine, index=False)
+    goals_view = _create_view('goals', OracleDataSource('goals', 'main', 'goals', engine), [Feature('home_goals', Int)])
+    venue_view = _create_view(
+        'venue', OracleDataSource('venues', 'main', 'venues', engine, field_mapping={'id': 'game_id'}),
+        [Feature('venue', String)])
+
+    plan = plan_retrieval([(goals_view, ['home_goals']), (venue_view, ['venue'])], entity_name='game')
+    assert len(plan.steps) == 1
+    assert isinstance(plan.steps[0], JoinedRetrievalStep)
+
+    feature_values = plan.steps[0].get_feature_values(pd.DataFrame({'game_id': [1, 2, 3, 4]}))
+
+    expected_feature_values = pd.DataFrame({
+        'game_id': [1, 2, 3],
+        'home_goals': [5.0, 8.0, None],
+        'venue': [None, 'Arena', 'Center']
+    })
+    assert_frame_equal(feature_values.sort_values('game_id').reset_index(drop=True), expected_feature_values)
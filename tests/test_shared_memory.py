@@ -0,0 +1,73 @@
+import gc
+import logging
+import multiprocessing
+import os
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.shared_memory import SharedMemoryPublisher, SharedTable, SharedTableReader, _attach, _generation_segment_name
+
+
+@pytest.fixture
+def publisher():
+    publisher = SharedMemoryPublisher(f'snax_test_{os.getpid()}')
+    yield publisher
+    publisher.close()
+
+
+@pytest.fixture
+def users_dataframe():
+    return pd.DataFrame({'id': [1, 2, 3], 'name': ['Ada', None, 'Cyd'], 'score': [0.5, 1.5, 2.5]})
+
+
+def _select_in_worker(shared_memory_name: str) -> pd.DataFrame:
+    data_source = InMemoryDataSource(name='users', shared_memory_name=shared_memory_name)
+    return data_source.select(columns=['id', 'name'], key=['id'], key_values=pd.DataFrame({'id': [3, 4]}))
+
+
+def test_select_from_shared_memory(publisher, users_dataframe):
+    publisher.publish(users_dataframe, key=['id'])
+    data_source = InMemoryDataSource(name='users', shared_memory_name=publisher.name)
+
+    assert_frame_equal(data_source.select(), users_dataframe)
+    assert_frame_equal(data_source.select(where_sql_query='score > 1').reset_index(drop=True),
+                       users_dataframe.iloc[1:].reset_index(drop=True))
+
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        worker_data = pool.apply(_select_in_worker, (publisher.name,))
+    assert worker_data.to_dict('list') == {'id': [3], 'name': ['Cyd']}
+
+
+def test_republish(publisher, users_dataframe):
+    publisher.publish(users_dataframe, key=['id'])
+    data_source = InMemoryDataSource(name='users', shared_memory_name=publisher.name)
+    assert data_source.select(columns=['score'])['score'].tolist() == [0.5, 1.5, 2.5]
+
+    assert publisher.publish(users_dataframe.assign(score=[5.0, 6.0, 7.0])) == 2
+    assert data_source.select(columns=['score'])['score'].tolist() == [5.0, 6.0, 7.0]
+    with pytest.raises(ValueError):
+        data_source.insert(key=['id'], columns=['score'], data=users_dataframe)
+
+
+def test_shared_table_dictionaries_are_views_of_shared_memory(publisher, users_dataframe):
+    publisher.publish(users_dataframe, key=['name'])
+    table = SharedTableReader(publisher.name).get_table()
+
+    assert not table._dictionaries['name']._data.flags.owndata
+    assert not table._dictionaries['name']._offsets.flags.owndata
+    assert table.lookup(pd.DataFrame({'name': ['Cyd', 'Bob']})).tolist() == [2]
+
+
+def test_shared_table_logs_leaked_views(publisher, users_dataframe, caplog):
+    publisher.publish(users_dataframe)
+    table = SharedTable(_attach(_generation_segment_name(publisher.name, 1)), generation=1)
+    leaked_array = table._arrays['score']
+
+    with caplog.at_level(logging.WARNING, logger='snax.shared_memory'):
+        del table
+        gc.collect()
+    assert 'not closed' in caplog.text
+    del leaked_array
@@ -0,0 +1,102 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from snax.snapshot import write_snapshot, Snapshot
+
+
+@pytest.fixture
+def users_dataframe():
+    return pd.DataFrame({
+        'id': [3, 1, 2, 1],
+        'name': ['Cyd', 'Ada', None, 'Ann'],
+        'score': [0.5, np.nan, 1.5, 2.5],
+        'signup': pd.to_datetime(['2021-09-04', '2021-12-24', None, '2022-01-01'])
+    })
+
+
+def test_snapshot_round_trip(tmp_path, users_dataframe):
+    write_snapshot(users_dataframe, tmp_path / 'users')
+    snapshot = Snapshot(tmp_path / 'users')
+
+    assert len(snapshot) == 4
+    assert snapshot.columns == ['id', 'name', 'score', 'signup']
+    assert isinstance(snapshot._arrays['id'], np.memmap)
+    assert_frame_equal(snapshot.take(), users_dataframe)
+    assert_frame_equal(snapshot.take(np.array([3, 0]), ['name', 'id']),
+                       users_dataframe.loc[[3, 0], ['name', 'id']])
+
+
+def test_snapshot_lookup(tmp_path, users_dataframe):
+    write_snapshot(users_dataframe, tmp_path / 'users', key=['id'])
+    snapshot = Snapshot(tmp_path / 'users')
+
+    assert snapshot.lookup(pd.DataFrame({'id': [1, 7, 3]})).tolist() == [0, 1, 3]
+    assert snapshot.lookup(pd.DataFrame({'id': [1.5]})).tolist() == []
+    assert snapshot.lookup(pd.DataFrame({'id': ['a']})).tolist() == []
+
+
+def test_snapshot_lookup_multi_key(tmp_path, users_dataframe):
+    write_snapshot(users_dataframe, tmp_path / 'users', key=['id', 'name'])
+    snapshot = Snapshot(tmp_path / 'users')
+
+    key_values = pd.DataFrame({'id': [1, 2, 3, 1], 'name': ['Ann', None, 'Ada', 'Ada']})
+    assert snapshot.lookup(key_values).tolist() == [1, 3]
+
+
+def test_snapshot_of_other_format_version(tmp_path, users_dataframe):
+    write_snapshot(users_dataframe, tmp_path / 'users')
+    metadata_path = tmp_path / 'users' / 'snapshot.json'
+    metadata = json.loads(metadata_path.read_text())
+    metadata_path.write_text(json.dumps({**metadata, 'version': 1}))
+
+    with pytest.raises(ValueError):
+        Snapshot(tmp_path / 'users')
+
+
+def test_snapshot_rewrite_keeps_opened_snapshot(tmp_path, users_dataframe):
+    write_snapshot(users_dataframe, tmp_path / 'users', key=['id'])
+    snapshot = Snapshot(tmp_path / 'users')
+    for i in range(3):
+        write_snapshot(users_dataframe.assign(score=float(i)), tmp_path / 'users')
+
+    # Files of the opened generation are neither modified nor needed anymore
+    assert_frame_equal(snapshot.take(), users_dataframe)
+    rewritten_snapshot = Snapshot(tmp_path / 'users')
+    assert rewritten_snapshot.key is None
+    assert (rewritten_snapshot.take()['score'] == 2.).all()
+    assert len(list((tmp_path / 'users').glob('generation-*'))) == 2
+
+
+def test_snapshot_dictionaries_are_mapped(tmp_path, users_dataframe):
+    write_snapshot(users_dataframe, tmp_path / 'users', key=['name'])
+    snapshot = Snapshot(tmp_path / 'users')
+
+    generation_path, = (tmp_path / 'users').glob('generation-*')
+    assert not list(generation_path.glob('*.pkl'))
+    assert all(isinstance(array, np.memmap) for array in vars(snapshot._dictionaries['name']).values()
+               if isinstance(array, np.ndarray))
+    assert snapshot.lookup(pd.DataFrame({'name': ['Cyd', 'Bob', None, 'Ann']})).tolist() == [0, 3]
+
+
+def test_snapshot_of_mixed_type_values(tmp_path):
+    # Dates and timestamps of the same day compare equal in pandas, so they are in separate columns
+    dataframe = pd.DataFrame({
+        'id': ['a', 1, False, 2.5, Decimal('1.10'), date(2022, 1, 2), None],
+        'updated_at': ['a', 1, False, 2.5, Decimal('1.10'), pd.Timestamp('2022-01-02 03:04:05'), None]
+    })
+    write_snapshot(dataframe, tmp_path / 'values', key=['id'])
+    snapshot = Snapshot(tmp_path / 'values')
+
+    for column, last_type in [('id', date), ('updated_at', pd.Timestamp)]:
+        assert snapshot.take()[column].tolist()[:-1] == dataframe[column].tolist()[:-1]
+        assert [type(value) for value in snapshot.take()[column]][:-1] == [str, int, bool, float, Decimal, last_type]
+    assert snapshot.lookup(pd.DataFrame({'id': [Decimal('1.10'), 'a', 3]})).tolist() == [0, 4]
+
+    with pytest.raises(ValueError):
+        write_snapshot(pd.DataFrame({'id': [object()]}), tmp_path / 'objects')
@@ -0,0 +1,39 @@
+import json
+
+import pandas as pd
+
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.entity import Entity
+from snax.feature import Feature
+from snax.feature_view import FeatureView
+from snax.synthetic_data import generate_features, generate_data, generate_feature_view_data
+from snax.type_casting import cast_to_feature_types, CastStats
+from snax.value_type import Int, Float, String, Bool, Timestamp, IntList, TimestampList
+
+
+def test_generate_data():
+    features = generate_features(7, [Int, Float, String, Bool, Timestamp, IntList, TimestampList])
+    data = generate_data(['user_id'], features, 1000, key_cardinality=10, null_rate=0.2, timestamp_field='ts')
+
+    assert list(data.columns) == ['user_id', 'ts'] + [f'feature_{i}' for i in range(7)]
+    assert data['user_id'].nunique() <= 10
+    assert 0.1 < data['feature_1'].isna().mean() < 0.3
+    assert data['ts'].notna().all()
+    assert all(isinstance(value, list) for value in data['feature_5'].dropna().map(json.loads))
+    assert generate_data(['user_id'], features, 1000).equals(generate_data(['user_id'], features, 1000))
+
+    cast_stats = CastStats()
+    cast_to_feature_types(data, features, cast_stats)
+    assert cast_stats.total_failures == 0
+
+
+def test_generate_feature_view_data():
+    user = Entity(name='user', join_keys=['user_id'])
+    source = InMemoryDataSource(name='users', data=pd.DataFrame(), field_mapping={'bal': 'balance'})
+    view = FeatureView(name='balances', entities=[user], features=[Feature('balance', Float)], source=source,
+                       timestamp_field='updated_at')
+
+    data = generate_feature_view_data(view, 100)
+
+    assert list(data.columns) == ['user_id', 'updated_at', 'bal']
+    assert data['user_id'].is_unique
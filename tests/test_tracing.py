@@ -0,0 +1,85 @@
+import asyncio
+import io
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from snax import tracing
+from snax.data_sources.in_memory_data_source import InMemoryDataSource
+from snax.example_feature_repos import sports_feature_repo
+from snax.feature_store import FeatureStore
+
+
+@pytest.fixture
+def spans_file():
+    spans_file = io.StringIO()
+    collector = tracing.JsonLinesCollector(spans_file)
+    tracing.add_hook(collector)
+    yield spans_file
+    collector.close()
+
+
+def _read_spans(spans_file):
+    return [json.loads(line) for line in spans_file.getvalue().splitlines()]
+
+
+def test_span_without_hooks_records_nothing():
+    with tracing.span('stage', rows=1) as span:
+        span.set_attribute('bytes', 8)
+    assert not span.is_recording
+    assert tracing.current_span() is None
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_add_features_to_dataframe_spans(spans_file, use_async):
+    feature_store = FeatureStore(repo_path=Path(sports_feature_repo.__file__).parent)
+    dataframe = pd.DataFrame({'game_id': [2016020045, 2017020812]})
+    feature_names = ['nhl_games_csv:home_goals', 'nhl_games_csv:venue']
+    if use_async:
+        asyncio.run(feature_store.add_features_to_dataframe_async(dataframe, feature_names, 'game'))
+    else:
+        feature_store.add_features_to_dataframe(dataframe, feature_names, 'game')
+
+    spans = {span['name']: span for span in _read_spans(spans_file)}
+    root = spans['feature_store.add_features_to_dataframe']
+    assert root['parent_id'] is None
+    assert root['attributes'] == {'entity': 'game', 'features': 2, 'rows': 2, 'output': 'pandas'}
+    assert {span['trace_id'] for span in spans.values()} == {root['span_id']}
+    assert spans['retrieval.step']['parent_id'] == root['span_id']
+    assert spans['data_source.select']['parent_id'] == spans['retrieval.step']['span_id']
+    assert spans['retrieval.step']['attributes']['views'] == ['nhl_games_csv']
+    assert spans['data_source.select']['attributes']['rows'] == 2
+    assert spans['data_source.backend_select']['parent_id'] == spans['data_source.select']['span_id']
+    assert spans['feature_view.cast']['attributes'] == {'view': 'nhl_games_csv', 'features': 2, 'rows': 2}
+    assert spans['feature_store.join']['parent_id'] == root['span_id']
+
+
+def test_insert_spans(spans_file):
+    data_source = InMemoryDataSource(name='games', data=pd.DataFrame({'game_id': [1], 'goals': [3]}))
+    data_source.insert(key=['game_id'], columns=['goals'], data=pd.DataFrame({'game_id': [2], 'goals': [5]}))
+    with pytest.raises(ValueError):
+        data_source.insert(key=['game_id'], columns=['goals'], data=pd.DataFrame({'game_id': [2], 'goals': [5]}))
+
+    spans = _read_spans(spans_file)
+    assert [span['name'] for span in spans] == ['data_source.backend_insert', 'data_source.insert'] * 2
+    assert spans[1]['attributes']['rows'] == 1
+    assert spans[1]['error'] is None
+    assert 'already exists' in spans[3]['error']
+
+
+def test_json_lines_collector_file(tmp_path):
+    collector = tracing.JsonLinesCollector(tmp_path / 'spans.jsonl')
+    tracing.add_hook(collector)
+    with tracing.span('outer'):
+        with tracing.span('inner', rows=3):
+            pass
+    collector.close()
+    with tracing.span('after_close'):
+        pass
+
+    spans = [json.loads(line) for line in (tmp_path / 'spans.jsonl').read_text().splitlines()]
+    assert [(span['name'], span['attributes']) for span in spans] == [('inner', {'rows': 3}), ('outer', {})]
+    assert spans[0]['parent_id'] == spans[1]['span_id']
+    assert spans[0]['duration'] <= spans[1]['duration']
@@ -3,8 +3,10 @@ from datetime import datetime
 import pandas as pd
 import pytest
 
+from snax import type_casting
 from snax.feature import Feature
-from snax.type_casting import guess_timestamp_format, cast_to_feature_types, cast_to_feature_type
+from snax.type_casting import guess_timestamp_format, cast_to_feature_types, cast_to_feature_type, CastStats, \
+    _FEATURE_TYPE_TO_CAST_FN
 from snax.value_type import ValueType
 
 
@@ -146,3 +148,77 @@ RAW_SERIES__FEATURE_TYPE__CAST_SERIES = [
 def test_cast_to_feature_type(raw_series, feature_type, expected_cast_series):
     cast_series = cast_to_feature_type(raw_series, feature_type=feature_type)
     assert cast_series.equals(expected_cast_series)
+
+
+def test_cast_to_feature_types_counts_cast_failures():
+    data = pd.DataFrame({
+        'int': ['1', 'x', None, '4'],
+        'float': ['1.0', '2.0', 'abc', 'def'],
+        'timestamp': ['2020-01-01', '2020-13-45', None, '2020-01-04'],
+        'string': ['a', None, 'c', 'd']
+    })
+    cast_stats = CastStats()
+    cast_data = cast_to_feature_types(
+        dataframe=data,
+        features=[
+            Feature(name='int', dtype=ValueType.INT),
+            Feature(name='float', dtype=ValueType.FLOAT),
+            Feature(name='timestamp', dtype=ValueType.TIMESTAMP),
+            Feature(name='string', dtype=ValueType.STRING)
+        ],
+        cast_stats=cast_stats
+    )
+
+    assert cast_stats.failures == {'int': 1, 'float': 2, 'timestamp': 1, 'string': 0}
+    assert cast_stats.total_failures == 4
+    assert cast_data['int'].equals(pd.Series([1, None, None, 4], dtype=float))
+    assert cast_data['timestamp'].equals(pd.Series([datetime(2020, 1, 1), None, None, datetime(2020, 1, 4)]))
+
+
+@pytest.mark.parametrize('raw_series,feature_type,expected_cast_series', [
+    (pd.Series(['1', '1_000', ' 2 ', 'x', None]), ValueType.INT, pd.Series([1, 1000, 2, None, None], dtype=float)),
+    (pd.Series(['1_000.5', '1e20', 'inf', 'x']), ValueType.FLOAT, pd.Series([1000.5, 1e20, float('inf'), None])),
+    (pd.Series(['1', '1e20', None]), ValueType.INT, pd.Series([1, 10 ** 20, None], dtype=object)),
+    (pd.Series(pd.to_datetime(['2020-01-01', None])), ValueType.INT, pd.Series([None, None], dtype=object)),
+    (pd.Series(pd.to_datetime(['2020-01-01', None])), ValueType.FLOAT, pd.Series([None, None], dtype=object)),
+])
+def test_cast_to_feature_type_matches_per_value_cast(raw_series, feature_type, expected_cast_series):
+    cast_series = cast_to_feature_type(raw_series, feature_type=feature_type)
+    assert cast_series.equals(expected_cast_series)
+    assert cast_series.equals(raw_series.apply(_FEATURE_TYPE_TO_CAST_FN[feature_type]))
+
+
+def test_cast_to_feature_type_keeps_dtype_of_missing_values():
+    # The per-value cast gives None in object columns here
+    assert cast_to_feature_type(pd.Series(['x', None]), ValueType.INT).equals(pd.Series([None, None], dtype=float))
+    assert cast_to_feature_type(pd.Series([1, 2]), ValueType.TIMESTAMP).equals(
+        pd.Series([None, None], dtype='datetime64[ns]'))
+
+
+def test_cast_to_feature_types_skips_counting_lossless_casts(monkeypatch):
+    counted_columns = []
+
+    def count_cast_failures(raw_series, cast_series):
+        counted_columns.append(raw_series.name)
+        return 0
+
+    monkeypatch.setattr(type_casting, 'count_cast_failures', count_cast_failures)
+    cast_stats = CastStats()
+    cast_to_feature_types(pd.DataFrame({'int': ['1'], 'string': ['a']}),
+                          [Feature(name='int', dtype=ValueType.INT), Feature(name='string', dtype=ValueType.STRING)],
+                          cast_stats=cast_stats)
+
+    assert counted_columns == ['int']
+    assert cast_stats.failures == {'int': 0, 'string': 0}
+
+
+@pytest.mark.parametrize('raw_series', [
+    pd.Series([True, None], dtype='boolean'),
+    pd.Series([1, None], dtype='Int64'),
+    pd.Series([1.5, None], dtype='Float64'),
+    pd.Series(['true', None], dtype='string'),
+])
+def test_cast_nullable_dtypes_to_bool(raw_series):
+    cast_series = cast_to_feature_type(raw_series, feature_type=ValueType.BOOL)
+    assert cast_series.tolist() == [True, None]
+    assert cast_series.tolist() == raw_series.apply(_FEATURE_TYPE_TO_CAST_FN[ValueType.BOOL]).tolist()